@@ -0,0 +1,154 @@
+"""Readings form parsing: lxml/XPath parser vs. the former BeautifulSoup path.
+
+Запуск из корня репозитория::
+
+    python benchmarks/bench_parsers.py [--number 200]
+
+Страницы собираются по структуре формы /readings личного кабинета: обвязка
+Drupal (меню, скрипты, подвал) и таблица счётчиков с полями ввода.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import re
+import sys
+import timeit
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load_parsers():
+    # модуль загружается напрямую, чтобы не импортировать пакет интеграции вместе с Home Assistant
+    spec = importlib.util.spec_from_file_location(
+        "bcnn_parsers", ROOT / "custom_components" / "bcnn" / "parsers.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+parsers = _load_parsers()
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="ru" dir="ltr">
+<head>
+<meta charset="utf-8" />
+<title>Передача показаний | Центр-СБК</title>
+{scripts}
+</head>
+<body class="path-readings">
+<nav class="menu">{menu}</nav>
+<main>
+<form class="readings-form" data-drupal-selector="readings-form" action="/readings" method="post" id="readings-form" accept-charset="UTF-8">
+<input autocomplete="off" data-drupal-selector="form-abc" type="hidden" name="form_build_id" value="form-{build_id}" />
+<input data-drupal-selector="edit-readings-form-form-token" type="hidden" name="form_token" value="{token}" />
+<input data-drupal-selector="edit-readings-form" type="hidden" name="form_id" value="readings_form" />
+<table class="responsive-enabled" data-striping="1">
+<thead><tr><th>Услуга</th><th>Номер счетчика</th><th>Дата поверки</th><th>Предыдущие</th><th>Текущие</th><th>Расход</th><th>Новые</th></tr></thead>
+<tbody>
+{rows}
+</tbody>
+</table>
+</form>
+</main>
+<footer>{footer}</footer>
+</body>
+</html>
+"""
+
+ROW_TEMPLATE = """<tr class="{parity}">
+<td>{device_type}</td>
+<td>{device_number}</td>
+<td>01.01.2030</td>
+<td>{prev_value}</td>
+<td>{cur_value}</td>
+<td>{amount}</td>
+<td><div class="js-form-item form-item"><input onchange="cabinet_change(99999.999, this)" data-drupal-selector="edit-{index}" type="text" name="{repr_number}" value="" size="12" maxlength="12" class="form-text" /></div></td>
+</tr>"""
+
+
+def make_readings_page(meters: int) -> str:
+    """Build a readings form page with the given number of meters."""
+    rows = "\n".join(
+        ROW_TEMPLATE.format(
+            parity="odd" if index % 2 else "even",
+            device_type="ХВС" if index % 2 else "ГВС",
+            device_number=f"{1000000 + index}",
+            prev_value=f"{100 + index}.000",
+            cur_value=f"{105 + index}.000",
+            amount="5.000",
+            index=index,
+            repr_number=f"pu_{1000000 + index}",
+        )
+        for index in range(meters)
+    )
+    return PAGE_TEMPLATE.format(
+        scripts="\n".join(
+            f'<script src="/core/misc/script_{i}.js?v=10.2"></script>' for i in range(40)
+        ),
+        menu="".join(f'<a href="/node/{i}">Раздел {i}</a>' for i in range(60)),
+        build_id="x" * 43,
+        token="y" * 43,
+        rows=rows,
+        footer="<p>Центр-СБК</p>" * 20,
+    )
+
+
+def legacy_parse(page: str) -> list[dict]:
+    """The former path: tokens via html.parser, then meter rows via a second lxml soup."""
+    soup = BeautifulSoup(page, "html.parser")
+    soup.find("input", {"name": "form_build_id"})["value"]
+    soup.find("input", {"name": "form_token"})["value"]
+
+    soup = BeautifulSoup(page, "lxml")
+    water_meters = []
+    for row in soup.find_all("tr"):
+        columns = row.find_all("td")
+        if columns:
+            input_tag = row.find("input", {"name": re.compile(".+")})
+            cabinet_change = row.find("input", {"onchange": re.compile(".+")})
+            pattern = r"cabinet_change\((\d+\.\d+)"
+            tuple(re.match(pattern, cabinet_change["onchange"]).group(1).split("."))
+            water_meters.append(
+                {
+                    "device_type": columns[0].text.strip(),
+                    "device_number": columns[1].text.strip(),
+                    "prev_value": columns[3].text.strip(),
+                    "cur_value": columns[4].text.strip(),
+                    "amount_water": columns[5].text.strip(),
+                    "repr_number": input_tag["name"] if input_tag else None,
+                }
+            )
+    return water_meters
+
+
+def xpath_parse(page: str) -> list[dict]:
+    return [row.as_dict() for row in parsers.parse_readings_page(page).meters]
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--number", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    print(f"{'meters':>6} {'page KB':>8} {'bs4 ms':>8} {'lxml ms':>8} {'speedup':>8}")
+    for meters in (2, 4, 8, 20):
+        page = make_readings_page(meters)
+        assert legacy_parse(page) == xpath_parse(page)
+        legacy = timeit.timeit(lambda: legacy_parse(page), number=args.number)
+        xpath = timeit.timeit(lambda: xpath_parse(page), number=args.number)
+        print(
+            f"{meters:>6} {len(page.encode()) / 1024:>8.1f} "
+            f"{legacy / args.number * 1000:>8.3f} {xpath / args.number * 1000:>8.3f} "
+            f"{legacy / xpath:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
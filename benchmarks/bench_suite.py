@@ -0,0 +1,347 @@
+"""Benchmark suite for parsing and refresh hot paths against the fake portal.
+
+Запуск из корня репозитория (нужны зависимости интеграции и Home Assistant)::
+
+    python benchmarks/bench_suite.py --save-baseline        # записать baseline.json
+    python benchmarks/bench_suite.py --check [--tolerance 0.2]
+
+Для каждой операции выводятся среднее и минимальное время, пик выделенной
+памяти и число выделенных блоков (tracemalloc) и число запросов к порталу.
+Результаты сравниваются с benchmarks/baseline.json; с --check скрипт
+завершается с ошибкой, если операция стала медленнее допуска, делает
+больше запросов или отсутствует в эталоне, а также если эталона нет.
+Эталон зависит от машины, поэтому в репозиторий не входит.
+
+Кэш разбора ParseCache сбрасывается перед каждым повтором, поэтому замеры
+get_charges и get_information_on_water_meters включают разбор страницы.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from aiohttp import ClientSession, CookieJar  # noqa: E402
+
+from custom_components.bcnn.bcnn_api import BCNNApi  # noqa: E402
+from custom_components.bcnn.helpers import parse_period  # noqa: E402
+from custom_components.bcnn.parsers import ParseCache  # noqa: E402
+from tools.fake_portal.scenario import FakePortalServer  # noqa: E402
+from tools.fake_portal.server import PortalConfig  # noqa: E402
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+LOGIN = "bench@example.com"
+PASSWORD = "bench"
+ACCOUNT = "100000001"
+CHARGES_PERIODS = (12, 60, 240)
+METERS = (2, 4, 8, 20)
+
+
+@dataclass
+class Result:
+    """Measurements of one operation."""
+
+    name: str
+    wall_ms: float
+    min_ms: float
+    alloc_kib: float
+    blocks: int
+    requests: float
+
+
+def convert_period_to_date(period_str: str) -> date:
+    """Period title as a date, today for any other text (the former helpers function)"""
+    return parse_period(period_str) or date.today()
+
+
+def make_fixtures(directory: Path, meters: int, accounts: int = 1) -> Path:
+    """Fixtures with one user, accounts with the given number of meters"""
+    user_accounts = {}
+    for account_index in range(accounts):
+        base = 30000000 + account_index * 100
+        user_accounts[str(int(ACCOUNT) + account_index)] = {
+            "address": f"г. Нижний Новгород, ул. Тестовая, д. 1, кв. {account_index + 1}",
+            "tariff": 50.0,
+            "services": ["Холодное водоснабжение", "Горячее водоснабжение", "Водоотведение"],
+            "meters": [
+                {
+                    "device_type": "ХВС" if index % 2 == 0 else "ГВС",
+                    "device_number": str(base + index),
+                    "repr_number": f"pu_{base + index}",
+                    "verification": "01.06.2029",
+                    "formatter": "99999.999",
+                    "prev_value": f"{100 + index:.3f}",
+                    "cur_value": f"{103 + index:.3f}",
+                    "amount": "3.000",
+                }
+                for index in range(meters)
+            ],
+        }
+    path = directory / f"portal_{meters}_{accounts}.json"
+    path.write_text(
+        json.dumps(
+            {"users": [{"login": LOGIN, "password": PASSWORD, "accounts": user_accounts}]},
+            ensure_ascii=False,
+        ),
+        encoding="utf-8",
+    )
+    return path
+
+
+async def measure(
+    name: str,
+    func: Callable[[], Awaitable[Any]],
+    number: int,
+    portal: FakePortalServer | None = None,
+    before: Callable[[], None] = lambda: None,
+) -> Result:
+    """Time number runs of func, then trace allocations of one more run"""
+    before()
+    await func()  # прогрев: вход, выбор ЛС
+
+    requests = portal.requests() if portal else 0
+    timings = []
+    for _ in range(number):
+        before()
+        started = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - started)
+    requests = (portal.requests() - requests) / number if portal else 0
+
+    before()
+    tracemalloc.start()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    current, _ = tracemalloc.get_traced_memory()
+    await func()
+    _, peak = tracemalloc.get_traced_memory()
+    blocks = sum(
+        stat.count_diff
+        for stat in tracemalloc.take_snapshot().compare_to(snapshot, "filename")
+        if stat.count_diff > 0
+    )
+    tracemalloc.stop()
+
+    return Result(
+        name=name,
+        wall_ms=sum(timings) / number * 1000,
+        min_ms=min(timings) * 1000,
+        alloc_kib=(peak - current) / 1024,
+        blocks=blocks,
+        requests=requests,
+    )
+
+
+def _measure_sync(name: str, func: Callable[[], Any], number: int) -> Result:
+    started = time.perf_counter()
+    for _ in range(number):
+        func()
+    wall = (time.perf_counter() - started) / number
+
+    tracemalloc.start()
+    current, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return Result(name, wall * 1000, wall * 1000, (peak - current) / 1024, 0, 0)
+
+
+async def _with_api(fixtures: Path, config: PortalConfig, body) -> list[Result]:
+    async with FakePortalServer(config, fixtures=fixtures) as portal, ClientSession(
+        cookie_jar=CookieJar(unsafe=True)
+    ) as session:
+        api = BCNNApi(session, LOGIN, PASSWORD, base_url=portal.base_url)
+        return await body(portal, api)
+
+
+def _reset_cache(api: BCNNApi) -> Callable[[], None]:
+    def _reset() -> None:
+        api.parse_cache = ParseCache()
+
+    return _reset
+
+
+async def run_suite(number: int, directory: Path) -> list[Result]:
+    results = [
+        _measure_sync(
+            "convert_period_to_date",
+            lambda: convert_period_to_date("сентябрь 2024 г."),
+            number * 100,
+        )
+    ]
+
+    fixtures = make_fixtures(directory, 2)
+    for periods in CHARGES_PERIODS:
+
+        async def _charges(portal, api, periods=periods):
+            return [
+                await measure(
+                    f"get_charges[{periods}]",
+                    lambda: api.get_charges(ACCOUNT),
+                    number,
+                    portal,
+                    _reset_cache(api),
+                )
+            ]
+
+        results += await _with_api(fixtures, PortalConfig(periods=periods), _charges)
+
+    async def _payment(portal, api):
+        return [
+            await measure(
+                "get_current_payment",
+                lambda: api.get_current_payment(ACCOUNT),
+                number,
+                portal,
+                _reset_cache(api),
+            ),
+            # данные не менялись: страница запрашивается, но не разбирается
+            await measure(
+                "get_current_payment[cached]",
+                lambda: api.get_current_payment(ACCOUNT),
+                number,
+                portal,
+            ),
+        ]
+
+    results += await _with_api(fixtures, PortalConfig(), _payment)
+
+    for meters in METERS:
+
+        async def _meters(portal, api, meters=meters):
+            return [
+                await measure(
+                    f"get_information_on_water_meters[{meters}]",
+                    lambda: api.get_information_on_water_meters(ACCOUNT),
+                    number,
+                    portal,
+                    _reset_cache(api),
+                )
+            ]
+
+        results += await _with_api(make_fixtures(directory, meters), PortalConfig(), _meters)
+
+    results += await _with_api(
+        make_fixtures(directory, 4, accounts=2), PortalConfig(), _coordinator_refresh(number)
+    )
+    return results
+
+
+def _coordinator_refresh(number: int):
+    async def _refresh(portal, api):
+        from homeassistant.core import HomeAssistant
+
+        from custom_components.bcnn.coordinator import BCNNCoordinator
+
+        with tempfile.TemporaryDirectory() as config_dir:
+            hass = HomeAssistant(config_dir)
+            coordinator = BCNNCoordinator(
+                hass,
+                bcnn_api=api,
+                accounts=[ACCOUNT, str(int(ACCOUNT) + 1)],
+                options={},
+            )
+
+            async def _force_refresh() -> None:
+                # обновление всех разделов всех ЛС, как по кнопке «Обновить»
+                coordinator._forced_accounts.update(coordinator.accounts)
+                coordinator.data = await coordinator._async_update_data()
+
+            results = [
+                await measure(
+                    "coordinator_refresh[2x4]",
+                    _force_refresh,
+                    number,
+                    portal,
+                    _reset_cache(api),
+                ),
+                await measure(
+                    "coordinator_refresh[2x4, unchanged]", _force_refresh, number, portal
+                ),
+            ]
+            await hass.async_stop(force=True)
+            return results
+
+    return _refresh
+
+
+def report(results: list[Result], baseline: dict[str, Any]) -> None:
+    """Print results next to the baseline"""
+    print(
+        f"{'operation':<40} {'mean ms':>9} {'min ms':>9} {'peak KiB':>9} "
+        f"{'blocks':>7} {'requests':>8} {'vs base':>8}"
+    )
+    for result in results:
+        base = baseline.get(result.name)
+        delta = (
+            f"{(result.wall_ms / base['wall_ms'] - 1) * 100:>+7.1f}%"
+            if base and base["wall_ms"]
+            else f"{'-':>8}"
+        )
+        print(
+            f"{result.name:<40} {result.wall_ms:>9.3f} {result.min_ms:>9.3f} "
+            f"{result.alloc_kib:>9.1f} {result.blocks:>7} {result.requests:>8.1f} {delta}"
+        )
+
+
+def regressions(
+    results: list[Result], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Operations slower than the baseline by more than tolerance, doing more requests
+    or missing from the baseline"""
+    found = []
+    for result in results:
+        if (base := baseline.get(result.name)) is None:
+            found.append(f"{result.name}: not in the baseline")
+            continue
+        if result.wall_ms > base["wall_ms"] * (1 + tolerance):
+            found.append(f"{result.name}: {base['wall_ms']:.3f} -> {result.wall_ms:.3f} ms")
+        if result.requests > base["requests"]:
+            found.append(f"{result.name}: {base['requests']} -> {result.requests} requests")
+    return found
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--number", type=int, default=20)
+    arg_parser.add_argument("--baseline", type=Path, default=BASELINE)
+    arg_parser.add_argument("--save-baseline", action="store_true")
+    arg_parser.add_argument("--check", action="store_true")
+    arg_parser.add_argument("--tolerance", type=float, default=0.2)
+    args = arg_parser.parse_args()
+    if args.check and not args.baseline.exists():
+        # без эталона сравнивать не с чем: проверка не должна проходить молча
+        arg_parser.error(f"{args.baseline} not found, record it with --save-baseline first")
+
+    logging.basicConfig(level=logging.ERROR)
+    with tempfile.TemporaryDirectory() as directory:
+        results = asyncio.run(run_suite(args.number, Path(directory)))
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    report(results, baseline)
+
+    if args.save_baseline:
+        args.baseline.write_text(
+            json.dumps({result.name: asdict(result) for result in results}, indent=2) + "\n"
+        )
+        print(f"baseline saved to {args.baseline}")
+    elif args.check and (found := regressions(results, baseline, args.tolerance)):
+        print("regressions:\n  " + "\n  ".join(found))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,25 @@ import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
-from .bcnn_api import BCNNApi
-from .const import DOMAIN, PLATFORMS, CONF_LOGIN, CONF_PASSWORD, CONF_ACCOUNT
+from .const import (
+    DOMAIN,
+    PLATFORMS,
+    CONF_LOGIN,
+    CONF_PASSWORD,
+    CONF_ACCOUNT,
+    CONF_ACCOUNTS,
+    CONF_ALL_ACCOUNTS,
+    CONF_BACKFILL_YEARS,
+    DEFAULT_BACKFILL_YEARS,
+    CONF_RATE_LIMIT,
+    CONF_MAX_IN_FLIGHT,
+    DEFAULT_RATE_LIMIT,
+    DEFAULT_MAX_IN_FLIGHT,
+)
+from .backfill import async_get_backfill
 from .coordinator import BCNNCoordinator
+from .outbox import async_get_outbox
+from .registry import async_acquire_api, async_release_api, get_limiter
 from .services import async_setup_services, async_unload_services
 
 _LOGGER = logging.getLogger(__name__)
@@ -18,7 +34,6 @@ _LOGGER = logging.getLogger(__name__)
 OPTIONS_SCHEMA = {
     vol.Required(CONF_LOGIN, msg="Login"): str,
     vol.Required(CONF_PASSWORD, msg="Password"): str,
-    vol.Required(CONF_ACCOUNT, msg="Account"): str,
 }
 
 
@@ -26,31 +41,99 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     """Set up Center-SBK from a config entry."""
 
     _LOGGER.info(["async_setup_entry", config_entry.data, config_entry.options])
-    bcnn_api = BCNNApi(
-        str(config_entry.data.get(CONF_LOGIN)),
-        str(config_entry.data.get(CONF_PASSWORD)),
+    login = str(config_entry.data.get(CONF_LOGIN))
+    get_limiter(hass).set_limits(
+        config_entry.entry_id,
+        config_entry.options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT),
+        config_entry.options.get(CONF_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT),
+    )
+    bcnn_api = await async_acquire_api(
+        hass, login, str(config_entry.data.get(CONF_PASSWORD))
     )
     _coordinator = BCNNCoordinator(
-        hass, bcnn_api=bcnn_api, account=str(config_entry.data.get(CONF_ACCOUNT))
+        hass,
+        bcnn_api=bcnn_api,
+        accounts=config_entry.data.get(CONF_ACCOUNTS, []),
+        all_accounts=config_entry.data.get(CONF_ALL_ACCOUNTS, False),
+        options=config_entry.options,
     )
 
-    await _coordinator.async_config_entry_first_refresh()
+    try:
+        await _coordinator.async_config_entry_first_refresh()
+    except Exception:
+        await async_release_api(hass, login)
+        get_limiter(hass).remove_limits(config_entry.entry_id)
+        raise
 
     hass.data.setdefault(DOMAIN, {})[config_entry.entry_id] = _coordinator
 
+    # readings queued before the restart can be delivered now
+    outbox = await async_get_outbox(hass)
+    for account in _coordinator.accounts:
+        outbox.async_publish(account)
+    outbox.async_schedule()
+
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
 
+    if years := config_entry.options.get(CONF_BACKFILL_YEARS, DEFAULT_BACKFILL_YEARS):
+        backfill = await async_get_backfill(hass)
+        config_entry.async_create_background_task(
+            hass,
+            backfill.async_run(_coordinator, list(_coordinator.accounts), years),
+            f"{DOMAIN} backfill {login}",
+        )
+
+    config_entry.async_on_unload(config_entry.add_update_listener(async_update_options))
+
     await async_setup_services(hass)
 
     return True
 
 
+async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
+    """Migrate old entry."""
+    _LOGGER.debug(
+        "Migrating configuration from version %s.%s",
+        config_entry.version,
+        config_entry.minor_version,
+    )
+
+    if config_entry.version > 2:
+        # This means the user has downgraded from a future version
+        return False
+
+    if config_entry.version == 1:
+        # one account per entry -> list of accounts of the login
+        data = {**config_entry.data}
+        data[CONF_ACCOUNTS] = [str(data.pop(CONF_ACCOUNT))]
+        data[CONF_ALL_ACCOUNTS] = False
+        hass.config_entries.async_update_entry(
+            config_entry, data=data, version=2, minor_version=1
+        )
+
+    _LOGGER.debug(
+        "Migration to configuration version %s.%s successful",
+        config_entry.version,
+        config_entry.minor_version,
+    )
+    return True
+
+
+async def async_update_options(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Reload the entry to apply new options."""
+    await hass.config_entries.async_reload(config_entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(
         config_entry, PLATFORMS
     ):
-        hass.data[DOMAIN].pop(config_entry.entry_id)
+        await hass.data[DOMAIN].pop(config_entry.entry_id).async_shutdown()
+        await async_release_api(hass, str(config_entry.data.get(CONF_LOGIN)))
+        get_limiter(hass).remove_limits(config_entry.entry_id)
+        if not hass.data[DOMAIN]:
+            (await async_get_outbox(hass)).async_cancel()
 
         await async_unload_services(hass)
 
@@ -0,0 +1,151 @@
+"""Backfill of Center-SBK chart history into long-term statistics."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from datetime import date
+from typing import Any
+
+from homeassistant.const import UnitOfVolume
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt
+
+from .const import (
+    DATA_BACKFILL,
+    DEVICE_NAME_FORMAT,
+    STORAGE_VERSION,
+    STORAGE_KEY_BACKFILL,
+    BACKFILL_CHUNK_MONTHS,
+    BACKFILL_REQUEST_INTERVAL,
+)
+from .coordinator import BCNNCoordinator
+from .history import Series, period_start, statistic_id
+from .parsers import parse_chart_data
+
+_LOGGER = logging.getLogger(__name__)
+
+# chart series measured in cubic meters, the rest are written without a unit
+WATER_SERIES_RE = re.compile(r"вод|хвс|гвс|water|м3|м³", re.I)
+# meter readings are totals already, only the monthly consumption is summed up
+READING_SERIES_RE = re.compile(r"показани|reading", re.I)
+
+CHECKPOINT_FIRST = "first"
+CHECKPOINT_NEXT = "next"
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month months after day"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class BCNNBackfill:
+    """Walks getChartData from the oldest period forward in bounded chunks.
+
+    The checkpoint of every account holds the first period written and the
+    first period not fetched yet, so an interrupted backfill resumes where it
+    stopped and a covered range is not requested again. The current month is
+    fetched again once it is closed. When the configured range grows, the
+    whole range is written again, as the sums of the later periods change.
+    """
+
+    def __init__(
+        self, store: Store[dict[str, Any]], checkpoints: dict[str, dict[str, str]]
+    ) -> None:
+        """Initialize the backfill."""
+        self._store = store
+        self.checkpoints = checkpoints
+
+    async def async_run(
+        self, coordinator: BCNNCoordinator, accounts: list[str], years: int
+    ) -> None:
+        """Backfill the accounts one by one"""
+        for account in accounts:
+            try:
+                await self._async_backfill_account(coordinator, account, years)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                # the checkpoint is kept, the next start continues from it
+                _LOGGER.warning("Backfill of %s stopped: %s", account, exc)
+
+    async def _async_backfill_account(
+        self, coordinator: BCNNCoordinator, account: str, years: int
+    ) -> None:
+        today = dt.now().date()
+        current = date(today.year, today.month, 1)
+        first = date(current.year - years, current.month, 1)
+        checkpoint = self.checkpoints.get(account)
+        # the range grew backward: an extension is saved only when it is complete,
+        # until then the later periods keep their old sums
+        extend = (
+            checkpoint is not None
+            and date.fromisoformat(checkpoint[CHECKPOINT_FIRST]) > first
+        )
+        if checkpoint is None or extend:
+            begin = first
+        elif (begin := date.fromisoformat(checkpoint[CHECKPOINT_NEXT])) >= current:
+            _LOGGER.debug("Backfill %s: %s - %s is already loaded", account, first, current)
+            return
+        else:
+            first = date.fromisoformat(checkpoint[CHECKPOINT_FIRST])
+
+        # rows left by an earlier backfill without a checkpoint are written again too
+        rebuild = checkpoint is None or extend
+        while begin <= current:
+            end = min(add_months(begin, BACKFILL_CHUNK_MONTHS - 1), current)
+            _LOGGER.debug("Backfill %s: %s - %s", account, begin, end)
+            payload = await coordinator.async_get_chart_data(account, begin, end)
+            written = await self._async_write(coordinator, account, payload, rebuild)
+            _LOGGER.debug("Backfill %s: %s statistics rows written", account, written)
+            rebuild = False
+
+            begin = add_months(end, 1)
+            if not extend or begin > current:
+                self.checkpoints[account] = {
+                    CHECKPOINT_FIRST: first.isoformat(),
+                    CHECKPOINT_NEXT: min(begin, current).isoformat(),
+                }
+                await self._store.async_save(self.checkpoints)
+            if begin <= current:
+                # rate limit: the portal is shared with the regular refresh
+                await asyncio.sleep(BACKFILL_REQUEST_INTERVAL.total_seconds())
+
+    @staticmethod
+    async def _async_write(
+        coordinator: BCNNCoordinator, account: str, payload: Any, rebuild: bool
+    ) -> int:
+        """Write chart points to statistics, one statistic per series"""
+        series: dict[str, Series] = {}
+        for point in parse_chart_data(payload):
+            water = WATER_SERIES_RE.search(point.series) is not None
+            series.setdefault(
+                statistic_id(account, "chart", point.series),
+                Series(
+                    f"{DEVICE_NAME_FORMAT.format(account)} {point.series}",
+                    UnitOfVolume.CUBIC_METERS if water else None,
+                    water and READING_SERIES_RE.search(point.series) is None,
+                    [],
+                ),
+            ).points.append((period_start(point.period), point.value))
+
+        written = 0
+        for stat_id, stat_series in series.items():
+            written += await coordinator.history.async_import(
+                stat_id, stat_series, rebuild
+            )
+        return written
+
+
+async def async_get_backfill(hass: HomeAssistant) -> BCNNBackfill:
+    """Get the backfill, loading checkpoints on first use"""
+
+    if (backfill := hass.data.get(DATA_BACKFILL)) is None:
+        store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY_BACKFILL)
+        checkpoints = await store.async_load() or {}
+        # another entry may have finished loading while we were waiting
+        backfill = hass.data.setdefault(DATA_BACKFILL, BCNNBackfill(store, checkpoints))
+    return backfill
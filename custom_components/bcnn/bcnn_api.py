@@ -1,103 +1,256 @@
+import asyncio
+import json
 import re
-from dataclasses import dataclass
+import time
 from datetime import datetime, timedelta, date
-from itertools import islice
+from contextlib import asynccontextmanager, nullcontext
+from functools import wraps
 from logging import getLogger
-from time import sleep
-from typing import Union, Tuple, Dict, Optional, List, Set, Any, Final
+from typing import Union, Tuple, Dict, Optional, List, Any, Final, Callable, Awaitable, AsyncIterator
 from pprint import pformat
+from urllib.parse import urlencode
 
+from aiohttp import ClientResponse, ClientSession
 from bs4 import BeautifulSoup
-from requests import Response, Session
-
-from custom_components.bcnn.helpers import convert_period_to_date
-
+from yarl import URL
+
+from custom_components.bcnn.helpers import parse_period
+from custom_components.bcnn.limiter import PortalLimiter
+from custom_components.bcnn.metrics import ApiMetrics, traced
+from custom_components.bcnn.models import DEFAULT_FORMATTER, DeviceInfo, MeterRegistry
+from custom_components.bcnn.parsers import (
+    CHARGES_FRAGMENT_RE,
+    READINGS_FRAGMENT_RE,
+    ParseCache,
+    fragment_digest,
+    parse_form_build_id,
+    parse_form_tokens,
+    parse_readings_page,
+)
+
+BASE_URL = "https://lk.bcnn.ru"
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
 HEADERS_HTML = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-    "Content-Type": "application/x-www-form-urlencoded",
     "User-Agent": USER_AGENT,
 }
 HEADERS_JSON = {
     "Accept": "application/json, text/plain, */*",
-    "Content-Type": "application/json",
     "User-Agent": USER_AGENT,
 }
+SESSION_COOKIE = "Drupal.visitor.autologout_login"
+SESSION_LIFETIME = 1800
+SESSION_RENEW_MARGIN = 120
+LOGIN_FORM_MARKER = 'value="user_login_form"'
+# Сколько секунд токены формы показаний считаются действительными для пропуска шагов
+FORM_TOKENS_LIFETIME = 300
+BILL_CHUNK_SIZE = 64 * 1024
+STAGE_FORM = "form"
+STAGE_SELECTED = "selected"
+STAGE_EDIT = "edit"
 LOGGER = getLogger(__name__)
 
 
-def format_number(number, total_digits_before=5, digits_after=2):
-    formatted_number = f"{number:0{total_digits_before + digits_after + 1}.{digits_after}f}"
-    return formatted_number
+class BCNNSessionExpired(Exception):
+    """Портал завершил сессию и вернул страницу входа."""
 
 
-@dataclass(unsafe_hash=True)
-class DeviceInfo:
-    account_number: str
-    device_type: str
-    device_number: str
-    repr_number: str
-    prev_value: str
-    cur_value: str
-    amount_water: str
-    new_value: str = None
-    formatter: tuple = (5, 5)
+def relogin_on_logout(func):
+    """Повторяет сценарий один раз после повторной авторизации,
+    если портал посреди него вернул страницу входа."""
 
-    def send_value(self):
-        return format_number(max(float(self.new_value or 0), float(self.cur_value or 0), float(self.prev_value or 0)),
-                             *[len(elem) for elem in self.formatter])
+    @wraps(func)
+    async def wrapper(self: "BCNNApi", *args, **kwargs):
+        try:
+            return await func(self, *args, **kwargs)
+        except BCNNSessionExpired:
+            LOGGER.info("Сессия завершена порталом, выполняется повторная авторизация.")
+            self.metrics.record_retry()
+            async with self._auth_lock:
+                await self.authenticate()
+            return await func(self, *args, **kwargs)
 
-
-def batched(iterable, n):
-    # batched('ABCDEFG', 3) → ABC DEF G
-    if n < 1:
-        raise ValueError("n must be at least one")
-    it = iter(iterable)
-    while batch := tuple(islice(it, n)):
-        yield batch
+    return wrapper
 
 
 class BCNNApi:
     VERSION: Final[str] = "0.0.1"
 
-    def __init__(self, login, password):
-        self._session = None
+    def __init__(
+            self,
+            session: ClientSession,
+            login,
+            password,
+            base_url: str = BASE_URL,
+            limiter: Optional[PortalLimiter] = None,
+    ):
+        self._session = session
         self.login = login
         self.password = password
-        self.base_url = "https://lk.bcnn.ru"
+        # другой адрес портала, например локальной заглушки tools/fake_portal
+        self.base_url = base_url.rstrip("/")
         self.form_build_id = None
         self.form_token = None
         self.start_session = None
-        self.devices: Dict[str, Set[DeviceInfo]] = {}
+        self.devices = MeterRegistry()
+        # form_build_id/form_token и выбранный на сервере ЛС общие для всех
+        # пользователей клиента, поэтому многошаговые сценарии выполняются под lock
+        self.lock = asyncio.Lock()
+        self._auth_lock = asyncio.Lock()
+        # Состояние на стороне портала: какая страница формы показаний открыта и для
+        # какого ЛС, когда получены токены, и на какой ЛС переключён getChartData
+        self._readings_account: Optional[str] = None
+        self._readings_stage: Optional[str] = None
+        self._tokens_received: float = 0
+        self._chart_account: Optional[str] = None
+        # Разобранные данные по хэшу исходного фрагмента. При совпадении хэша методы
+        # возвращают тот же объект, что и в прошлый раз: так вызывающий код узнаёт,
+        # что данные не изменились
+        self.parse_cache = ParseCache()
+        self.on_authenticated: Optional[Callable[[], None]] = None
+        # Время, объём и повторы запросов по шагам, см. metrics.py
+        self.metrics = ApiMetrics()
+        # Общий для всех клиентов ограничитель частоты и числа одновременных запросов
+        self.limiter = limiter
 
     def _parse_account_number(self, account: Union[str, int]) -> int:
         """Извлекает все цифры из номера лицевого счёта.
 
         Возвращает получившееся число. Если цифр нет, возбуждает ValueError.
         """
-        import re
         digits = re.sub(r"\D", "", str(account))
         if not digits:
             raise ValueError(f"Номер лицевого счёта '{account}' не содержит цифр")
         return int(digits)
 
-    @property
-    def session(self) -> Session:
-        if not self._session or self.session_is_expired():
-            self._session = Session()
-            self._session.headers = HEADERS_HTML
-            self.authenticate()
-        return self._session
+    async def _request(
+            self, method: str, path: str, *, auth: bool = True, **kwargs
+    ) -> ClientResponse:
+        """Выполняет запрос к порталу и полностью вычитывает тело ответа.
+
+        Тело кэшируется aiohttp, поэтому ``text()``/``json()``/``read()`` можно
+        вызывать уже после освобождения соединения.
+
+        Если портал вернул страницу входа, возбуждает BCNNSessionExpired: ответ
+        большинства страниц зависит от выбранного в сессии ЛС, поэтому сценарий
+        целиком повторяет relogin_on_logout, а не этот запрос.
+        """
+        async with self._stream(method, path, auth=auth, **kwargs) as response:
+            await response.read()
+        return response
+
+    @asynccontextmanager
+    async def _stream(
+            self, method: str, path: str, *, auth: bool = True, **kwargs
+    ) -> AsyncIterator[ClientResponse]:
+        """Выполняет запрос к порталу; тело ответа вызывающий читает внутри блока.
+
+        Авторизация, место в ограничителе, замеры и проверка страницы входа те же,
+        что у _request. Страницы html вычитываются целиком до проверки, остальные
+        ответы (например, pdf счёта) можно читать частями.
+        """
+        if auth and self.session_is_expired():
+            async with self._auth_lock:
+                if self.session_is_expired():
+                    await self.authenticate()
+        kwargs.setdefault("headers", HEADERS_HTML)
+        async with self._slot() as queued:
+            started = time.perf_counter()
+            async with self._session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+                response.raise_for_status()
+                try:
+                    if auth and response.content_type == "text/html" and self._is_login_page(
+                            response, await response.read()
+                    ):
+                        self.start_session = None
+                        raise BCNNSessionExpired(path)
+                    yield response
+                finally:
+                    self.metrics.record_request(
+                        time.perf_counter() - started,
+                        self._payload_size(kwargs),
+                        response.content.total_bytes,
+                        queued,
+                    )
+
+    def _slot(self):
+        """Место в общем ограничителе запросов; без ограничителя запрос выполняется сразу."""
+        if self.limiter is None:
+            return nullcontext(0.0)
+        return self.limiter.slot()
+
+    @staticmethod
+    def _payload_size(kwargs: Dict[str, Any]) -> int:
+        """Примерный размер тела запроса для замеров."""
+        if isinstance(data := kwargs.get("data"), dict):
+            return len(urlencode(data).encode())
+        if (json_data := kwargs.get("json")) is not None:
+            return len(json.dumps(json_data).encode())
+        return 0
+
+    @staticmethod
+    def _is_login_page(response: ClientResponse, body: bytes) -> bool:
+        """Дешёвая проверка: вместо запрошенной страницы портал вернул форму входа."""
+        return response.content_type == "text/html" and LOGIN_FORM_MARKER.encode() in body
+
+    @traced("probe")
+    async def async_probe(self) -> None:
+        """Дешёвая проверка доступности портала: страница входа без авторизации."""
+        await self._request("GET", "/node/4", auth=False)
+
+    async def async_renew_session(self) -> None:
+        """Заранее продлевает сессию, не прерывая выполняющиеся сценарии."""
+        async with self.lock:
+            async with self._auth_lock:
+                await self.authenticate()
+
+    def session_expires_in(self) -> float:
+        """Секунды до истечения сессии (0, если она уже истекла)."""
+        if not self.start_session:
+            return 0
+        return max(0.0, self.start_session + SESSION_LIFETIME - datetime.now().timestamp())
+
+    async def async_close(self) -> None:
+        """Закрывает HTTP-сессию клиента."""
+        await self._session.close()
 
     def session_is_expired(self):
         if (
                 self.start_session
-                and self.start_session + 1800 > datetime.now().timestamp()
+                and self.start_session + SESSION_LIFETIME > datetime.now().timestamp()
         ):
             return False
         return True
 
-    def get_accounts(self) -> dict:
+    def export_session(self) -> Optional[Dict[str, Any]]:
+        """Возвращает cookies текущей сессии для сохранения между перезапусками."""
+        if self.session_is_expired():
+            return None
+        cookies = self._session.cookie_jar.filter_cookies(URL(self.base_url))
+        return {
+            "cookies": {name: morsel.value for name, morsel in cookies.items()},
+            "start_session": self.start_session,
+        }
+
+    def restore_session(self, data: Optional[Dict[str, Any]]) -> bool:
+        """Восстанавливает сохранённую сессию, если она ещё не истекла.
+
+        Проверка выполняется локально по метке Drupal.visitor.autologout_login,
+        без запросов к порталу.
+        """
+        if not data or SESSION_COOKIE not in data.get("cookies", {}):
+            return False
+        start_session = data.get("start_session")
+        if not start_session or start_session + SESSION_LIFETIME <= datetime.now().timestamp():
+            return False
+        self._session.cookie_jar.update_cookies(data["cookies"], URL(self.base_url))
+        self.start_session = int(start_session)
+        LOGGER.info("Восстановлена сохранённая сессия.")
+        return True
+
+    @traced("accounts")
+    @relogin_on_logout
+    async def get_accounts(self) -> dict:
         """
         return:
         {'code': 0,
@@ -109,47 +262,109 @@ class BCNNApi:
         """
 
         json_data = {"data": {}, "function": "getAccountInfo"}
-        response: Response = self.session.post(
-            f"{self.base_url}/api/v1/cabinet/querydata",
+        response = await self._request(
+            "POST",
+            "/api/v1/cabinet/querydata",
             headers=HEADERS_JSON,
             json=json_data,
         )
-        response.raise_for_status()
-        if response.json().get("errors"):
-            LOGGER.warning(response.json().get("errors"))
-            raise
+        data = await response.json(content_type=None)
+        if data.get("errors"):
+            LOGGER.warning(data.get("errors"))
+            raise Exception(data.get("errors"))
 
-        return response.json()
+        return data
+
+    @traced("login")
+    async def authenticate(self):
+        # Вход всегда начинается без cookies прежней сессии: иначе старая cookie
+        # SESSION_COOKIE выдаёт неудачный вход за успешный
+        previous = self.start_session
+        self.start_session = None
+        self._session.cookie_jar.clear()
 
-    def authenticate(self):
         # Получаем страницу авторизации и извлекаем form_build_id
-        auth_page = self._session.get(f"{self.base_url}/node/4?destination=/node/4")
-        soup = BeautifulSoup(auth_page.text, "html.parser")
-        self.form_build_id = soup.find("input", {"name": "form_build_id"})["value"]
+        auth_page = await self._request("GET", "/node/4?destination=/node/4", auth=False)
+        form_build_id = parse_form_build_id(await auth_page.text())
 
         # Отправляем данные авторизации
         auth_data = {
             "name": self.login,
             "pass": self.password,
-            "form_build_id": self.form_build_id,
+            "form_build_id": form_build_id,
             "form_id": "user_login_form",
             "op": "Войти"
         }
-        self._session.post(f"{self.base_url}/node/4?destination=/node/4", data=auth_data)
-        if "Drupal.visitor.autologout_login" not in self._session.cookies:
+        await self._request("POST", "/node/4?destination=/node/4", auth=False, data=auth_data)
+        cookies = self._session.cookie_jar.filter_cookies(URL(self.base_url))
+        if SESSION_COOKIE not in cookies:
             raise Exception("Не удалось авторизоваться.")
-        self.start_session = int(self._session.cookies.get("Drupal.visitor.autologout_login"))
+        start_session = int(cookies[SESSION_COOKIE].value)
+        # отметка портала с точностью до секунды, поэтому вход в ту же секунду допустим
+        if previous and start_session < previous:
+            raise Exception("Не удалось авторизоваться: портал вернул прежнюю сессию.")
+        self.start_session = start_session
+        self._reset_context()
+        self.metrics.record_login()
         LOGGER.info("Успешная авторизация.")
+        if self.on_authenticated is not None:
+            self.on_authenticated()
+
+    def _reset_context(self) -> None:
+        """Забывает состояние портала, например после новой авторизации."""
+        self._readings_account = None
+        self._readings_stage = None
+        self._chart_account = None
+
+    def _set_readings_stage(self, account: Optional[str], stage: Optional[str]) -> None:
+        self._readings_account = account
+        self._readings_stage = stage
+        if account is not None and account != self._chart_account:
+            # неизвестно, переключает ли форма показаний ЛС для /payments, поэтому считаем, что да
+            self._chart_account = None
+
+    def _readings_stage_is(self, account: str, stage: str) -> bool:
+        return (
+                self._readings_account == account
+                and self._readings_stage == stage
+                and datetime.now().timestamp() - self._tokens_received < FORM_TOKENS_LIFETIME
+                and not self.session_is_expired()
+        )
+
+    def _update_form_tokens(self, html: str) -> None:
+        form_build_id, form_token = parse_form_tokens(html)
+        if form_build_id is None or form_token is None:
+            raise Exception("На странице нет токенов формы передачи показаний")
+        self.form_build_id = form_build_id
+        self.form_token = form_token
+        self._tokens_received = datetime.now().timestamp()
+
+    async def _ensure_account_selected(self, account: str) -> None:
+        """Открывает форму показаний и выбирает ЛС, если портал ещё не в этом состоянии.
+
+        Открытая форма ввода того же ЛС тоже считается выбором: из неё портал
+        принимает и «Изменить показания», поэтому повторное обновление ЛС
+        обходится одним запросом.
+        """
+        if self._readings_stage_is(account, STAGE_SELECTED) or self._readings_stage_is(
+                account, STAGE_EDIT
+        ):
+            LOGGER.debug("ЛС %s уже выбран в форме показаний", account)
+            return
+        await self.navigate_to_readings()
+        await self.select_account(account)
 
-    def navigate_to_readings(self):
+    @traced("readings_form")
+    async def navigate_to_readings(self):
         # Переход на страницу передачи показаний
-        response = self.session.get(f"{self.base_url}/readings")
-        soup = BeautifulSoup(response.text, "html.parser")
-        self.form_build_id = soup.find("input", {"name": "form_build_id"})["value"]
-        self.form_token = soup.find("input", {"name": "form_token"})["value"]
+        self._set_readings_stage(None, None)
+        response = await self._request("GET", "/readings")
+        self._update_form_tokens(await response.text())
+        self._set_readings_stage(None, STAGE_FORM)
         LOGGER.info("Загружена форма передачи показаний.")
 
-    def select_account(self, account_number):
+    @traced("select_account")
+    async def select_account(self, account_number):
         # Смена лицевого счета
         account_data = {
             "account_number": account_number,
@@ -158,13 +373,14 @@ class BCNNApi:
             "form_token": self.form_token,
             "form_id": "readings_form"
         }
-        response = self.session.post(f"{self.base_url}/readings", data=account_data)
-        soup = BeautifulSoup(response.text, "html.parser")
-        self.form_build_id = soup.find("input", {"name": "form_build_id"})["value"]
-        self.form_token = soup.find("input", {"name": "form_token"})["value"]
+        self._set_readings_stage(None, None)
+        response = await self._request("POST", "/readings", data=account_data)
+        self._update_form_tokens(await response.text())
+        self._set_readings_stage(str(account_number), STAGE_SELECTED)
         LOGGER.info(f"Аккаунт {account_number} выбран.")
 
-    def change_readings_form(self, account_number):
+    @traced("edit_form")
+    async def change_readings_form(self, account_number) -> str:
         # Переход на ввод показаний
         readings_data = {
             "account_number": account_number,
@@ -173,16 +389,17 @@ class BCNNApi:
             "form_token": self.form_token,
             "form_id": "readings_form"
         }
-        response = self.session.post(f"{self.base_url}/readings", data=readings_data)
-        soup = BeautifulSoup(response.text, "html.parser")
-        self.form_build_id = soup.find("input", {"name": "form_build_id"})["value"]
-        self.form_token = soup.find("input", {"name": "form_token"})["value"]
+        self._set_readings_stage(None, None)
+        response = await self._request("POST", "/readings", data=readings_data)
+        html = await response.text()
+        self._update_form_tokens(html)
+        self._set_readings_stage(str(account_number), STAGE_EDIT)
         LOGGER.info("Форма для ввода показаний загружена.")
-        return response
-
-    def enter_readings(self, account_number, readings):
+        return html
 
-        self.change_readings_form(account_number)
+    @traced("send_form")
+    async def enter_readings(self, account_number, readings):
+        """Передаёт показания из открытой формы ввода (после change_readings_form)."""
 
         # Передаем показания
         final_data = {
@@ -194,97 +411,137 @@ class BCNNApi:
             "form_token": self.form_token,
             "form_id": "readings_form"
         }
-        response = self.session.post(f"{self.base_url}/readings", data=final_data)
+        self._set_readings_stage(None, None)
+        response = await self._request("POST", "/readings", data=final_data)
         LOGGER.debug("sent data %s", pformat(readings))
-        if "распечатать" in response.text:
+        if "распечатать" in await response.text():
             LOGGER.info("Показания успешно переданы.")
-        else:
-            LOGGER.warning("Ошибка при передаче показаний.")
+            return True
+        LOGGER.warning("Ошибка при передаче показаний.")
+        return False
 
-    def get_information_on_water_meters(self, account: Union[str, int]) -> List[Dict[str, str]]:
+    @traced("readings")
+    @relogin_on_logout
+    async def get_information_on_water_meters(self, account: Union[str, int]) -> List[Dict[str, str]]:
         """
         Получение информации о водомерах для конкретного аккаунта и передача новых показаний.
 
         :param account: Номер аккаунта
         :return: Список словарей с информацией о водомерах
         """
-        self.navigate_to_readings()
-        self.select_account(str(account))
-        response = self.change_readings_form(str(account))
-        if not response.ok:
-            raise Exception("Не удалось обновить данные формы после отправки")
-
-        # Парсинг ответа для извлечения информации о водомерах
-        soup = BeautifulSoup(response.text, "lxml")
+        await self._ensure_account_selected(str(account))
+        html = await self.change_readings_form(str(account))
+
+        digest = fragment_digest(html, READINGS_FRAGMENT_RE)
+        if (water_meters := self.parse_cache.get(("readings", str(account)), digest)) is not None:
+            LOGGER.debug("Показания ЛС %s не изменились", account)
+            return water_meters
+
         water_meters = []
-        for row in soup.find_all("tr"):
-            columns = row.find_all("td")
-            if columns:
-                device_type = columns[0].text.strip()
-                device_number = columns[1].text.strip()
-                prev_value = columns[3].text.strip()
-                cur_value = columns[4].text.strip()
-                amount_water = columns[5].text.strip()
-                input_tag = row.find("input", {"name": re.compile(".+")})
-                repr_number = input_tag["name"] if input_tag else None
-                cabinet_change = row.find('input', {'onchange': re.compile('.+')})
-                pattern = r'cabinet_change\((\d+\.\d+)'
-                formatter = tuple(re.match(pattern, cabinet_change["onchange"]).group(1).split("."))
-                water_meters.append(
-                    {
-                        "device_type": device_type,
-                        "device_number": device_number,
-                        "prev_value": prev_value,
-                        "cur_value": cur_value,
-                        "amount_water": amount_water,
-                        "repr_number": repr_number
-                    }
-                )
-                self.devices.setdefault(str(account), set()).add(
-                    DeviceInfo(account, device_type, device_number, repr_number, prev_value, cur_value, amount_water,
-                               formatter=formatter)
+        devices = []
+        with self.metrics.parsing():
+            for row in parse_readings_page(html).meters:
+                water_meters.append(row.as_dict())
+                devices.append(
+                    DeviceInfo(str(account), row.device_type, row.device_number, row.repr_number, row.prev_value,
+                               row.cur_value, row.amount_water, formatter=row.formatter or DEFAULT_FORMATTER)
                 )
-        return water_meters
+        self.devices.update_account(str(account), devices)
+        return self.parse_cache.put(("readings", str(account)), digest, water_meters)
 
-    def send_meter_readings(
+    @traced("send_readings")
+    @relogin_on_logout
+    async def send_meter_readings(
             self,
             account: Union[str, int],
             readings: Optional[Tuple[Tuple[str, str], ...]] = None,
-    ):
+    ) -> Dict[str, str]:
+        """
+        Передача показаний без ожидания их появления на портале.
+
+        :return: Отправленные значения по номерам счётчиков, для проверки через
+            readings_accepted
+        """
         if not readings:
             readings = tuple()
 
         for device_number, value in readings:
             self.add_meter_reading(account, device_number, value)
 
-        self.navigate_to_readings()
-        self.select_account(str(account))  # Подставьте нужный номер ЛС
+        if self._readings_stage_is(str(account), STAGE_EDIT):
+            # форма ввода для этого ЛС осталась открытой после обновления данных
+            LOGGER.debug("Форма ввода показаний ЛС %s уже открыта", account)
+        else:
+            await self._ensure_account_selected(str(account))
+            await self.change_readings_form(str(account))
         readings = {
             device.repr_number: device.send_value()
-            for device in self.devices[account]
+            for device in self.devices.account_devices(account)
+        }
+        if not await self.enter_readings(str(account), readings):
+            raise Exception("Портал не принял показания")
+
+        return {
+            device.device_number: device.send_value()
+            for device in self.devices.account_devices(account)
         }
-        self.enter_readings(str(account), readings)
-        sleep(30)
-        response = self.session.get(f"{self.base_url}/readings")
-        LOGGER.debug("response %s", response.text)
 
-        return "Показания успешно переданы"
+    @staticmethod
+    def readings_accepted(
+            water_meters: List[Dict[str, str]], sent: Dict[str, str]
+    ) -> Dict[str, str]:
+        """Возвращает показания из sent, которые уже отображаются на портале как текущие."""
+        accepted = {}
+        for meter in water_meters:
+            device_number = meter.get("device_number")
+            if device_number not in sent:
+                continue
+            try:
+                if abs(float(meter.get("cur_value") or 0) - float(sent[device_number])) < 1e-3:
+                    accepted[device_number] = meter["cur_value"]
+            except ValueError:
+                continue
+        return accepted
 
-    def get_address(self, account: Union[str, int]):
+    @traced("address")
+    @relogin_on_logout
+    async def get_address(self, account: Union[str, int]):
         """Получить адрес по лицевому счёту."""
         occ = self._parse_account_number(account)
         json_data = {"function": "getAddress", "data": {"occ": occ}}
-        response = self.session.post(f"{self.base_url}/api/v1/cabinet/querydata", json=json_data)
-        response.raise_for_status()
-        return response.json()
+        response = await self._request(
+            "POST", "/api/v1/cabinet/querydata", headers=HEADERS_JSON, json=json_data
+        )
+        digest = fragment_digest(await response.text())
+        if (address := self.parse_cache.get(("address", occ), digest)) is not None:
+            return address
+        return self.parse_cache.put(("address", occ), digest, await response.json(content_type=None))
+
+    async def _ensure_chart_account(self, account: Union[str, int]) -> None:
+        """Переключает ЛС для /payments и /to_payment_pdf, если он ещё не выбран."""
+        if self._chart_account == str(account) and not self.session_is_expired():
+            LOGGER.debug("ЛС %s уже выбран для начислений", account)
+            return
+        await self.get_chart_data(account)
+
+    @traced("chart")
+    @relogin_on_logout
+    async def get_chart_data(
+            self,
+            account: Union[str, int],
+            begin: Optional[date] = None,
+            end: Optional[date] = None,
+    ):
+        """Данные графика за периоды с begin по end (по умолчанию прошлый и текущий месяцы).
 
-    def get_chart_data(self, account: Union[str, int]):
+        Запрос также выбирает ЛС для /payments и /to_payment_pdf.
+        """
         today = date.today()
         prev_month = today - timedelta(days=today.day)
 
-        end_period = today.strftime("%Y%m")
+        end_period = (end or today).strftime("%Y%m")
 
-        begin_period = prev_month.strftime("%Y%m")
+        begin_period = (begin or prev_month).strftime("%Y%m")
         occ = self._parse_account_number(account)
         json_data = {
             "function": "getChartData",
@@ -294,74 +551,104 @@ class BCNNApi:
                 "endPeriod": end_period,
             },
         }
-        response = self.session.post(f"{self.base_url}/api/v1/cabinet/querydata", json=json_data)
-        return response.json()
+        self._chart_account = None
+        response = await self._request(
+            "POST", "/api/v1/cabinet/querydata", headers=HEADERS_JSON, json=json_data
+        )
+        self._chart_account = str(account)
+        if self._readings_account not in (None, str(account)):
+            self._set_readings_stage(None, None)
+        return await response.json(content_type=None)
 
     def add_meter_reading(
             self, account: Union[str, int], device_number: str, value: str
     ):
-        for device in self.devices.get(account, set()):
-            if device_number != device.device_number:
-                continue
+        if (device := self.devices.get(account, device_number)) is not None:
             device.new_value = value
 
-    def get_bill(self, account: Union[str, int]) -> Response.content:
-        """Getting pdf bill"""
-        self.get_chart_data(account)
-
-        response = self.session.get(f"{self.base_url}/to_payment_pdf")
-        return response.content
-
-    def get_charges(self, account: Union[str, int]) -> List[Dict[str, Any]]:
-        self.get_chart_data(account)
-
-        response = self.session.get(f"{self.base_url}/payments")
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Находим таблицу с начислениями по ее классу или другим уникальным атрибутам
-        table = soup.find("table", {"data-drupal-selector": "edit-table1"})
+    @traced("bill")
+    @relogin_on_logout
+    async def download_bill(
+            self, account: Union[str, int], write: Callable[[bytes], Awaitable[Any]]
+    ) -> int:
+        """Скачивает pdf счёта частями по BILL_CHUNK_SIZE, не держа его в памяти целиком.
 
-        # Создаем список для хранения данных
-        data = []
-        translation_mapper = {
-            "Период / Услуга": "period_or_service",
-            "Входящее сальдо": "opening_balance",
-            "Начислено": "accrued",
-            "Оплачено": "paid",
-            "К оплате": "due_payment",
-        }
-
-        column_names = [
-            translation_mapper.get(elem.text.strip(), elem.text.strip())
-            for elem in table.find_all("tr")[0].find_all("th")
-            if elem
-        ]
-        LOGGER.debug("Column names: %s", column_names)
-        count_rows = len(table.find_all("tr")[1:])
-
-        for batch in batched(table.find_all("tr")[1:], int(count_rows / 3)):
-            period = {}
-            first_row = [elem.text.strip() for elem in batch[0].find_all("td")]
-            current_period = dict(zip(column_names, first_row))
-            period_col = next(
-                (k for k, v in current_period.items() if convert_period_to_date(v) != date.today()),
-                None
-            )
-            if period_col:
-                period["period"] = convert_period_to_date(current_period.pop(period_col))
-            period.update(current_period)
-
-            for row in batch[1:]:
+        Каждая часть передаётся в ``write``, возвращается размер счёта в байтах.
+        """
+        await self._ensure_chart_account(account)
+
+        size = 0
+        async with self._stream("GET", "/to_payment_pdf") as response:
+            if response.content_type == "text/html":
+                raise ValueError("Портал вернул страницу вместо счёта")
+            async for chunk in response.content.iter_chunked(BILL_CHUNK_SIZE):
+                await write(chunk)
+                size += len(chunk)
+        return size
+
+    @traced("payments")
+    @relogin_on_logout
+    async def get_charges(self, account: Union[str, int]) -> List[Dict[str, Any]]:
+        await self._ensure_chart_account(account)
+
+        response = await self._request("GET", "/payments")
+        html = await response.text()
+        digest = fragment_digest(html, CHARGES_FRAGMENT_RE)
+        if (data := self.parse_cache.get(("charges", str(account)), digest)) is not None:
+            LOGGER.debug("Начисления ЛС %s не изменились", account)
+            return data
+
+        with self.metrics.parsing():
+            # Разбираем только фрагмент с таблицей начислений, если он найден
+            fragment = CHARGES_FRAGMENT_RE.search(html)
+            soup = BeautifulSoup(fragment.group() if fragment else html, "html.parser")
+
+            # Находим таблицу с начислениями по ее классу или другим уникальным атрибутам
+            table = soup.find("table", {"data-drupal-selector": "edit-table1"})
+
+            # Создаем список для хранения данных
+            data = []
+            translation_mapper = {
+                "Период / Услуга": "period_or_service",
+                "Входящее сальдо": "opening_balance",
+                "Начислено": "accrued",
+                "Оплачено": "paid",
+                "К оплате": "due_payment",
+            }
+
+            column_names = [
+                translation_mapper.get(elem.text.strip(), elem.text.strip())
+                for elem in table.find_all("tr")[0].find_all("th")
+                if elem
+            ]
+            LOGGER.debug("Column names: %s", column_names)
+
+            # Строка периода открывает группу, следующие за ней строки — услуги этого периода
+            for row in table.find_all("tr")[1:]:
                 columns = [elem.text.strip() for elem in row.find_all("td")]
-                period.setdefault("services", []).append(
-                    dict(zip(column_names, columns))
+                if not columns:
+                    continue
+                current_row = dict(zip(column_names, columns))
+                period_col = next(
+                    (k for k, v in current_row.items() if parse_period(v) is not None),
+                    None
                 )
-            data.append(period)
-        return data
-
-    def get_current_payment(self, account: Union[str, int]) -> dict:
-        payments = self.get_charges(account)
+                if period_col:
+                    period = {"period": parse_period(current_row.pop(period_col))}
+                    period.update(current_row)
+                    data.append(period)
+                elif data:
+                    data[-1].setdefault("services", []).append(current_row)
+        return self.parse_cache.put(("charges", str(account)), digest, data)
+
+    async def get_current_payment(self, account: Union[str, int]) -> dict:
+        payments = await self.get_charges(account)
         LOGGER.debug(payments)
+        return self.current_payment(payments)
+
+    @staticmethod
+    def current_payment(payments: List[Dict[str, Any]]) -> dict:
+        """Начисления за последний период из результата get_charges."""
         if not payments:
             return {}
         res = list(
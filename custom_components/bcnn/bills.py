@@ -0,0 +1,118 @@
+"""Downloaded bills cached on disk by account and billing period."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from datetime import date
+from pathlib import Path
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_BILLS, BILL_CACHE_MAX_FILES, BILL_CACHE_MAX_BYTES
+from .coordinator import BCNNCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _evict(directory: Path, max_files: int, max_bytes: int) -> list[Path]:
+    """Remove least recently used bills above the count and size limits"""
+    files = sorted(
+        (entry for entry in directory.glob("*.pdf") if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    kept_bytes = 0
+    removed: list[Path] = []
+    for index, entry in enumerate(files):
+        kept_bytes += entry.stat().st_size
+        # the newest bill is always kept, even if it alone exceeds the size limit
+        if index > 0 and (index >= max_files or kept_bytes > max_bytes):
+            entry.unlink(missing_ok=True)
+            removed.append(entry)
+    return removed
+
+
+class BCNNBillCache:
+    """Bills are streamed to disk once and then served from the cache."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache."""
+        self.hass = hass
+        self.directory = Path(hass.config.path(DOMAIN, "bills"))
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def path(self, account: str, period: date | None) -> Path:
+        """Get cache path of the bill, a bill of unknown period is never served from the cache"""
+        if period is None:
+            return self.directory / f"bill_{account}.pdf"
+        return self.directory / f"bill_{account}_{period:%Y-%m}.pdf"
+
+    async def async_get(
+        self, coordinator: BCNNCoordinator, account: str
+    ) -> tuple[Path, date | None]:
+        """Get the bill path and period, downloading the bill if it is not cached yet
+
+        The cache is looked up by the period known from the last refresh, while a
+        downloaded bill is stored under the period the portal reports with it.
+        """
+        async with self._locks.setdefault(account, asyncio.Lock()):
+            if (period := coordinator.bill_period(account)) is not None:
+                path = self.path(account, period)
+                if await self.hass.async_add_executor_job(self._touch, path):
+                    _LOGGER.debug("Bill %s is served from the cache", path.name)
+                    return path, period
+
+            path, period = await self._async_download(coordinator, account)
+            removed = await self.hass.async_add_executor_job(
+                _evict, self.directory, BILL_CACHE_MAX_FILES, BILL_CACHE_MAX_BYTES
+            )
+            if removed:
+                _LOGGER.debug("Evicted bills: %s", [entry.name for entry in removed])
+        return path, period
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        """Mark the cached bill as recently used, False if it is not cached"""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    async def _async_download(
+        self, coordinator: BCNNCoordinator, account: str
+    ) -> tuple[Path, date | None]:
+        """Stream the bill to a temporary file, file operations run in the executor"""
+        tmp_path = self.directory / f"bill_{account}.part"
+
+        def _open():
+            tmp_path.parent.mkdir(parents=True, exist_ok=True)
+            return tmp_path.open("wb")
+
+        file = await self.hass.async_add_executor_job(_open)
+        try:
+            size, period = await coordinator.async_download_bill(
+                account,
+                lambda chunk: self.hass.async_add_executor_job(file.write, chunk),
+            )
+            await self.hass.async_add_executor_job(file.close)
+            if not size:
+                raise ValueError("Empty bill")
+            path = self.path(account, period)
+            # the bill appears in the cache only when it is complete
+            await self.hass.async_add_executor_job(tmp_path.replace, path)
+        except BaseException:
+            await self.hass.async_add_executor_job(file.close)
+            await self.hass.async_add_executor_job(tmp_path.unlink, True)
+            raise
+        _LOGGER.debug("Bill %s downloaded, %s bytes", path.name, size)
+        return path, period
+
+
+def get_bill_cache(hass: HomeAssistant) -> BCNNBillCache:
+    """Get the bill cache"""
+    if (cache := hass.data.get(DATA_BILLS)) is None:
+        cache = hass.data[DATA_BILLS] = BCNNBillCache(hass)
+    return cache
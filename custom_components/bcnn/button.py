@@ -12,7 +12,7 @@ from homeassistant.components.button import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import ATTR_DEVICE_ID
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity import EntityCategory, async_generate_entity_id
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.util import slugify
@@ -78,14 +78,15 @@ class BCNNButtonEntity(BCNNBaseCoordinatorEntity, ButtonEntity):
         self,
         coordinator: BCNNCoordinator,
         entity_description: BCNNButtonEntityDescription,
+        account: str,
     ) -> None:
         """Initialize the Entity"""
-        super().__init__(coordinator, entity_description)
+        super().__init__(coordinator, entity_description, account)
         self._attr_unique_id = slugify(
             "_".join(
                 [
                     DOMAIN,
-                    coordinator.account,
+                    account,
                     self.entity_description.key,
                 ]
             )
@@ -112,10 +113,21 @@ async def async_setup_entry(
     """Set up a config entry."""
 
     coordinator: BCNNCoordinator = hass.data[DOMAIN][entry.entry_id]
-
-    entities: list[BCNNButtonEntity] = [
-        BCNNButtonEntity(coordinator, entity_description)
-        for entity_description in BUTTON_DESCRIPTIONS
-    ]
-
-    async_add_entities(entities, True)
+    known_accounts: set[str] = set()
+
+    @callback
+    def _async_add_new_entities(update_before_add: bool = False) -> None:
+        """Add buttons for accounts that appeared since the last update"""
+        entities: list[BCNNButtonEntity] = [
+            BCNNButtonEntity(coordinator, entity_description, account)
+            for account in (coordinator.data or {})
+            if account not in known_accounts
+            for entity_description in BUTTON_DESCRIPTIONS
+        ]
+        known_accounts.update(coordinator.data or {})
+
+        if entities:
+            async_add_entities(entities, update_before_add)
+
+    _async_add_new_entities(True)
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_new_entities))
@@ -1,22 +1,39 @@
 import logging
-from functools import partial
 from typing import Any
 
 import voluptuous as vol
 from homeassistant.config_entries import (
+    ConfigEntry,
     ConfigFlow,
+    OptionsFlow,
 )
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
 
 from custom_components.bcnn.bcnn_api import BCNNApi
 from .const import (
     DOMAIN,
     CONF_LOGIN,
     CONF_PASSWORD,
-    CONF_ACCOUNT,
+    CONF_ACCOUNTS,
+    CONF_ALL_ACCOUNTS,
+    CONF_INFO_TTL,
+    CONF_PAYMENT_TTL,
+    CONF_READINGS_TTL,
+    DEFAULT_INFO_TTL,
+    DEFAULT_PAYMENT_TTL,
+    DEFAULT_READINGS_TTL,
+    CONF_BACKFILL_YEARS,
+    DEFAULT_BACKFILL_YEARS,
+    CONF_RATE_LIMIT,
+    CONF_MAX_IN_FLIGHT,
+    DEFAULT_RATE_LIMIT,
+    DEFAULT_MAX_IN_FLIGHT,
 )
+from .registry import get_limiter
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,50 +43,78 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
     """
+    # own session with its own cookie jar, so that the check does not log out the integration
+    bcnn = BCNNApi(
+        async_create_clientsession(hass),
+        login=data[CONF_LOGIN],
+        password=data[CONF_PASSWORD],
+        limiter=get_limiter(hass),
+    )
     try:
-        bcnn = BCNNApi(login=data[CONF_LOGIN], password=data[CONF_PASSWORD])
-
         _LOGGER.info("Connecting to Center-SBK")
-        _data = await hass.async_add_executor_job(partial(bcnn.get_accounts))
-
-        # извлекаем только цифры из введённого номера
-        account_str = str(data[CONF_ACCOUNT])
-        account_digits = "".join(ch for ch in account_str if ch.isdigit())
-        if not account_digits:
-            raise ValueError("Номер лицевого счёта должен содержать хотя бы одну цифру.")
-        account_int = int(account_digits)
+        _data = await bcnn.get_accounts()
 
-        # проверяем наличие номера в полученном списке
         accounts = _data.get("data", {}).get("accountInfo", {}).get("accounts", [])
-        if account_int not in accounts:
-            raise ValueError(f"Лицевой счёт {account_str} не найден среди доступных в личном кабинете")
+        if not accounts:
+            raise ValueError("В личном кабинете нет лицевых счетов")
     except Exception as exc:
         _LOGGER.warning("Failed to connect to Center-SBK with error %s", exc)
         raise exc
+    finally:
+        await bcnn.async_close()
 
-    return {"title": f"{data[CONF_LOGIN]}({str(data[CONF_ACCOUNT])})".lower()}
+    return {
+        "title": str(data[CONF_LOGIN]).lower(),
+        CONF_ACCOUNTS: [str(account) for account in accounts],
+    }
 
 
 class BCNNConfigFlow(ConfigFlow, domain=DOMAIN):
     # The schema version of the entries that it creates
     # Home Assistant will call your migrate method if the version changes
-    VERSION = 1
+    VERSION = 2
     MINOR_VERSION = 1
 
+    def __init__(self) -> None:
+        """Initialize the config flow."""
+        self._user_input: dict[str, Any] = {}
+        self._title = ""
+        self._accounts: list[str] = []
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Get the options flow for this handler."""
+        return BCNNOptionsFlow(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Handle the initial step."""
         login = ""
         password = ""
-        account = ""
-        errors: dict[str, str] = {}
         if user_input is not None:
 
             _data = await validate_input(self.hass, user_input)
             await self.async_set_unique_id(_data["title"])
             self._abort_if_unique_id_configured()
-            return self.async_create_entry(title=_data["title"], data=user_input)
+
+            # accounts already added by entries of the previous version
+            configured = {
+                str(account)
+                for entry in self._async_current_entries()
+                if str(entry.data.get(CONF_LOGIN)).lower() == _data["title"]
+                for account in entry.data.get(CONF_ACCOUNTS, [])
+            }
+            self._accounts = [
+                account for account in _data[CONF_ACCOUNTS] if account not in configured
+            ]
+            if not self._accounts:
+                return self.async_abort(reason="already_configured")
+
+            self._user_input = user_input
+            self._title = _data["title"]
+            return await self.async_step_accounts()
 
         return self.async_show_form(
             step_id="user",
@@ -77,8 +122,91 @@ class BCNNConfigFlow(ConfigFlow, domain=DOMAIN):
                 {
                     vol.Required(CONF_LOGIN, default=login): str,
                     vol.Required(CONF_PASSWORD, default=password): str,
-                    vol.Required(CONF_ACCOUNT, default=account): str,
                 }
             ),
             errors={},
         )
+
+    async def async_step_accounts(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Select personal accounts of the login."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            accounts = [
+                account
+                for account in self._accounts
+                if account in user_input[CONF_ACCOUNTS]
+            ]
+            if accounts:
+                return self.async_create_entry(
+                    title=self._title,
+                    data={
+                        **self._user_input,
+                        CONF_ACCOUNTS: accounts,
+                        # with every account selected the entry follows the login
+                        CONF_ALL_ACCOUNTS: len(accounts) == len(self._accounts),
+                    },
+                )
+            errors["base"] = "no_accounts"
+
+        return self.async_show_form(
+            step_id="accounts",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_ACCOUNTS, default=self._accounts): cv.multi_select(
+                        {account: account for account in self._accounts}
+                    ),
+                }
+            ),
+            errors=errors,
+        )
+
+
+class BCNNOptionsFlow(OptionsFlow):
+    """Center-SBK options: refresh intervals of data sections, hours, history depth
+    and portal traffic limits."""
+
+    def __init__(self, config_entry: ConfigEntry) -> None:
+        """Initialize options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_READINGS_TTL,
+                        default=options.get(CONF_READINGS_TTL, DEFAULT_READINGS_TTL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Required(
+                        CONF_PAYMENT_TTL,
+                        default=options.get(CONF_PAYMENT_TTL, DEFAULT_PAYMENT_TTL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Required(
+                        CONF_INFO_TTL,
+                        default=options.get(CONF_INFO_TTL, DEFAULT_INFO_TTL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Required(
+                        CONF_BACKFILL_YEARS,
+                        default=options.get(CONF_BACKFILL_YEARS, DEFAULT_BACKFILL_YEARS),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=10)),
+                    vol.Required(
+                        CONF_RATE_LIMIT,
+                        default=options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=600)),
+                    vol.Required(
+                        CONF_MAX_IN_FLIGHT,
+                        default=options.get(CONF_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+                }
+            ),
+        )
@@ -17,13 +17,107 @@ PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.BUTTON]
 CONF_LOGIN: Final = "login"
 CONF_PASSWORD: Final = "password"
 CONF_ACCOUNT: Final = "account"
+CONF_ACCOUNTS: Final = "accounts"
+CONF_ALL_ACCOUNTS: Final = "all_accounts"
 CONF_DATA: Final = "data"
 CONF_LINK: Final = "link"
 CONF_INFO: Final = "info"
 CONF_PAYMENT: Final = "payment"
+CONF_CHARGES: Final = "charges"
 CONF_READINGS: Final = "readings"
+CONF_READINGS_INDEX: Final = "readings_by_number"
 ATTR_LAST_UPDATE_TIME: Final = "last_update_time"
 
+# Section refresh intervals (options), hours
+CONF_INFO_TTL: Final = "info_ttl"
+CONF_PAYMENT_TTL: Final = "payment_ttl"
+CONF_READINGS_TTL: Final = "readings_ttl"
+DEFAULT_INFO_TTL: Final = 24 * 30
+DEFAULT_PAYMENT_TTL: Final = 24
+DEFAULT_READINGS_TTL: Final = 24
+
+# Billing cycle: readings are submitted and new charges are published in these days of month
+READINGS_WINDOW_DAYS: Final = range(1, 11)
+CHARGES_WINDOW_DAYS: Final = range(1, 6)
+HOT_UPDATE_INTERVAL: Final = timedelta(hours=1)
+# Outside the windows the account is polled once a day at this hour plus per-account jitter
+QUIET_UPDATE_HOUR: Final = 3
+HOT_UPDATE_MAX_JITTER: Final = 300
+SECTION_DUE_TOLERANCE: Final = timedelta(minutes=5)
+ACCOUNTS_DISCOVERY_INTERVAL: Final = timedelta(days=1)
+
+READINGS_CONFIRM_TIMEOUT: Final = timedelta(seconds=90)
+READINGS_CONFIRM_INITIAL_DELAY: Final = 2.0
+READINGS_CONFIRM_MAX_DELAY: Final = 20.0
+
+ATTR_ACCEPTED: Final = "accepted"
+ATTR_PENDING: Final = "pending"
+ATTR_CONFIRMED: Final = "confirmed"
+ATTR_SENT: Final = "sent"
+# fired when the background confirmation of submitted readings ends
+EVENT_READINGS_CONFIRMED: Final = f"{DOMAIN}_send_readings_confirmed"
+ATTR_RESULTS: Final = "results"
+ATTR_QUEUED: Final = "queued"
+
+DATA_APIS: Final = f"{DOMAIN}_apis"
+DATA_SESSIONS: Final = f"{DOMAIN}_sessions"
+
+STORAGE_VERSION: Final = 1
+STORAGE_KEY_SESSIONS: Final = f"{DOMAIN}.sessions"
+SESSIONS_SAVE_DELAY: Final = 10
+
+DATA_OUTBOX: Final = f"{DOMAIN}_outbox"
+STORAGE_KEY_OUTBOX: Final = f"{DOMAIN}.outbox"
+OUTBOX_SAVE_DELAY: Final = 1
+OUTBOX_RETRY_INITIAL_DELAY: Final = timedelta(minutes=1)
+OUTBOX_RETRY_MAX_DELAY: Final = timedelta(hours=1)
+# undelivered readings are dropped when the readings window is surely over
+OUTBOX_MAX_AGE: Final = timedelta(days=3)
+CONF_OUTBOX: Final = "outbox"
+
+# Charges columns imported to long-term statistics
+CHARGES_SUM_COLUMNS: Final = ("accrued", "paid")
+CHARGES_MEAN_COLUMNS: Final = ("opening_balance", "due_payment")
+CURRENCY: Final = "RUB"
+
+CONF_BACKFILL_YEARS: Final = "backfill_years"
+DEFAULT_BACKFILL_YEARS: Final = 3
+DATA_BACKFILL: Final = f"{DOMAIN}_backfill"
+STORAGE_KEY_BACKFILL: Final = f"{DOMAIN}.backfill"
+BACKFILL_CHUNK_MONTHS: Final = 6
+BACKFILL_REQUEST_INTERVAL: Final = timedelta(seconds=30)
+
+# Portal traffic limits shared by all entries, the strictest configured ones apply
+DATA_LIMITER: Final = f"{DOMAIN}_limiter"
+CONF_RATE_LIMIT: Final = "rate_limit"
+CONF_MAX_IN_FLIGHT: Final = "max_in_flight"
+DEFAULT_RATE_LIMIT: Final = 30
+DEFAULT_MAX_IN_FLIGHT: Final = 2
+
+DATA_BILLS: Final = f"{DOMAIN}_bills"
+BILL_CACHE_MAX_FILES: Final = 48
+BILL_CACHE_MAX_BYTES: Final = 50 * 1024 * 1024
+ATTR_OUTBOX_DEPTH: Final = "outbox_depth"
+ATTR_OUTBOX_OLDEST: Final = "outbox_oldest"
+
+# Statistics of the last coordinator refresh
+CONF_REFRESH: Final = "refresh"
+ATTR_REFRESH_DURATION: Final = "duration"
+ATTR_REFRESH_REQUESTS: Final = "requests"
+ATTR_LOGIN_COUNT: Final = "logins"
+ATTR_REFRESH_FINISHED: Final = "finished"
+ATTR_REFRESH_ERROR: Final = "error"
+TO_REDACT: Final = {CONF_LOGIN, CONF_PASSWORD}
+
+# Circuit breaker: after consecutive failed refreshes the coordinator backs off and serves
+# the last good data; once open, each attempt starts with a cheap probe of the portal
+CIRCUIT_FAILURE_THRESHOLD: Final = 3
+CIRCUIT_BACKOFF_INITIAL: Final = timedelta(minutes=2)
+CIRCUIT_BACKOFF_MAX: Final = timedelta(hours=6)
+ATTR_STALE: Final = "stale"
+ATTR_DATA_AGE: Final = "data_age"
+CONF_SECTIONS_UPDATED: Final = "sections_updated"
+
 DEVICE_NAME_FORMAT: Final = "ЛC №{}"
 ATTR_MODEL_PU: Final = "ModelPU"
 
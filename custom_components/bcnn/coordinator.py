@@ -4,10 +4,14 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from functools import partial
+import time
+import zlib
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
 from typing import Any
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
@@ -21,35 +25,201 @@ from custom_components.bcnn.const import (
     DOMAIN,
     CONF_INFO,
     CONF_PAYMENT,
+    CONF_CHARGES,
     CONF_READINGS,
+    CONF_READINGS_INDEX,
     ATTR_LAST_UPDATE_TIME,
+    ATTR_ACCEPTED,
+    ATTR_PENDING,
+    ATTR_CONFIRMED,
+    ATTR_SENT,
+    EVENT_READINGS_CONFIRMED,
+    READINGS_CONFIRM_TIMEOUT,
+    READINGS_CONFIRM_INITIAL_DELAY,
+    READINGS_CONFIRM_MAX_DELAY,
+    CONF_INFO_TTL,
+    CONF_PAYMENT_TTL,
+    CONF_READINGS_TTL,
+    DEFAULT_INFO_TTL,
+    DEFAULT_PAYMENT_TTL,
+    DEFAULT_READINGS_TTL,
+    READINGS_WINDOW_DAYS,
+    CHARGES_WINDOW_DAYS,
+    HOT_UPDATE_INTERVAL,
+    QUIET_UPDATE_HOUR,
+    HOT_UPDATE_MAX_JITTER,
+    SECTION_DUE_TOLERANCE,
+    ACCOUNTS_DISCOVERY_INTERVAL,
+    CONF_OUTBOX,
+    ATTR_OUTBOX_DEPTH,
+    ATTR_OUTBOX_OLDEST,
+    CONF_REFRESH,
+    ATTR_REFRESH_DURATION,
+    ATTR_REFRESH_REQUESTS,
+    ATTR_LOGIN_COUNT,
+    ATTR_REFRESH_FINISHED,
+    ATTR_REFRESH_ERROR,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_BACKOFF_INITIAL,
+    CIRCUIT_BACKOFF_MAX,
+    ATTR_STALE,
+    CONF_SECTIONS_UPDATED,
 )
+from custom_components.bcnn.helpers import get_upbdate_interval
+from custom_components.bcnn.history import BCNNHistory
+from custom_components.bcnn.parsers import ParseCache
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class BCNNCoordinator(DataUpdateCoordinator):
-    """Coordinator is responsible for querying the device at a specified route."""
+@dataclass(frozen=True, kw_only=True)
+class BCNNSection:
+    """Describes an independently fetched part of coordinator data."""
+
+    key: str
+    fetch_fn: Callable[[BCNNApi, str], Awaitable[Any]]
+    # Step uses server-side form/account context and must run under the client lock
+    stateful: bool
+    # Option with the refresh interval of the section, hours
+    ttl_option: str
+    default_ttl: int
+    # Days of month when the section changes and is polled every HOT_UPDATE_INTERVAL
+    hot_days: range | None = None
+
+
+SECTIONS: tuple[BCNNSection, ...] = (
+    # readings form flow: navigate -> select account -> change form
+    BCNNSection(
+        key=CONF_READINGS,
+        fetch_fn=lambda api, account: api.get_information_on_water_meters(account),
+        stateful=True,
+        ttl_option=CONF_READINGS_TTL,
+        default_ttl=DEFAULT_READINGS_TTL,
+        hot_days=READINGS_WINDOW_DAYS,
+    ),
+    # getChartData switches the account for /payments
+    BCNNSection(
+        key=CONF_CHARGES,
+        fetch_fn=lambda api, account: api.get_charges(account),
+        stateful=True,
+        ttl_option=CONF_PAYMENT_TTL,
+        default_ttl=DEFAULT_PAYMENT_TTL,
+        hot_days=CHARGES_WINDOW_DAYS,
+    ),
+    # stateless JSON querydata call
+    BCNNSection(
+        key=CONF_INFO,
+        fetch_fn=lambda api, account: api.get_address(account),
+        stateful=False,
+        ttl_option=CONF_INFO_TTL,
+        default_ttl=DEFAULT_INFO_TTL,
+    ),
+)
+
+
+@dataclass
+class BCNNCircuit:
+    """Consecutive failed refreshes of the coordinator."""
+
+    failures: int = 0
+    opened: datetime | None = None
+    last_error: str | None = None
+
+    @property
+    def is_open(self) -> bool:
+        """Portal is considered down, refreshes start with a probe"""
+        return self.failures >= CIRCUIT_FAILURE_THRESHOLD
+
+    def backoff(self) -> timedelta:
+        """Delay before the next attempt, doubled with every failure"""
+        return min(
+            CIRCUIT_BACKOFF_INITIAL * 2 ** max(self.failures - 1, 0), CIRCUIT_BACKOFF_MAX
+        )
+
+    def record_failure(self, error: Exception) -> None:
+        """Count a failed refresh"""
+        self.failures += 1
+        self.last_error = repr(error)
+        if self.failures == CIRCUIT_FAILURE_THRESHOLD:
+            self.opened = dt.utcnow()
+
+    def record_success(self) -> None:
+        """Close the circuit"""
+        self.failures = 0
+        self.opened = None
+        self.last_error = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """State for diagnostics"""
+        return {**asdict(self), "is_open": self.is_open, "backoff": str(self.backoff())}
+
+
+def _index_readings(readings: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Index meter rows by device number"""
+    return {meter.get("device_number"): meter for meter in readings}
+
+
+def _empty_account_data(account: str) -> dict[str, Any]:
+    """Get account data before the first refresh"""
+    return {
+        CONF_ACCOUNT: account,
+        CONF_INFO: {},
+        CONF_CHARGES: [],
+        CONF_PAYMENT: {},
+        CONF_READINGS: [],
+        CONF_READINGS_INDEX: {},
+        CONF_OUTBOX: {ATTR_OUTBOX_DEPTH: 0, ATTR_OUTBOX_OLDEST: None},
+        CONF_REFRESH: {},
+        CONF_SECTIONS_UPDATED: {},
+        ATTR_STALE: False,
+        ATTR_LAST_UPDATE_TIME: None,
+    }
+
+
+class BCNNCoordinator(DataUpdateCoordinator[dict[str, dict[str, Any]]]):
+    """Coordinator refreshes all personal accounts of a login over one portal session."""
 
     _api: BCNNApi
-    account: str
+    accounts: list[str]
 
-    def __init__(self, hass: HomeAssistant, *, bcnn_api: BCNNApi, account: str) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        *,
+        bcnn_api: BCNNApi,
+        accounts: list[str],
+        all_accounts: bool = False,
+        options: Mapping[str, Any] | None = None,
+    ) -> None:
         """Initialise a custom coordinator."""
-        self.account = str(account)
-        self.data = {
-            CONF_ACCOUNT: self.account,
-            CONF_INFO: {},
-            CONF_PAYMENT: {},
-            CONF_READINGS: [],
-            ATTR_LAST_UPDATE_TIME: None,
+        self.accounts = [str(account) for account in accounts]
+        # pick up accounts added to the login later
+        self.all_accounts = all_accounts
+        options = options or {}
+        self._section_ttls: dict[str, timedelta] = {
+            section.key: timedelta(
+                hours=options.get(section.ttl_option, section.default_ttl)
+            )
+            for section in SECTIONS
         }
+        self._section_updated: dict[tuple[str, str], datetime] = {}
+        self._accounts_discovered: datetime | None = None
+        self._forced_accounts: set[str] = set()
+        # sections whose data changed during the last refresh, by account
+        self.changed_sections: dict[str, set[str]] = {}
         self._api = bcnn_api
-        self.lock = asyncio.Lock()
+        self.login = bcnn_api.login
+        self.metrics = bcnn_api.metrics
+        # duration and portal traffic of the last refresh, also kept when it failed
+        self.last_refresh: dict[str, Any] = {}
+        self.circuit = BCNNCircuit()
+        self._confirmations: set[asyncio.Task] = set()
+        self.history = BCNNHistory(hass)
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
+            update_interval=HOT_UPDATE_INTERVAL,
             request_refresh_debouncer=Debouncer(
                 hass,
                 _LOGGER,
@@ -58,50 +228,402 @@ class BCNNCoordinator(DataUpdateCoordinator):
             ),
         )
 
-    async def _async_update_data(self) -> dict[str, Any]:
+    @property
+    def parse_cache(self) -> ParseCache:
+        """Parse results of the client pages, reused while the page data does not change"""
+        return self._api.parse_cache
+
+    async def _async_update_data(self) -> dict[str, dict[str, Any]]:
         """Fetch data from Center-SBK"""
         self.logger.debug("Start updating Center-SBK data")
 
-        new_data: dict[str, Any] = {
-            CONF_ACCOUNT: self.account,
-            CONF_INFO: {},
-            CONF_PAYMENT: {},
-            CONF_READINGS: [],
-            ATTR_LAST_UPDATE_TIME: dt.now(),
-        }
+        self.changed_sections = {}
+        now = dt.utcnow()
+        forced, self._forced_accounts = self._forced_accounts, set()
+        started, requests = time.perf_counter(), self.metrics.requests
         try:
-            self.logger.debug("Get general info for account %s", self.account)
-            async with self.lock:
-                new_data[CONF_READINGS] = await self.hass.async_add_executor_job(
-                    partial(self._api.get_information_on_water_meters, self.account)
+            if self.circuit.is_open:
+                # during an outage do not run the whole login and form flow just to fail
+                await self._api.async_probe()
+
+            if self.all_accounts and (
+                forced
+                or self._accounts_discovered is None
+                or now - self._accounts_discovered >= ACCOUNTS_DISCOVERY_INTERVAL
+            ):
+                await self._async_discover_accounts()
+                self._accounts_discovered = now
+
+            due = {
+                account: tuple(
+                    section
+                    for section in SECTIONS
+                    if account in forced or self._section_is_due(account, section, now)
                 )
-                new_data[CONF_INFO] = await self.hass.async_add_executor_job(
-                    partial(self._api.get_address, self.account)
+                for account in self.accounts
+            }
+            self.logger.debug(
+                "Get %s",
+                {
+                    account: [section.key for section in sections]
+                    for account, sections in due.items()
+                },
+            )
+            fetched = await self._async_fetch_sections(due)
+
+            new_data: dict[str, dict[str, Any]] = {}
+            for account in self.accounts:
+                previous = (self.data or {}).get(account)
+                account_data = new_data[account] = {
+                    **_empty_account_data(account),
+                    # sections that are not due keep their last good value
+                    **(previous or {}),
+                    **fetched[account],
+                    ATTR_STALE: False,
+                    ATTR_LAST_UPDATE_TIME: dt.now(),
+                }
+                # the client returns the very same object when the source fragment hash is unchanged
+                changed = self.changed_sections[account] = {
+                    key
+                    for key, value in fetched[account].items()
+                    if previous is None or value is not previous.get(key)
+                }
+                if CONF_READINGS in changed:
+                    account_data[CONF_READINGS_INDEX] = _index_readings(
+                        account_data[CONF_READINGS]
+                    )
+                if CONF_CHARGES in changed:
+                    charges = account_data[CONF_CHARGES]
+                    account_data[CONF_PAYMENT] = BCNNApi.current_payment(charges)
+                    changed.add(CONF_PAYMENT)
+                    await self._async_import_charges(account, charges)
+                self._section_updated.update(
+                    {(account, section.key): now for section in due[account]}
                 )
-                new_data[CONF_PAYMENT] = await self.hass.async_add_executor_job(
-                    partial(self._api.get_current_payment, self.account)
+                account_data[CONF_SECTIONS_UPDATED] = self._sections_updated(account)
+                if previous is not None and previous.get(ATTR_STALE):
+                    # sensors drop the data age shown during the outage
+                    changed.update(account_data)
+            self.logger.debug(
+                "Changed sections: %s, parse cache hits/misses: %s/%s",
+                self.changed_sections,
+                self.parse_cache.hits,
+                self.parse_cache.misses,
+            )
+            self.update_interval = self._next_update_interval()
+
+            refresh = self._finish_refresh(started, requests)
+            for account, account_data in new_data.items():
+                account_data[CONF_REFRESH] = refresh
+                self.changed_sections[account].add(CONF_REFRESH)
+
+            if self.circuit.failures:
+                self.logger.info(
+                    "Center-SBK is reachable again after %s failed refreshes",
+                    self.circuit.failures,
                 )
+            self.circuit.record_success()
 
             self.logger.debug("Center-SBK data updated successfully")
-            self.logger.debug("%s", new_data)
             return new_data
         except Exception as error:  # pylint: disable=broad-except
-            raise UpdateFailed(
-                f"Error communicating with Center-SBK API: {error}"
-            ) from error
+            self._finish_refresh(started, requests, error)
+            self.circuit.record_failure(error)
+            # forced sections are fetched with the next attempt
+            self._forced_accounts.update(forced)
+            if not self.data:
+                # nothing to serve yet, e.g. the first refresh of the entry
+                raise UpdateFailed(
+                    f"Error communicating with Center-SBK API: {error}"
+                ) from error
 
-    async def async_send_readings(self, meter_values):
-        _LOGGER.debug(meter_values)
-        response = await self.hass.async_add_executor_job(
-            partial(self._api.send_meter_readings, self.account, meter_values)
+            # an outage must not make polling more frequent than usual
+            self.update_interval = max(self._next_update_interval(), self.circuit.backoff())
+            self.logger.log(
+                logging.WARNING
+                if self.circuit.failures in (1, CIRCUIT_FAILURE_THRESHOLD)
+                else logging.DEBUG,
+                "Error communicating with Center-SBK API: %s. Serving the last good data, "
+                "next attempt in %s",
+                error,
+                self.update_interval,
+            )
+            return self._stale_data()
+
+    def _sections_updated(self, account: str) -> dict[str, datetime]:
+        """Get when sections of the account were last fetched successfully"""
+        updated = {
+            section.key: self._section_updated[(account, section.key)]
+            for section in SECTIONS
+            if (account, section.key) in self._section_updated
+        }
+        if CONF_CHARGES in updated:
+            updated[CONF_PAYMENT] = updated[CONF_CHARGES]
+        return updated
+
+    def _stale_data(self) -> dict[str, dict[str, Any]]:
+        """Get the last good data marked as stale, so that sensors show its age"""
+        self.changed_sections = {
+            account: set(account_data) for account, account_data in self.data.items()
+        }
+        return {
+            account: {**account_data, ATTR_STALE: True}
+            for account, account_data in self.data.items()
+        }
+
+    def _finish_refresh(
+        self, started: float, requests: int, error: Exception | None = None
+    ) -> dict[str, Any]:
+        """Remember duration and portal traffic of the refresh"""
+        self.last_refresh = {
+            ATTR_REFRESH_DURATION: round(time.perf_counter() - started, 3),
+            ATTR_REFRESH_REQUESTS: self.metrics.requests - requests,
+            ATTR_LOGIN_COUNT: self.metrics.logins,
+            ATTR_REFRESH_FINISHED: dt.now(),
+            ATTR_REFRESH_ERROR: repr(error) if error else None,
+        }
+        return self.last_refresh
+
+    async def _async_import_charges(
+        self, account: str, charges: list[dict[str, Any]]
+    ) -> None:
+        """Write new periods of charges to long-term statistics"""
+        try:
+            await self.history.async_import_charges(account, charges)
+        except Exception as exc:  # pylint: disable=broad-except
+            # statistics are best effort, sensors must still be updated
+            self.logger.warning("Failed to import charges of %s: %s", account, exc)
+
+    async def _async_discover_accounts(self) -> None:
+        """Add personal accounts that appeared in the login"""
+        response = await self._api.get_accounts()
+        accounts = response.get("data", {}).get("accountInfo", {}).get("accounts", [])
+        for account in map(str, accounts):
+            if account not in self.accounts:
+                self.logger.info("New personal account %s found", account)
+                self.accounts.append(account)
+
+    def _section_ttl(self, section: BCNNSection) -> timedelta:
+        """Get the section refresh interval for the current day of the billing cycle"""
+        ttl = self._section_ttls[section.key]
+        if section.hot_days is not None and dt.now().day in section.hot_days:
+            return min(ttl, HOT_UPDATE_INTERVAL)
+        return ttl
+
+    def _jitter(self, account: str) -> int:
+        """Get deterministic per-account offset, so that accounts do not poll the portal at once"""
+        return zlib.crc32(f"{self.login}:{account}".encode())
+
+    def _quiet_interval(self, account: str) -> timedelta:
+        """Get interval to the daily poll slot of the account"""
+        jitter = self._jitter(account)
+        return get_upbdate_interval(QUIET_UPDATE_HOUR, jitter % 60, jitter // 60 % 60)
+
+    def _section_is_due(
+        self, account: str, section: BCNNSection, now: datetime
+    ) -> bool:
+        """Check that the section refresh interval has passed"""
+        if (updated := self._section_updated.get((account, section.key))) is None:
+            return True
+        ttl = self._section_ttl(section)
+        if ttl >= timedelta(days=1):
+            # daily and rarer sections are fetched in the own daily slot of the account
+            # preceding their due time, not in the slots of other accounts
+            return (
+                updated + ttl
+                <= now + self._quiet_interval(account) - SECTION_DUE_TOLERANCE
+            )
+        return updated + ttl <= now + SECTION_DUE_TOLERANCE
+
+    def _next_update_interval(self) -> timedelta:
+        """Poll often inside the billing windows, once a day at a jittered time otherwise"""
+        now = dt.utcnow()
+        interval = min(
+            (self._quiet_interval(account) for account in self.accounts),
+            default=get_upbdate_interval(QUIET_UPDATE_HOUR, 0, 0),
         )
-        if response:
-            return response
-        pass
+        for account in self.accounts:
+            for section in SECTIONS:
+                ttl = self._section_ttl(section)
+                if ttl >= timedelta(days=1):
+                    continue
+                until_due = (
+                    self._section_updated.get((account, section.key), now) + ttl - now
+                )
+                interval = min(
+                    interval,
+                    max(until_due, timedelta())
+                    + timedelta(seconds=self._jitter(account) % HOT_UPDATE_MAX_JITTER),
+                )
+        return interval
+
+    async def async_force_refresh(self, account: str | None = None) -> None:
+        """Refresh all sections of the account (or all accounts) regardless of their intervals"""
+        self._forced_accounts.update([account] if account else self.accounts)
+        await self.async_refresh()
+
+    async def _async_fetch_sections(
+        self, due: dict[str, tuple[BCNNSection, ...]]
+    ) -> dict[str, dict[str, Any]]:
+        """Fetch sections of all accounts in one cycle: stateful steps one by one
+        under the client lock, stateless ones concurrently with them"""
+
+        stateful = [
+            (account, section)
+            for account, sections in due.items()
+            for section in sections
+            if section.stateful
+        ]
+        stateless = [
+            (account, section)
+            for account, sections in due.items()
+            for section in sections
+            if not section.stateful
+        ]
+
+        async def _async_fetch_stateful() -> list[Any]:
+            if not stateful:
+                return []
+            async with self._api.lock:
+                return [
+                    await section.fetch_fn(self._api, account)
+                    for account, section in stateful
+                ]
+
+        stateful_results, *stateless_results = await asyncio.gather(
+            _async_fetch_stateful(),
+            *(section.fetch_fn(self._api, account) for account, section in stateless),
+        )
+
+        fetched: dict[str, dict[str, Any]] = {account: {} for account in due}
+        for (account, section), result in zip(
+            stateful + stateless, [*stateful_results, *stateless_results]
+        ):
+            fetched[account][section.key] = result
+        return fetched
 
-    async def async_get_bill(self) -> bytes:
-        response = await self.hass.async_add_executor_job(
-            partial(self._api.get_bill, self.account)
+    async def async_submit_readings(self, account: str, meter_values) -> dict[str, str]:
+        """Submit the readings form, return sent values by meter number
+
+        The form selects the account in the portal session, so submissions of
+        the accounts of a login run one by one under the client lock.
+        """
+        _LOGGER.debug(meter_values)
+        async with self._api.lock:
+            return await self._api.send_meter_readings(account, meter_values)
+
+    @callback
+    def async_schedule_confirmation(self, account: str, sent: dict[str, str]) -> None:
+        """Confirm submitted readings in the background and report the result with an event"""
+
+        async def _async_confirm() -> None:
+            result = await self.async_confirm_readings(account, sent)
+            self.hass.bus.async_fire(
+                EVENT_READINGS_CONFIRMED,
+                {CONF_ACCOUNT: account, ATTR_SENT: sent, **result},
+            )
+
+        task = self.hass.async_create_background_task(
+            _async_confirm(), f"{DOMAIN} confirm readings {account}"
         )
-        if response:
-            return response
+        self._confirmations.add(task)
+        task.add_done_callback(self._confirmations.discard)
+
+    async def async_shutdown(self) -> None:
+        """Cancel pending confirmations"""
+        for task in self._confirmations:
+            task.cancel()
+        await super().async_shutdown()
+
+    async def async_confirm_readings(
+        self, account: str, sent: dict[str, str]
+    ) -> dict[str, Any]:
+        """Poll the readings form with backoff until sent values show up or deadline passes"""
+        deadline = dt.utcnow() + READINGS_CONFIRM_TIMEOUT
+        delay = READINGS_CONFIRM_INITIAL_DELAY
+        accepted: dict[str, str] = {}
+
+        while len(accepted) < len(sent):
+            remaining = (deadline - dt.utcnow()).total_seconds()
+            if remaining <= 0:
+                break
+            # the lock is released while waiting so other accounts of the login can proceed
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, READINGS_CONFIRM_MAX_DELAY)
+            try:
+                async with self._api.lock:
+                    readings = await self._api.get_information_on_water_meters(account)
+            except Exception as exc:  # pylint: disable=broad-except
+                self.logger.debug("Readings confirmation poll failed: %s", exc)
+                continue
+
+            previous, accepted = accepted, self._api.readings_accepted(readings, sent)
+            if accepted == previous:
+                # nothing new is confirmed, entities are left alone until the next poll
+                continue
+            account_data = self.data[account]
+            self.changed_sections = {
+                account: (
+                    {CONF_READINGS}
+                    if readings is not account_data.get(CONF_READINGS)
+                    else set()
+                )
+            }
+            self.async_set_updated_data(
+                {
+                    **self.data,
+                    account: {
+                        **account_data,
+                        CONF_READINGS: readings,
+                        CONF_READINGS_INDEX: _index_readings(readings),
+                        ATTR_LAST_UPDATE_TIME: dt.now(),
+                    },
+                }
+            )
+
+        return {
+            ATTR_CONFIRMED: len(accepted) == len(sent),
+            ATTR_ACCEPTED: accepted,
+            ATTR_PENDING: [number for number in sent if number not in accepted],
+        }
+
+    @callback
+    def async_set_outbox_stats(
+        self, account: str, depth: int, oldest: datetime | None
+    ) -> None:
+        """Update queued readings statistics of the account without a refresh"""
+        if self.data is None or account not in self.data:
+            return
+        stats = {ATTR_OUTBOX_DEPTH: depth, ATTR_OUTBOX_OLDEST: oldest}
+        if self.data[account].get(CONF_OUTBOX) == stats:
+            return
+        # the refresh schedule is left as is, only listeners are notified
+        self.data = {**self.data, account: {**self.data[account], CONF_OUTBOX: stats}}
+        self.changed_sections = {account: {CONF_OUTBOX}}
+        self.async_update_listeners()
+
+    async def async_get_chart_data(
+        self, account: str, begin: date, end: date
+    ) -> Any:
+        """Get chart data of the account for periods from begin to end"""
+        async with self._api.lock:
+            return await self._api.get_chart_data(account, begin, end)
+
+    def bill_period(self, account: str) -> date | None:
+        """Get the latest charged period of the account known from the last refresh"""
+        if self.data is None or account not in self.data:
+            return None
+        return self.data[account].get(CONF_PAYMENT, {}).get("period")
+
+    async def async_download_bill(
+        self, account: str, write: Callable[[bytes], Awaitable[Any]]
+    ) -> tuple[int, date | None]:
+        """Stream the bill of the account to write, return its size and period
+
+        The bill carries no period of its own, so it is taken from the charges
+        requested right before the bill in the same portal session.
+        """
+        async with self._api.lock:
+            charges = await self._api.get_charges(account)
+            size = await self._api.download_bill(account, write)
+        return size, BCNNApi.current_payment(charges).get("period")
@@ -0,0 +1,39 @@
+"""Diagnostics support for Center-SBK."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, TO_REDACT
+from .coordinator import BCNNCoordinator
+from .registry import get_limiter
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: BCNNCoordinator = hass.data[DOMAIN][entry.entry_id]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "accounts": coordinator.accounts,
+        "update_interval": str(coordinator.update_interval),
+        "last_update_success": coordinator.last_update_success,
+        "last_refresh": coordinator.last_refresh,
+        "circuit": coordinator.circuit.as_dict(),
+        "changed_sections": {
+            account: sorted(sections)
+            for account, sections in coordinator.changed_sections.items()
+        },
+        # per-step timings of the portal client, newest last
+        "client": coordinator.metrics.as_dict(),
+        # pages whose data did not change are not parsed again
+        "parse_cache": coordinator.parse_cache.as_dict(),
+        # shared by all entries: limits in force and queueing delays by priority
+        "limiter": get_limiter(hass).as_dict(),
+    }
@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
+from typing import Any
+
 from custom_components.bcnn.bcnn_api import BCNNApi
+from homeassistant.core import callback
 from homeassistant.helpers.entity import DeviceInfo, EntityDescription
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import slugify
@@ -24,27 +27,29 @@ class BCNNBaseCoordinatorEntity(CoordinatorEntity[BCNNCoordinator]):
 
     _attr_attribution = ATTRIBUTION
     _attr_has_entity_name = True
+    _fingerprint: tuple[Any, ...] | None = None
 
     def __init__(
-        self, coordinator: BCNNCoordinator, entity_description: EntityDescription
+        self,
+        coordinator: BCNNCoordinator,
+        entity_description: EntityDescription,
+        account: str,
     ) -> None:
         """Initialize the Entity."""
         super().__init__(coordinator=coordinator)
         self.entity_description = entity_description
+        self.account = account
 
-        if (
-            CONF_READINGS in self.coordinator.data
-            and len(self.coordinator.data[CONF_READINGS]) > 0
-        ):
-            _model = self.coordinator.data[CONF_READINGS][0].get(ATTR_MODEL_PU)
+        if len(readings := self.account_data.get(CONF_READINGS, [])) > 0:
+            _model = readings[0].get(ATTR_MODEL_PU)
         else:
             _model = None
 
         self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, coordinator.account)},
+            identifiers={(DOMAIN, account)},
             manufacturer=MANUFACTURER,
             model=_model,
-            name=DEVICE_NAME_FORMAT.format(coordinator.account),
+            name=DEVICE_NAME_FORMAT.format(account),
             sw_version=BCNNApi.VERSION,
             configuration_url=CONFIGURATION_URL,
         )
@@ -53,8 +58,32 @@ class BCNNBaseCoordinatorEntity(CoordinatorEntity[BCNNCoordinator]):
             "_".join(
                 [
                     DOMAIN,
-                    coordinator.account,
+                    account,
                     self.entity_description.key,
                 ]
             )
         )
+
+    @property
+    def account_data(self) -> dict[str, Any]:
+        """Coordinator data of the entity account."""
+        return (self.coordinator.data or {}).get(self.account, {})
+
+    @property
+    def available(self) -> bool:
+        """Account is available while the coordinator has its data."""
+        return super().available and self.account in (self.coordinator.data or {})
+
+    @callback
+    def _async_write_state_if_changed(self, *fingerprint: Any) -> None:
+        """Write state only if it differs from the last written one."""
+        fingerprint = (self.available, *fingerprint)
+        if fingerprint == self._fingerprint:
+            return
+        self._fingerprint = fingerprint
+        self.async_write_ha_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._async_write_state_if_changed()
@@ -47,19 +47,36 @@ async def async_get_device_friendly_name(
 
 async def async_get_coordinator(
     hass: HomeAssistant, device_id: str | None
-) -> BCNNCoordinator:
-    """Get coordinator for device id"""
+) -> tuple[BCNNCoordinator, str]:
+    """Get coordinator and personal account for device id"""
 
     device_entry = await async_get_device_entry_by_device_id(hass, device_id)
+    account = next(
+        (value for domain, value in device_entry.identifiers if domain == DOMAIN), None
+    )
     for entry_id in device_entry.config_entries:
         if (config_entry := hass.config_entries.async_get_entry(entry_id)) is None:
             continue
-        if config_entry.domain == DOMAIN:
-            return hass.data[DOMAIN][entry_id]
+        if config_entry.domain == DOMAIN and account is not None:
+            return hass.data[DOMAIN][entry_id], account
 
     raise ValueError(f"Config entry for {device_id} not found")
 
 
+def get_account_coordinator(
+    hass: HomeAssistant, account: str
+) -> BCNNCoordinator | None:
+    """Get coordinator refreshing the personal account"""
+    return next(
+        (
+            coordinator
+            for coordinator in hass.data.get(DOMAIN, {}).values()
+            if account in coordinator.accounts
+        ),
+        None,
+    )
+
+
 def get_float_value(hass: HomeAssistant, entity_id: str | None) -> float | None:
     """Get float value from entity state"""
     if entity_id is not None:
@@ -70,10 +87,11 @@ def get_float_value(hass: HomeAssistant, entity_id: str | None) -> float | None:
 
 
 def get_upbdate_interval(hour: int, minute: int, second: int) -> timedelta:
-    """Get update interval to time"""
+    """Get update interval to the nearest upcoming time of day"""
     now = dt.now()
-    next_day = now + timedelta(days=1)
-    next_time = next_day.replace(hour=hour, minute=minute, second=second)
+    next_time = now.replace(hour=hour, minute=minute, second=second, microsecond=0)
+    if next_time <= now:
+        next_time += timedelta(days=1)
     minutes_to_next_time = (next_time - now).total_seconds() / 60
     interval = timedelta(minutes=minutes_to_next_time)
     return interval
@@ -179,24 +197,24 @@ MONTHS = {
 }
 
 
-def convert_period_to_date(period_str: str) -> date:
+def parse_period(period_str: str | None) -> date | None:
     """Преобразует строку периода вида 'месяц год г.' в дату.
 
-    Возвращает текущую дату при некорректном формате.
+    Возвращает None, если строка не похожа на период.
     """
     parts = (period_str or "").split()
     if len(parts) != 3:
-        return date.today()
+        return None
     month_str, year_str, _ = parts
 
     # извлекаем год (например, из '2024' или '2024г.')
     match = re.search(r"\d{4}", year_str)
     if not match:
-        return date.today()
+        return None
     year = int(match.group())
 
     month_num = MONTHS.get(month_str.lower())
     if month_num is None:
-        return date.today()
+        return None
 
-    return date(year, month_num, 1)
\ No newline at end of file
+    return date(year, month_num, 1)
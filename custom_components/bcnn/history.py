@@ -0,0 +1,184 @@
+"""Center-SBK history in Home Assistant long-term statistics."""
+
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, time
+from typing import Any, NamedTuple
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt, slugify
+
+from .const import (
+    DOMAIN,
+    DEVICE_NAME_FORMAT,
+    CHARGES_SUM_COLUMNS,
+    CHARGES_MEAN_COLUMNS,
+    CURRENCY,
+)
+from .helpers import _to_float
+
+_LOGGER = logging.getLogger(__name__)
+
+CHARGES_COLUMN_NAMES = {
+    "opening_balance": "Входящее сальдо",
+    "accrued": "Начислено",
+    "paid": "Оплачено",
+    "due_payment": "К оплате",
+}
+
+
+class Watermark(NamedTuple):
+    """Last statistics row written for a statistic id."""
+
+    start: datetime | None
+    sum: float
+    state: float
+
+
+class Series(NamedTuple):
+    """Points of one statistic id to import."""
+
+    name: str
+    unit: str | None
+    has_sum: bool
+    points: list[tuple[datetime, float]]
+
+
+def period_start(period: date) -> datetime:
+    """Start of the billing period in UTC"""
+    return dt.as_utc(datetime.combine(period, time.min, dt.get_default_time_zone()))
+
+
+def statistic_id(account: str, *parts: str) -> str:
+    """Get external statistic id"""
+    return f"{DOMAIN}:{slugify('_'.join([account, *parts]))}"
+
+
+class BCNNHistory:
+    """Writes Center-SBK history to external statistics.
+
+    A watermark per statistic id holds the last written row, so a refresh only
+    writes periods after it. The watermark period itself is rewritten, as the
+    current month keeps changing until it is closed.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the importer."""
+        self.hass = hass
+        self._watermarks: dict[str, Watermark] = {}
+
+    async def _async_get_watermark(self, stat_id: str) -> Watermark:
+        """Get the last written row, loading it from the recorder on first use"""
+        if (watermark := self._watermarks.get(stat_id)) is not None:
+            return watermark
+
+        last = await get_instance(self.hass).async_add_executor_job(
+            get_last_statistics, self.hass, 1, stat_id, True, {"sum", "state"}
+        )
+        if rows := last.get(stat_id):
+            start = rows[0]["start"]
+            if isinstance(start, (int, float)):
+                start = dt.utc_from_timestamp(start)
+            watermark = Watermark(
+                start, rows[0].get("sum") or 0.0, rows[0].get("state") or 0.0
+            )
+        else:
+            watermark = Watermark(None, 0.0, 0.0)
+        self._watermarks[stat_id] = watermark
+        return watermark
+
+    async def async_import(
+        self, stat_id: str, series: Series, rebuild: bool = False
+    ) -> int:
+        """Write points after the watermark, return number of written rows
+
+        With rebuild the rows written before are ignored and the series is
+        written again from its first point.
+        """
+        watermark = (
+            Watermark(None, 0.0, 0.0)
+            if rebuild
+            else await self._async_get_watermark(stat_id)
+        )
+        statistics: list[StatisticData] = []
+        for start, value in sorted(series.points):
+            if watermark.start is not None and start < watermark.start:
+                continue
+            if not series.has_sum:
+                statistics.append(
+                    StatisticData(start=start, state=value, mean=value, min=value, max=value)
+                )
+                watermark = Watermark(start, 0.0, value)
+                continue
+            # the watermark row is replaced, its old value is taken out of the sum
+            base = (
+                watermark.sum - watermark.state
+                if start == watermark.start
+                else watermark.sum
+            )
+            statistics.append(StatisticData(start=start, state=value, sum=base + value))
+            watermark = Watermark(start, base + value, value)
+
+        if not statistics:
+            return 0
+
+        async_add_external_statistics(
+            self.hass,
+            StatisticMetaData(
+                has_mean=not series.has_sum,
+                has_sum=series.has_sum,
+                name=series.name,
+                source=DOMAIN,
+                statistic_id=stat_id,
+                unit_of_measurement=series.unit,
+            ),
+            statistics,
+        )
+        self._watermarks[stat_id] = watermark
+        return len(statistics)
+
+    async def async_import_charges(
+        self, account: str, charges: list[dict[str, Any]]
+    ) -> None:
+        """Import charges of every period, total and per service"""
+        series: dict[str, Series] = {}
+        for period in charges:
+            if not isinstance(period.get("period"), date):
+                continue
+            start = period_start(period["period"])
+            rows = [(None, period)] + [
+                (service.get("period_or_service"), service)
+                for service in period.get("services") or []
+            ]
+            for service, row in rows:
+                for column in (*CHARGES_SUM_COLUMNS, *CHARGES_MEAN_COLUMNS):
+                    if (value := _to_float(row.get(column))) is None:
+                        continue
+                    parts = [service, column] if service else [column]
+                    series.setdefault(
+                        statistic_id(account, *parts),
+                        Series(
+                            " ".join(
+                                [
+                                    DEVICE_NAME_FORMAT.format(account),
+                                    *([service] if service else []),
+                                    CHARGES_COLUMN_NAMES[column],
+                                ]
+                            ),
+                            CURRENCY,
+                            column in CHARGES_SUM_COLUMNS,
+                            [],
+                        ),
+                    ).points.append((start, value))
+
+        written = 0
+        for stat_id, stat_series in series.items():
+            written += await self.async_import(stat_id, stat_series)
+        _LOGGER.debug("Imported %s charges statistics rows of %s", written, account)
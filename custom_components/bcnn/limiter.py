@@ -0,0 +1,173 @@
+"""Center-SBK portal traffic limiter.
+
+Один PortalLimiter общий для всех клиентов BCNNApi: маркерная корзина
+ограничивает частоту запросов к порталу, а число одновременно выполняющихся
+запросов ограничено отдельно. Очередь ожидания упорядочена по приоритету:
+запросы, вызванные пользователем (службы, кнопки), обслуживаются раньше
+фонового опроса. Приоритет задаётся контекстом вызова через interactive().
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+# Запросов в минуту, запас маркеров и число одновременных запросов по умолчанию
+DEFAULT_RATE = 30
+DEFAULT_BURST = 5
+DEFAULT_MAX_IN_FLIGHT = 2
+
+_PRIORITY: ContextVar[int] = ContextVar("bcnn_priority", default=PRIORITY_BACKGROUND)
+
+
+@contextmanager
+def interactive() -> Iterator[None]:
+    """Запросы внутри блока (и созданных в нём задач) обслуживаются вне очереди фонового опроса."""
+    token = _PRIORITY.set(PRIORITY_INTERACTIVE)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+class QueueStats:
+    """Задержки в очереди для одного приоритета."""
+
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, delay: float) -> None:
+        self.count += 1
+        self.total += delay
+        self.max = max(self.max, delay)
+        self.last = delay
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class PortalLimiter:
+    """Маркерная корзина и ограничение числа одновременных запросов с приоритетной очередью."""
+
+    def __init__(
+            self,
+            rate: float = DEFAULT_RATE,
+            burst: int = DEFAULT_BURST,
+            max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        # Ограничения, заданные разными записями интеграции; действует самое строгое
+        self._limits: Dict[str, Tuple[float, int]] = {}
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {priority: QueueStats() for priority in PRIORITY_NAMES}
+
+    def set_limits(self, key: str, rate: float, max_in_flight: int) -> None:
+        """Задаёт ограничения записи key: rate запросов в минуту, max_in_flight одновременно."""
+        self._limits[key] = (rate, max_in_flight)
+        self._apply_limits()
+
+    def remove_limits(self, key: str) -> None:
+        self._limits.pop(key, None)
+        self._apply_limits()
+
+    def _apply_limits(self) -> None:
+        if self._limits:
+            self.rate = min(rate for rate, _ in self._limits.values())
+            self.max_in_flight = min(in_flight for _, in_flight in self._limits.values())
+        self._wake()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._refilled) * self.rate / 60)
+        self._refilled = now
+
+    def _wake(self) -> None:
+        """Пропускает ожидающих по приоритету, пока есть маркеры и свободные места."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._refill()
+        while self._waiters and self._in_flight < self.max_in_flight:
+            if self._waiters[0][2].done():
+                # ожидание отменено
+                heapq.heappop(self._waiters)
+                continue
+            if self._tokens < 1:
+                self._timer = asyncio.get_running_loop().call_later(
+                    (1 - self._tokens) * 60 / self.rate, self._wake
+                )
+                return
+            _, _, future = heapq.heappop(self._waiters)
+            self._tokens -= 1
+            self._in_flight += 1
+            future.set_result(None)
+
+    async def acquire(self) -> float:
+        """Ждёт разрешения на запрос, возвращает время ожидания в секундах."""
+        priority = _PRIORITY.get()
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # место уже выдано, но вызывающий отменён
+                self.release()
+            raise
+        delay = time.monotonic() - started
+        self.stats[priority].add(delay)
+        return delay
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Выполняет один запрос в пределах ограничений; значение — время в очереди."""
+        delay = await self.acquire()
+        try:
+            yield delay
+        finally:
+            self.release()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Настройки, состояние очереди и задержки для диагностики."""
+        return {
+            "rate_per_minute": self.rate,
+            "burst": self.burst,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "queued": sum(not future.done() for _, _, future in self._waiters),
+            "delay": {
+                PRIORITY_NAMES[priority]: stats.as_dict() for priority, stats in self.stats.items()
+            },
+        }
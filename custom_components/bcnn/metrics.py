@@ -0,0 +1,130 @@
+"""Center-SBK client instrumentation.
+
+Каждый логический шаг клиента (вход, шаги формы показаний, /payments,
+getChartData и т. д.) записывается в кольцевой буфер ApiMetrics: время шага,
+число запросов, ожидание в очереди ограничителя, сетевое время, объём
+переданных и полученных данных, время разбора страниц и число повторов после
+завершения сессии порталом.
+
+Вложенный шаг учитывает только собственные запросы: запросы выбора ЛС внутри
+get_information_on_water_meters относятся к шагу select_account.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from functools import wraps
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional
+
+# Сколько последних шагов хранится для диагностики
+STEPS_HISTORY = 200
+
+_CURRENT_STEP: ContextVar[Optional["StepRecord"]] = ContextVar("bcnn_step", default=None)
+
+
+@dataclass(slots=True)
+class StepRecord:
+    """Замеры одного логического шага клиента."""
+
+    step: str
+    account: Optional[str]
+    # время начала, unix timestamp
+    started: float
+    duration: float = 0.0
+    requests: int = 0
+    latency: float = 0.0
+    # ожидание в очереди общего ограничителя запросов
+    queued: float = 0.0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    parse_time: float = 0.0
+    retries: int = 0
+    error: Optional[str] = None
+
+
+class ApiMetrics:
+    """Кольцевой буфер шагов и накопительные счётчики клиента."""
+
+    __slots__ = ("steps", "requests", "logins", "retries", "bytes_received")
+
+    def __init__(self, maxlen: int = STEPS_HISTORY):
+        self.steps: Deque[StepRecord] = deque(maxlen=maxlen)
+        self.requests = 0
+        self.logins = 0
+        self.retries = 0
+        self.bytes_received = 0
+
+    @asynccontextmanager
+    async def step(self, name: str, account: Optional[str] = None) -> AsyncIterator[StepRecord]:
+        """Записывает шаг; запросы и разбор внутри него учитываются в записи."""
+        record = StepRecord(name, account, time.time())
+        token = _CURRENT_STEP.set(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException as exc:
+            record.error = type(exc).__name__
+            raise
+        finally:
+            record.duration = time.perf_counter() - started
+            _CURRENT_STEP.reset(token)
+            self.steps.append(record)
+
+    @contextmanager
+    def parsing(self) -> Iterator[None]:
+        """Добавляет время разбора страницы к текущему шагу."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if (record := _CURRENT_STEP.get()) is not None:
+                record.parse_time += time.perf_counter() - started
+
+    def record_request(self, latency: float, sent: int, received: int, queued: float = 0.0) -> None:
+        self.requests += 1
+        self.bytes_received += received
+        if (record := _CURRENT_STEP.get()) is not None:
+            record.requests += 1
+            record.latency += latency
+            record.queued += queued
+            record.bytes_sent += sent
+            record.bytes_received += received
+
+    def record_retry(self) -> None:
+        self.retries += 1
+        if (record := _CURRENT_STEP.get()) is not None:
+            record.retries += 1
+
+    def record_login(self) -> None:
+        self.logins += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Счётчики и последние шаги для диагностики."""
+        return {
+            "requests": self.requests,
+            "logins": self.logins,
+            "retries": self.retries,
+            "bytes_received": self.bytes_received,
+            "steps": [asdict(record) for record in self.steps],
+        }
+
+
+def traced(name: str):
+    """Записывает вызов метода клиента как шаг name.
+
+    Первый позиционный аргумент метода, если он есть, считается номером ЛС.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            async with self.metrics.step(name, str(args[0]) if args else None):
+                return await func(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,73 @@
+"""Center-SBK client-side models."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Разрядность показаний по умолчанию: 5 знаков до запятой и 2 после
+DEFAULT_FORMATTER = ("00000", "00")
+
+
+def format_number(number, total_digits_before=5, digits_after=2):
+    formatted_number = f"{number:0{total_digits_before + digits_after + 1}.{digits_after}f}"
+    return formatted_number
+
+
+@dataclass(slots=True)
+class DeviceInfo:
+    account_number: str
+    device_type: str
+    device_number: str
+    repr_number: str
+    prev_value: str
+    cur_value: str
+    amount_water: str
+    new_value: str = None
+    formatter: tuple = DEFAULT_FORMATTER
+
+    def send_value(self):
+        return format_number(max(float(self.new_value or 0), float(self.cur_value or 0), float(self.prev_value or 0)),
+                             *[len(elem) for elem in self.formatter])
+
+
+class MeterRegistry:
+    """Счётчики по (ЛС, номер счётчика).
+
+    Записи обновляются на месте, а счётчики, пропавшие со страницы ЛС, удаляются,
+    поэтому размер реестра не растёт от обновления к обновлению.
+    """
+
+    __slots__ = ("_devices",)
+
+    def __init__(self):
+        self._devices: Dict[Tuple[str, str], DeviceInfo] = {}
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def get(self, account: str, device_number: str) -> Optional[DeviceInfo]:
+        return self._devices.get((str(account), device_number))
+
+    def account_devices(self, account: str) -> Iterator[DeviceInfo]:
+        account = str(account)
+        return (device for (_account, _), device in self._devices.items() if _account == account)
+
+    def update_account(self, account: str, devices: Iterable[DeviceInfo]) -> None:
+        """Заменяет данные счётчиков ЛС, сохраняя введённые, но ещё не переданные показания."""
+        account = str(account)
+        seen = set()
+        for device in devices:
+            key = (account, device.device_number)
+            seen.add(key)
+            if (record := self._devices.get(key)) is None:
+                self._devices[key] = device
+                continue
+            record.device_type = device.device_type
+            record.repr_number = device.repr_number
+            record.prev_value = device.prev_value
+            record.cur_value = device.cur_value
+            record.amount_water = device.amount_water
+            record.formatter = device.formatter
+        for key in [key for key in self._devices if key[0] == account and key not in seen]:
+            del self._devices[key]
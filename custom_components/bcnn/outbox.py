@@ -0,0 +1,237 @@
+"""Persistent queue of meter reading submissions."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.const import CONF_ERROR
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt
+
+from .const import (
+    DOMAIN,
+    CONF_ACCOUNT,
+    DATA_OUTBOX,
+    STORAGE_VERSION,
+    STORAGE_KEY_OUTBOX,
+    OUTBOX_SAVE_DELAY,
+    OUTBOX_RETRY_INITIAL_DELAY,
+    OUTBOX_RETRY_MAX_DELAY,
+    OUTBOX_MAX_AGE,
+    ATTR_READINGS,
+    ATTR_QUEUED,
+    ATTR_SENT,
+)
+from .helpers import get_account_coordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_PERIOD = "period"
+ATTR_CREATED = "created"
+ATTR_ATTEMPTS = "attempts"
+ATTR_NEXT_ATTEMPT = "next_attempt"
+ATTR_LAST_ERROR = "last_error"
+
+
+def readings_period(now: datetime | None = None) -> str:
+    """Billing period the readings are sent for"""
+    now = now or dt.now()
+    return f"{now.year:04d}-{now.month:02d}"
+
+
+class BCNNOutbox:
+    """Reading submissions are stored first and delivered by a background worker.
+
+    Submissions are deduplicated by (account, period): a newer one replaces the
+    readings that have not been delivered yet. Failed deliveries are retried with
+    exponential backoff until they succeed or get older than OUTBOX_MAX_AGE.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, store: Store[dict[str, Any]], items: dict[str, Any]
+    ) -> None:
+        """Initialize the outbox."""
+        self.hass = hass
+        self._store = store
+        self.items: dict[str, dict[str, Any]] = items
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._unsub_worker: Callable[[], None] | None = None
+
+    @staticmethod
+    def _key(account: str, period: str) -> str:
+        return f"{account}_{period}"
+
+    def account_stats(self, account: str) -> tuple[int, datetime | None]:
+        """Get number of queued submissions of the account and creation time of the oldest one"""
+        created = [
+            dt.parse_datetime(item[ATTR_CREATED])
+            for item in self.items.values()
+            if item[CONF_ACCOUNT] == account
+        ]
+        return len(created), min(created, default=None)
+
+    @callback
+    def _async_save(self) -> None:
+        self._store.async_delay_save(lambda: self.items, OUTBOX_SAVE_DELAY)
+
+    @callback
+    def async_publish(self, account: str) -> None:
+        """Push queue statistics of the account to its coordinator"""
+        if (coordinator := get_account_coordinator(self.hass, account)) is not None:
+            coordinator.async_set_outbox_stats(account, *self.account_stats(account))
+
+    async def async_submit(self, account: str, readings: dict[str, str]) -> dict[str, Any]:
+        """Queue readings and try to deliver them right away"""
+        period = readings_period()
+        key = self._key(account, period)
+        self.items[key] = {
+            CONF_ACCOUNT: account,
+            ATTR_PERIOD: period,
+            ATTR_READINGS: readings,
+            ATTR_CREATED: self.items.get(key, {}).get(ATTR_CREATED)
+            or dt.utcnow().isoformat(),
+            ATTR_ATTEMPTS: 0,
+            ATTR_NEXT_ATTEMPT: dt.utcnow().isoformat(),
+            ATTR_LAST_ERROR: None,
+        }
+        # the submission must survive a restart before the portal is touched
+        await self._store.async_save(self.items)
+        self.async_publish(account)
+
+        if (sent := await self._async_deliver(key)) is None:
+            return {
+                ATTR_READINGS: readings,
+                ATTR_QUEUED: True,
+                ATTR_LAST_ERROR: self.items.get(key, {}).get(ATTR_LAST_ERROR),
+            }
+        return {ATTR_READINGS: readings, ATTR_QUEUED: False, ATTR_SENT: sent}
+
+    @callback
+    def _async_confirm(self, account: str, sent: dict[str, str]) -> None:
+        """Start waiting until the delivered readings show up on the portal"""
+        if (coordinator := get_account_coordinator(self.hass, account)) is not None:
+            coordinator.async_schedule_confirmation(account, sent)
+
+    async def _async_deliver(self, key: str) -> dict[str, str] | None:
+        """Deliver one submission, reschedule it on failure.
+
+        Return the sent values by meter number, None if the submission is still queued.
+        """
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if (item := self.items.get(key)) is None:
+                # delivered by a concurrent call
+                return None
+            account = item[CONF_ACCOUNT]
+            try:
+                if (coordinator := get_account_coordinator(self.hass, account)) is None:
+                    raise RuntimeError(f"Account {account} is not loaded")
+                sent = await coordinator.async_submit_readings(
+                    account, tuple(item[ATTR_READINGS].items())
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                attempts = item[ATTR_ATTEMPTS] + 1
+                delay = min(
+                    OUTBOX_RETRY_INITIAL_DELAY * 2 ** (attempts - 1),
+                    OUTBOX_RETRY_MAX_DELAY,
+                )
+                _LOGGER.warning(
+                    "Sending readings for %s failed (attempt %s), retry in %s: %s",
+                    account,
+                    attempts,
+                    delay,
+                    exc,
+                )
+                item.update(
+                    {
+                        ATTR_ATTEMPTS: attempts,
+                        ATTR_NEXT_ATTEMPT: (dt.utcnow() + delay).isoformat(),
+                        ATTR_LAST_ERROR: str(exc),
+                    }
+                )
+                self._async_save()
+                self.async_schedule()
+                return None
+
+            if self.items.get(key) is item:
+                self.items.pop(key)
+            if key not in self.items:
+                self._locks.pop(key, None)
+            self._async_save()
+            self.async_publish(account)
+            self._async_confirm(account, sent)
+            return sent
+
+    @callback
+    def async_schedule(self) -> None:
+        """Schedule the worker for the earliest due submission"""
+        self.async_cancel()
+        if not self.items:
+            return
+        next_attempt = min(
+            dt.parse_datetime(item[ATTR_NEXT_ATTEMPT]) for item in self.items.values()
+        )
+        self._unsub_worker = async_call_later(
+            self.hass,
+            max(timedelta(), next_attempt - dt.utcnow()),
+            self._async_run_worker,
+        )
+
+    @callback
+    def async_cancel(self) -> None:
+        """Cancel the scheduled worker run"""
+        if self._unsub_worker is not None:
+            self._unsub_worker()
+            self._unsub_worker = None
+
+    async def _async_run_worker(self, _now: datetime) -> None:
+        """Deliver due submissions one by one"""
+        self._unsub_worker = None
+        now = dt.utcnow()
+        for key, item in list(self.items.items()):
+            created = dt.parse_datetime(item[ATTR_CREATED])
+            if now - created > OUTBOX_MAX_AGE:
+                _LOGGER.error(
+                    "Readings for %s (%s) were not delivered in %s, dropped: %s",
+                    item[CONF_ACCOUNT],
+                    item[ATTR_PERIOD],
+                    OUTBOX_MAX_AGE,
+                    item[ATTR_LAST_ERROR],
+                )
+                self.items.pop(key)
+                self._locks.pop(key, None)
+                self._async_save()
+                self.async_publish(item[CONF_ACCOUNT])
+                self.hass.bus.async_fire(
+                    f"{DOMAIN}_send_readings_failed",
+                    {**item, CONF_ERROR: item[ATTR_LAST_ERROR]},
+                )
+                continue
+            if dt.parse_datetime(item[ATTR_NEXT_ATTEMPT]) > now:
+                continue
+            if (sent := await self._async_deliver(key)) is not None:
+                self.hass.bus.async_fire(
+                    f"{DOMAIN}_send_readings_completed",
+                    {
+                        CONF_ACCOUNT: item[CONF_ACCOUNT],
+                        ATTR_READINGS: item[ATTR_READINGS],
+                        ATTR_SENT: sent,
+                    },
+                )
+        self.async_schedule()
+
+
+async def async_get_outbox(hass: HomeAssistant) -> BCNNOutbox:
+    """Get the outbox, loading it on first use"""
+
+    if (outbox := hass.data.get(DATA_OUTBOX)) is None:
+        store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY_OUTBOX)
+        items = await store.async_load() or {}
+        # another entry may have finished loading while we were waiting
+        outbox = hass.data.setdefault(DATA_OUTBOX, BCNNOutbox(hass, store, items))
+    return outbox
@@ -0,0 +1,256 @@
+"""Center-SBK portal page parsers.
+
+Страницы формы передачи показаний разбираются lxml за один проход: токены
+формы и строки счётчиков извлекаются заранее скомпилированными XPath из
+одного дерева документа.
+
+ParseCache хранит результат разбора по хэшу значимого фрагмента страницы,
+чтобы не разбирать заново не изменившиеся таблицы.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from datetime import date
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Pattern, Tuple, List
+
+from lxml import etree, html
+
+FORM_BUILD_ID_XPATH = etree.XPath('//input[@name="form_build_id"]/@value')
+FORM_TOKEN_XPATH = etree.XPath('//input[@name="form_token"]/@value')
+METER_ROWS_XPATH = etree.XPath("//tr[td]")
+ROW_CELLS_XPATH = etree.XPath("./td")
+ROW_INPUT_NAME_XPATH = etree.XPath('(.//input[@name != ""])[1]/@name')
+ROW_ONCHANGE_XPATH = etree.XPath('(.//input[@onchange != ""])[1]/@onchange')
+CABINET_CHANGE_RE = re.compile(r"cabinet_change\((\d+\.\d+)")
+FORM_BUILD_ID_RE = re.compile(r'<input[^>]*name="form_build_id"[^>]*value="([^"]*)"')
+FORM_TOKEN_RE = re.compile(r'<input[^>]*name="form_token"[^>]*value="([^"]*)"')
+# Значимая часть страниц: таблицы без меняющихся при каждом запросе токенов формы
+READINGS_FRAGMENT_RE = re.compile(r"<table.*?</table>", re.S)
+CHARGES_FRAGMENT_RE = re.compile(r'<table[^>]*data-drupal-selector="edit-table1".*?</table>', re.S)
+
+
+class MeterRow(NamedTuple):
+    """Строка таблицы счётчиков формы ввода показаний."""
+
+    device_type: str
+    device_number: str
+    prev_value: str
+    cur_value: str
+    amount_water: str
+    repr_number: Optional[str]
+    # разрядность показаний: (целая часть, дробная часть), например ("00000", "000")
+    formatter: Optional[Tuple[str, ...]]
+
+    def as_dict(self) -> dict:
+        return {
+            "device_type": self.device_type,
+            "device_number": self.device_number,
+            "prev_value": self.prev_value,
+            "cur_value": self.cur_value,
+            "amount_water": self.amount_water,
+            "repr_number": self.repr_number,
+        }
+
+
+class ReadingsPage(NamedTuple):
+    """Разобранная страница /readings."""
+
+    form_build_id: Optional[str]
+    form_token: Optional[str]
+    meters: List[MeterRow]
+
+
+def _first(values: list) -> Optional[str]:
+    return values[0] if values else None
+
+
+def fragment_digest(document: str, pattern: Optional[Pattern[str]] = None) -> bytes:
+    """Хэш фрагментов документа, совпавших с pattern (или всего документа)."""
+    digest = hashlib.blake2b(digest_size=16)
+    if pattern is None:
+        digest.update(document.encode())
+    else:
+        for match in pattern.finditer(document):
+            digest.update(match.group().encode())
+    return digest.digest()
+
+
+class ParseCache:
+    """Последний результат разбора для каждого ключа вместе с хэшем исходного фрагмента."""
+
+    def __init__(self):
+        self._entries: Dict[Hashable, Tuple[bytes, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, digest: bytes) -> Optional[Any]:
+        """Возвращает сохранённый результат, если фрагмент не изменился."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == digest:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, digest: bytes, value: Any) -> Any:
+        self._entries[key] = (digest, value)
+        return value
+
+    def as_dict(self) -> Dict[str, int]:
+        """Попадания и промахи для диагностики."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+def parse_form_tokens(document: str) -> Tuple[Optional[str], Optional[str]]:
+    """Извлекает form_build_id и form_token без построения дерева документа."""
+    build_id = FORM_BUILD_ID_RE.search(document)
+    token = FORM_TOKEN_RE.search(document)
+    if build_id and token:
+        return build_id.group(1), token.group(1)
+    # разметка поля отличается от ожидаемой, разбираем документ целиком
+    tree = html.document_fromstring(document)
+    return _first(FORM_BUILD_ID_XPATH(tree)), _first(FORM_TOKEN_XPATH(tree))
+
+
+def parse_form_build_id(document: str) -> Optional[str]:
+    """Извлекает form_build_id, например со страницы входа."""
+    return _first(FORM_BUILD_ID_XPATH(html.document_fromstring(document)))
+
+
+def parse_readings_page(document: str) -> ReadingsPage:
+    """Извлекает токены формы и строки счётчиков за один разбор документа."""
+    tree = html.document_fromstring(document)
+    meters = []
+    for row in METER_ROWS_XPATH(tree):
+        columns = [cell.text_content().strip() for cell in ROW_CELLS_XPATH(row)]
+        if len(columns) < 6:
+            continue
+        onchange = _first(ROW_ONCHANGE_XPATH(row))
+        match = CABINET_CHANGE_RE.match(onchange) if onchange else None
+        meters.append(
+            MeterRow(
+                device_type=columns[0],
+                device_number=columns[1],
+                prev_value=columns[3],
+                cur_value=columns[4],
+                amount_water=columns[5],
+                repr_number=_first(ROW_INPUT_NAME_XPATH(row)),
+                formatter=tuple(match.group(1).split(".")) if match else None,
+            )
+        )
+    return ReadingsPage(
+        form_build_id=_first(FORM_BUILD_ID_XPATH(tree)),
+        form_token=_first(FORM_TOKEN_XPATH(tree)),
+        meters=meters,
+    )
+
+
+class ChartPoint(NamedTuple):
+    """Значение одного ряда getChartData за период."""
+
+    period: date
+    series: str
+    value: float
+
+
+# Формат ответа getChartData не документирован, поэтому ряды ищутся по структуре:
+# словарь с полем периода, строковыми подписями и числовыми значениями.
+CHART_PERIOD_KEY_RE = re.compile(r"period|month|date|период|месяц", re.I)
+CHART_NAME_KEY_RE = re.compile(r"name|title|label|service|услуг|наименов", re.I)
+# Статистикой становятся только поля расхода: идентификаторы, тарифы и суммы рядом
+# с периодом пропускаются.
+CHART_VALUE_KEY_RE = re.compile(
+    r"^(?:value|volume|consumption|quantity|расход|объ[её]м|количество|потребление)$", re.I
+)
+CHART_PERIOD_FORMATS = (
+    re.compile(r"^(?P<year>\d{4})-?(?P<month>\d{2})(?:-?\d{2})?"),
+    re.compile(r"^(?:\d{2}\.)?(?P<month>\d{2})\.(?P<year>\d{4})"),
+    re.compile(r"^(?P<name>[а-яё]+)\s+(?P<year>\d{4})", re.I),
+)
+CHART_MONTHS = ("янв", "фев", "мар", "апр", "ма", "июн", "июл", "авг", "сен", "окт", "ноя", "дек")
+
+
+def parse_chart_period(value: Any) -> Optional[date]:
+    """Период вида 202401, 2024-01, 01.2024 или «январь 2024» как первое число месяца."""
+    if not isinstance(value, (str, int)) or isinstance(value, bool):
+        return None
+    text = str(value).strip()
+    for pattern in CHART_PERIOD_FORMATS:
+        if (match := pattern.match(text)) is None:
+            continue
+        groups = match.groupdict()
+        if groups.get("name") is not None:
+            name = groups["name"].lower()
+            month = next(
+                (index for index, prefix in enumerate(CHART_MONTHS, 1) if name.startswith(prefix)),
+                None,
+            )
+        else:
+            month = int(groups["month"])
+        if month is not None and 1 <= month <= 12:
+            return date(int(groups["year"]), month, 1)
+    return None
+
+
+def _chart_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.replace("\xa0", "").replace(" ", "").replace(",", "."))
+        except ValueError:
+            return None
+    return None
+
+
+def parse_chart_data(payload: Any) -> List[ChartPoint]:
+    """Извлекает из ответа getChartData значения рядов по периодам.
+
+    Узлы без распознанного периода обходятся рекурсивно, имя родительского
+    ключа становится подписью ряда, если в самой записи её нет. Из записи
+    берутся только поля расхода (CHART_VALUE_KEY_RE).
+    """
+    points: List[ChartPoint] = []
+
+    def walk(node: Any, label: Optional[str]) -> None:
+        if isinstance(node, list):
+            for item in node:
+                walk(item, label)
+            return
+        if not isinstance(node, dict):
+            return
+
+        period = next(
+            (
+                parsed
+                for key, value in node.items()
+                if CHART_PERIOD_KEY_RE.search(str(key))
+                and (parsed := parse_chart_period(value)) is not None
+            ),
+            None,
+        )
+        if period is None:
+            for key, value in node.items():
+                walk(value, str(key))
+            return
+
+        name = next(
+            (
+                value.strip()
+                for key, value in node.items()
+                if isinstance(value, str) and CHART_NAME_KEY_RE.search(str(key)) and value.strip()
+            ),
+            label,
+        )
+        for key, value in node.items():
+            if not CHART_VALUE_KEY_RE.match(str(key)):
+                continue
+            if (number := _chart_number(value)) is not None:
+                points.append(ChartPoint(period, "_".join(filter(None, (name, str(key)))), number))
+
+    walk(payload, None)
+    return points
@@ -0,0 +1,142 @@
+"""Shared Center-SBK API clients, one per login."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+
+from .bcnn_api import BCNNApi, SESSION_RENEW_MARGIN
+from .const import (
+    DATA_APIS,
+    DATA_LIMITER,
+    DATA_SESSIONS,
+    STORAGE_VERSION,
+    STORAGE_KEY_SESSIONS,
+    SESSIONS_SAVE_DELAY,
+)
+from .limiter import PortalLimiter
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class BCNNApiHandle:
+    """API client shared by config entries with the same login."""
+
+    api: BCNNApi
+    refs: int = 0
+    unsub_keepalive: Callable[[], None] | None = None
+
+    @callback
+    def async_schedule_keepalive(self, hass: HomeAssistant) -> None:
+        """Schedule session renewal shortly before it expires"""
+        self.async_cancel_keepalive()
+        if self.api.session_is_expired():
+            return
+
+        async def _async_renew(_now: datetime) -> None:
+            self.unsub_keepalive = None
+            try:
+                await self.api.async_renew_session()
+            except Exception as exc:  # pylint: disable=broad-except
+                # the next request will log in on demand
+                _LOGGER.warning("Failed to renew session for %s: %s", self.api.login, exc)
+
+        self.unsub_keepalive = async_call_later(
+            hass,
+            max(0.0, self.api.session_expires_in() - SESSION_RENEW_MARGIN),
+            _async_renew,
+        )
+
+    @callback
+    def async_cancel_keepalive(self) -> None:
+        """Cancel scheduled session renewal"""
+        if self.unsub_keepalive is not None:
+            self.unsub_keepalive()
+            self.unsub_keepalive = None
+
+
+@dataclass
+class BCNNSessionStore:
+    """Portal sessions persisted between Home Assistant restarts."""
+
+    store: Store[dict[str, Any]]
+    sessions: dict[str, Any]
+
+    @callback
+    def async_save(self, api: BCNNApi) -> None:
+        """Schedule saving the session of api"""
+        self.sessions[api.login] = api.export_session()
+        self.store.async_delay_save(lambda: self.sessions, SESSIONS_SAVE_DELAY)
+
+
+@callback
+def get_limiter(hass: HomeAssistant) -> PortalLimiter:
+    """Get the portal traffic limiter shared by all API clients"""
+    return hass.data.setdefault(DATA_LIMITER, PortalLimiter())
+
+
+async def _async_get_session_store(hass: HomeAssistant) -> BCNNSessionStore:
+    """Get the session store, loading it on first use"""
+
+    if (session_store := hass.data.get(DATA_SESSIONS)) is None:
+        store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY_SESSIONS)
+        sessions = await store.async_load() or {}
+        # another entry may have finished loading while we were waiting
+        session_store = hass.data.setdefault(
+            DATA_SESSIONS, BCNNSessionStore(store, sessions)
+        )
+    return session_store
+
+
+async def async_acquire_api(hass: HomeAssistant, login: str, password: str) -> BCNNApi:
+    """Get the API client for login, creating it on first use"""
+
+    session_store = await _async_get_session_store(hass)
+    handles: dict[str, BCNNApiHandle] = hass.data.setdefault(DATA_APIS, {})
+    if (handle := handles.get(login)) is None:
+        _LOGGER.debug("Create API client for %s", login)
+        api = BCNNApi(
+            async_create_clientsession(hass), login, password, limiter=get_limiter(hass)
+        )
+        api.restore_session(session_store.sessions.get(login))
+        handle = handles[login] = BCNNApiHandle(api)
+
+        @callback
+        def _async_authenticated() -> None:
+            session_store.async_save(api)
+            handle.async_schedule_keepalive(hass)
+
+        api.on_authenticated = _async_authenticated
+        handle.async_schedule_keepalive(hass)
+    elif handle.api.password != password:
+        handle.api.password = password
+        handle.api.start_session = None
+
+    handle.refs += 1
+    return handle.api
+
+
+async def async_release_api(hass: HomeAssistant, login: str) -> None:
+    """Release the API client for login, closing it with the last user"""
+
+    handles: dict[str, BCNNApiHandle] = hass.data.get(DATA_APIS, {})
+    if (handle := handles.get(login)) is None:
+        return
+
+    handle.refs -= 1
+    if handle.refs > 0:
+        return
+
+    _LOGGER.debug("Close API client for %s", login)
+    handles.pop(login)
+    handle.async_cancel_keepalive()
+    await handle.api.async_close()
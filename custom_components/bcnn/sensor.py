@@ -17,19 +17,31 @@ from homeassistant.components.sensor import (
     ENTITY_ID_FORMAT,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfVolume
+from homeassistant.const import UnitOfTime, UnitOfVolume
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity import EntityCategory, async_generate_entity_id
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import StateType
+from homeassistant.util import dt
 
 from .const import (
     DOMAIN,
     CONF_INFO,
     CONF_PAYMENT,
     CONF_READINGS,
+    CONF_READINGS_INDEX,
     CONF_ACCOUNT,
     ATTR_LAST_UPDATE_TIME,
+    CONF_OUTBOX,
+    ATTR_OUTBOX_DEPTH,
+    ATTR_OUTBOX_OLDEST,
+    CONF_REFRESH,
+    ATTR_REFRESH_DURATION,
+    ATTR_REFRESH_REQUESTS,
+    ATTR_LOGIN_COUNT,
+    ATTR_STALE,
+    ATTR_DATA_AGE,
+    CONF_SECTIONS_UPDATED,
 )
 from .coordinator import BCNNCoordinator
 from .entity import BCNNBaseCoordinatorEntity
@@ -54,6 +66,8 @@ class BCNNBaseSensorEntityDescription(SensorEntityDescription):
     )
     avabl_fn: Callable[[dict[str, Any]], bool] = lambda _: True
     icon_fn: Callable[[dict[str, Any]], str | None] = lambda _: None
+    # Coordinator sections the sensor is built from, empty to recompute on every update
+    sections: tuple[str, ...] = ()
 
 
 @dataclass(frozen=True, kw_only=True)
@@ -72,6 +86,7 @@ SENSOR_TYPES: tuple[BCNNSensorEntityDescription, ...] = (
         value_fn=lambda data: _to_str(data.get(CONF_ACCOUNT)),
         avabl_fn=lambda data: CONF_ACCOUNT in data,
         translation_key="account",
+        sections=(CONF_INFO,),
         entity_category=EntityCategory.DIAGNOSTIC,
         attr_fn=lambda data: {
             # Информация о помещении
@@ -86,6 +101,7 @@ SENSOR_TYPES: tuple[BCNNSensorEntityDescription, ...] = (
         value_fn=lambda data: _to_float(data[CONF_PAYMENT].get("due_payment")),
         avabl_fn=lambda data: CONF_PAYMENT in data,
         translation_key="cost",
+        sections=(CONF_PAYMENT,),
         attr_fn=lambda data: {
             # get current payment
             "Период": data[CONF_PAYMENT].get("period"),
@@ -106,6 +122,7 @@ SENSOR_TYPES: tuple[BCNNSensorEntityDescription, ...] = (
         value_fn=lambda data: data[CONF_PAYMENT].get("period"),
         avabl_fn=lambda data: CONF_PAYMENT in data,
         translation_key="cost_date",
+        sections=(CONF_PAYMENT,),
     ),
     BCNNSensorEntityDescription(
         key="balance",
@@ -115,6 +132,7 @@ SENSOR_TYPES: tuple[BCNNSensorEntityDescription, ...] = (
         value_fn=lambda data: _to_float(data[CONF_PAYMENT].get("due_payment")),
         avabl_fn=lambda data: CONF_PAYMENT in data,
         translation_key="balance",
+        sections=(CONF_PAYMENT,),
     ),
     BCNNSensorEntityDescription(
         key="current_timestamp",
@@ -125,6 +143,64 @@ SENSOR_TYPES: tuple[BCNNSensorEntityDescription, ...] = (
         entity_category=EntityCategory.DIAGNOSTIC,
         translation_key="current_timestamp",
     ),
+    BCNNSensorEntityDescription(
+        key="outbox_depth",
+        name="Показания в очереди",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda data: data[CONF_OUTBOX][ATTR_OUTBOX_DEPTH],
+        avabl_fn=lambda data: CONF_OUTBOX in data,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        translation_key="outbox_depth",
+        sections=(CONF_OUTBOX,),
+    ),
+    BCNNSensorEntityDescription(
+        key="outbox_oldest",
+        name="Самые старые показания в очереди",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda data: data[CONF_OUTBOX][ATTR_OUTBOX_OLDEST],
+        avabl_fn=lambda data: CONF_OUTBOX in data,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        translation_key="outbox_oldest",
+        sections=(CONF_OUTBOX,),
+    ),
+    # Статистика обновлений, общая для всех ЛС логина
+    BCNNSensorEntityDescription(
+        key="refresh_duration",
+        name="Длительность обновления",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda data: data[CONF_REFRESH].get(ATTR_REFRESH_DURATION),
+        avabl_fn=lambda data: bool(data.get(CONF_REFRESH)),
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        translation_key="refresh_duration",
+        sections=(CONF_REFRESH,),
+    ),
+    BCNNSensorEntityDescription(
+        key="refresh_requests",
+        name="Запросов за обновление",
+        icon="mdi:swap-vertical",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda data: data[CONF_REFRESH].get(ATTR_REFRESH_REQUESTS),
+        avabl_fn=lambda data: bool(data.get(CONF_REFRESH)),
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        translation_key="refresh_requests",
+        sections=(CONF_REFRESH,),
+    ),
+    BCNNSensorEntityDescription(
+        key="login_count",
+        name="Количество входов",
+        icon="mdi:login",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda data: data[CONF_REFRESH].get(ATTR_LOGIN_COUNT),
+        avabl_fn=lambda data: bool(data.get(CONF_REFRESH)),
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        translation_key="login_count",
+        sections=(CONF_REFRESH,),
+    ),
 )
 
 
@@ -138,9 +214,10 @@ class BCNNSensor(BCNNBaseCoordinatorEntity, SensorEntity):
         self,
         coordinator: BCNNCoordinator,
         entity_description: BCNNSensorEntityDescription,
+        account: str,
     ) -> None:
         """Initialize the Sensor."""
-        super().__init__(coordinator, entity_description)
+        super().__init__(coordinator, entity_description, account)
         _LOGGER.debug("Start adding BCNNSensor")
         self.entity_id = async_generate_entity_id(
             ENTITY_ID_FORMAT, self._attr_unique_id, hass=coordinator.hass
@@ -149,34 +226,67 @@ class BCNNSensor(BCNNBaseCoordinatorEntity, SensorEntity):
 
     def _get_data(self) -> dict[str, Any]:
         """Get data for Sensor"""
-        return self.coordinator.data
+        return self.account_data
 
     @property
     def available(self) -> bool:
         """Return True if sensor is available."""
         return (
             super().available
-            and self.coordinator.data is not None
             and self.entity_description.avabl_fn(self._get_data())
         )
 
+    def _data_age(self) -> int | None:
+        """Seconds since the sensor data was fetched, while the portal is unreachable."""
+        account_data = self.account_data
+        if not account_data.get(ATTR_STALE):
+            return None
+        if not self.entity_description.sections:
+            fetched = [account_data.get(ATTR_LAST_UPDATE_TIME)]
+        else:
+            updated = account_data.get(CONF_SECTIONS_UPDATED, {})
+            fetched = [
+                updated.get(section) for section in self.entity_description.sections
+            ]
+        # sections that are not fetched from the portal, e.g. the outbox, have no age
+        if not (fetched := [time for time in fetched if time is not None]):
+            return None
+        return int((dt.utcnow() - min(fetched)).total_seconds())
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
-        self._attr_native_value = self.entity_description.value_fn(self._get_data())
-
-        self._attr_extra_state_attributes = self.entity_description.attr_fn(
-            self._get_data()
-        )
+        if (
+            self._fingerprint is not None
+            and self.entity_description.sections
+            and not self.coordinator.changed_sections.get(
+                self.account, set()
+            ).intersection(self.entity_description.sections)
+            and self._fingerprint[0] == self.available
+        ):
+            # nothing the sensor depends on has changed
+            return
+
+        data = self._get_data()
+        self._attr_native_value = self.entity_description.value_fn(data)
+
+        self._attr_extra_state_attributes = self.entity_description.attr_fn(data)
+        if (age := self._data_age()) is not None:
+            self._attr_extra_state_attributes = {
+                **self._attr_extra_state_attributes,
+                ATTR_DATA_AGE: age,
+            }
 
         if self.entity_description.icon_fn is not None:
-            self._attr_icon = self.entity_description.icon_fn(self._get_data())
+            self._attr_icon = self.entity_description.icon_fn(data)
 
         self.coordinator.logger.debug(
             "Entity ID: %s Value: %s", self.entity_id, self.native_value
         )
 
-        self.async_write_ha_state()
+        self._async_write_state_if_changed(
+            self.native_value, self.extra_state_attributes, self.icon
+        )
 
 
 class BCNNMeterSensor(BCNNSensor):
@@ -190,28 +300,24 @@ class BCNNMeterSensor(BCNNSensor):
         self,
         coordinator: BCNNCoordinator,
         entity_description: BCNNSensorEntityDescription,
+        account: str,
         device_number: str,
         _type: str,
     ) -> None:
         """Initialize the Sensor."""
         self.device_number = device_number
         self.type = _type
-        super().__init__(coordinator=coordinator, entity_description=entity_description)
+        super().__init__(
+            coordinator=coordinator,
+            entity_description=entity_description,
+            account=account,
+        )
 
-    def _get_data(self) -> dict[str, Any] | None:
+    def _get_data(self) -> dict[str, Any]:
         """Get data for Sensor"""
-        if CONF_READINGS in self.coordinator.data:
-            _LOGGER.debug(self.device_number)
-            _LOGGER.debug(self.coordinator.data)
-            _data = list(
-                filter(
-                    lambda x: x.get("device_number") == self.device_number,
-                    self.coordinator.data[CONF_READINGS],
-                )
-            ).pop()
-        else:
-            _data = None
-        return _data
+        return self.account_data.get(CONF_READINGS_INDEX, {}).get(
+            self.device_number, {}
+        )
 
 
 def _get_meter_slug(_type: str, number_meter: str) -> str:
@@ -225,6 +331,40 @@ def _get_meter_name(_type: str, number_meter: str) -> str:
     return " ".join([_type, number_meter])
 
 
+def _meter_sensor(
+    coordinator: BCNNCoordinator, account: str, meter: dict[str, Any]
+) -> BCNNMeterSensor:
+    """Create a sensor for the meter row"""
+    _LOGGER.debug(meter)
+    device_number = meter.get("device_number")
+    _type = meter.get("device_type")
+    return BCNNMeterSensor(
+        coordinator,
+        BCNNSensorEntityDescription(
+            key=_get_meter_slug(_type, device_number),
+            name=_get_meter_name(_type, device_number),
+            native_unit_of_measurement=UnitOfVolume.CUBIC_METERS,
+            device_class=SensorDeviceClass.WATER,
+            state_class=SensorStateClass.TOTAL,
+            value_fn=lambda data: _to_float(data.get("cur_value") or data.get("prev_value")),
+            avabl_fn=lambda data: len(data) > 0,
+            translation_key=_get_meter_slug(_type, device_number),
+            sections=(CONF_READINGS,),
+            attr_fn=lambda data: {
+                "device_number": data.get("device_number"),
+                "Услуга": data.get("device_type"),
+                "Номер счетчика": data.get("device_number"),
+                "Предыдущие показания": data.get("prev_value"),
+                "Текущие показания": data.get("cur_value"),
+                "Количество потреблённого ресурса": data.get("amount_water")
+            },
+        ),
+        account,
+        device_number,
+        _type,
+    )
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
@@ -233,41 +373,28 @@ async def async_setup_entry(
     """Set up a config entry."""
 
     coordinator: BCNNCoordinator = hass.data[DOMAIN][entry.entry_id]
+    known_accounts: set[str] = set()
+    known_meters: set[tuple[str, str]] = set()
 
-    entities: list[BCNNSensor] = [
-        BCNNSensor(coordinator, entity_description)
-        for entity_description in SENSOR_TYPES
-    ]
-
-    if CONF_READINGS in coordinator.data:
-        for meter in coordinator.data[CONF_READINGS]:
-            _LOGGER.debug(meter)
-            device_number = meter.get("device_number")
-            _type = meter.get("device_type")
-            entities.append(
-                BCNNMeterSensor(
-                    coordinator,
-                    BCNNSensorEntityDescription(
-                        key=_get_meter_slug(_type, device_number),
-                        name=_get_meter_name(_type, device_number),
-                        native_unit_of_measurement=UnitOfVolume.CUBIC_METERS,
-                        device_class=SensorDeviceClass.WATER,
-                        state_class=SensorStateClass.TOTAL,
-                        value_fn=lambda data: _to_float(data.get("cur_value") or data.get("prev_value")),
-                        avabl_fn=lambda data: len(data) > 0,
-                        translation_key=_get_meter_slug(_type, device_number),
-                        attr_fn=lambda data: {
-                            "device_number": data.get("device_number"),
-                            "Услуга": data.get("device_type"),
-                            "Номер счетчика": data.get("device_number"),
-                            "Предыдущие показания": data.get("prev_value"),
-                            "Текущие показания": data.get("cur_value"),
-                            "Количество потреблённого ресурса": data.get("amount_water")
-                        },
-                    ),
-                    device_number,
-                    _type,
+    @callback
+    def _async_add_new_entities(update_before_add: bool = False) -> None:
+        """Add sensors for accounts and meters that appeared since the last update"""
+        entities: list[BCNNSensor] = []
+        for account, account_data in (coordinator.data or {}).items():
+            if account not in known_accounts:
+                known_accounts.add(account)
+                entities.extend(
+                    BCNNSensor(coordinator, entity_description, account)
+                    for entity_description in SENSOR_TYPES
                 )
-            )
+            for meter in account_data.get(CONF_READINGS, []):
+                if (account, meter.get("device_number")) in known_meters:
+                    continue
+                known_meters.add((account, meter.get("device_number")))
+                entities.append(_meter_sensor(coordinator, account, meter))
+
+        if entities:
+            async_add_entities(entities, update_before_add)
 
-    async_add_entities(entities, True)
+    _async_add_new_entities(True)
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_new_entities))
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from collections.abc import Callable, Awaitable
 from dataclasses import dataclass
@@ -9,7 +10,12 @@ from typing import Any
 
 import voluptuous as vol
 from homeassistant.const import ATTR_DEVICE_ID, CONF_URL, ATTR_DATE, CONF_ERROR
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.service import verify_domain_control
@@ -18,6 +24,7 @@ from homeassistant.helpers.service import verify_domain_control
 from .const import (
     DOMAIN,
     CONF_READINGS,
+    CONF_READINGS_INDEX,
     ATTR_CW_1,
     ATTR_CW_1_VAL,
     ATTR_HW_1,
@@ -26,22 +33,26 @@ from .const import (
     ATTR_HW_2_VAL,
     ATTR_CW_2,
     ATTR_CW_2_VAL,
-    ATTR_READINGS
+    ATTR_QUEUED,
+    ATTR_READINGS,
+    ATTR_RESULTS,
 )
+from .bills import get_bill_cache
 from .coordinator import BCNNCoordinator
+from .limiter import interactive
+from .outbox import BCNNOutbox, async_get_outbox
 from .helpers import (
     get_float_value,
     async_get_coordinator,
-    get_previous_month,
+    get_account_coordinator,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
-PDF_PATH = "/tmp/"
-
 SERVICE_REFRESH = "refresh"
 SERVICE_SEND_READINGS = "send_readings"
 SERVICE_GET_BILL = "get_bill"
+SERVICE_SEND_READINGS_BATCH = "send_readings_batch"
 
 SERVICE_BASE_SCHEMA = {vol.Required(ATTR_DEVICE_ID): cv.string}
 
@@ -69,6 +80,15 @@ SERVICE_GET_BILL_SCHEMA = vol.Schema(
     },
 )
 
+SERVICE_SEND_READINGS_BATCH_SCHEMA = vol.Schema(
+    {
+        # {account: {device_number: value}}
+        vol.Required(ATTR_READINGS): vol.Schema(
+            {cv.string: vol.Schema({cv.string: vol.Coerce(float)})}
+        ),
+    }
+)
+
 
 @dataclass
 class ServiceDescription:
@@ -76,20 +96,26 @@ class ServiceDescription:
 
     name: str
     service_func: Callable[
-        [HomeAssistant, ServiceCall, BCNNCoordinator], Awaitable[dict[str, Any]]
+        [HomeAssistant, ServiceCall, BCNNCoordinator, str], Awaitable[dict[str, Any]]
     ]
     schema: vol.Schema | None = None
 
 
 async def _async_handle_refresh(
-    hass: HomeAssistant, service_call: ServiceCall, coordinator: BCNNCoordinator
+    hass: HomeAssistant,
+    service_call: ServiceCall,
+    coordinator: BCNNCoordinator,
+    account: str,
 ) -> dict[str, Any]:
-    await coordinator.async_refresh()
+    await coordinator.async_force_refresh(account)
     return {}
 
 
 async def _async_handle_send_readings(
-    hass: HomeAssistant, service_call: ServiceCall, coordinator: BCNNCoordinator
+    hass: HomeAssistant,
+    service_call: ServiceCall,
+    coordinator: BCNNCoordinator,
+    account: str,
 ) -> dict[str, Any]:
     meters = (
         (ATTR_CW_1, ATTR_CW_1_VAL),
@@ -108,37 +134,78 @@ async def _async_handle_send_readings(
                 float(meter_value)
             )
 
-    if len(coordinator.data[CONF_READINGS]) != len(readings):
+    account_meters = coordinator.data[account][CONF_READINGS]
+    if len(account_meters) != len(readings):
         raise HomeAssistantError(
-            f'{service_call.service}: Tariff zones mismatch for "{coordinator.account}". Got {len(readings)} value(s) but need {len(coordinator.data[CONF_READINGS])}'
+            f'{service_call.service}: Tariff zones mismatch for "{account}". Got {len(readings)} value(s) but need {len(account_meters)}'
         )
 
-    result = await coordinator.async_send_readings(tuple(readings.items()))
-    if result is None:
-        raise HomeAssistantError(f"{service_call.service}: Empty response from API.")
-
-    return {
-        ATTR_READINGS: readings,
-    }
+    outbox = await async_get_outbox(hass)
+    return await outbox.async_submit(account, readings)
 
 
 async def _async_handle_get_bill(
-    hass: HomeAssistant, service_call: ServiceCall, coordinator: BCNNCoordinator
+    hass: HomeAssistant,
+    service_call: ServiceCall,
+    coordinator: BCNNCoordinator,
+    account: str,
 ) -> dict[str, Any]:
-    bill_date = get_previous_month()
-    result = await coordinator.async_get_bill()
-    if result is None:
-        raise HomeAssistantError(f"{service_call.service}: Empty response from API.")
-    path_file = f"{PDF_PATH}bill_{coordinator.account}.pdf"
-    with open(path_file, "wb") as file:
-        file.write(result)
+    path_file, bill_date = await get_bill_cache(hass).async_get(coordinator, account)
 
     return {
         ATTR_DATE: bill_date,
-        CONF_URL: path_file,
+        CONF_URL: str(path_file),
     }
 
 
+async def _async_send_account_readings(
+    coordinator: BCNNCoordinator,
+    account: str,
+    values: dict[str, float],
+    outbox: BCNNOutbox,
+) -> dict[str, Any]:
+    """Send readings of one account of the batch"""
+    readings = {number: str(float(value)) for number, value in values.items()}
+    try:
+        meters = coordinator.data[account][CONF_READINGS_INDEX]
+        if unknown := set(readings) - set(meters):
+            raise ValueError(f"Unknown meters: {', '.join(sorted(unknown))}")
+        if len(meters) != len(readings):
+            raise ValueError(
+                f"Got {len(readings)} value(s) but need {len(meters)}"
+            )
+
+        return await outbox.async_submit(account, readings)
+    except Exception as exc:  # pylint: disable=broad-except
+        _LOGGER.error("Sending readings for %s failed. Error: %s", account, exc)
+        return {ATTR_READINGS: readings, CONF_ERROR: str(exc)}
+
+
+async def _async_handle_send_readings_batch(
+    hass: HomeAssistant, service_call: ServiceCall
+) -> dict[str, Any]:
+    """Send readings of many accounts: logins in parallel, accounts of a login
+    one by one, as the portal session of a login serves one form at a time"""
+    outbox = await async_get_outbox(hass)
+    accounts: list[str] = []
+    tasks: list[Awaitable[dict[str, Any]]] = []
+
+    for account, values in service_call.data[ATTR_READINGS].items():
+        if (coordinator := get_account_coordinator(hass, account)) is None:
+            raise HomeAssistantError(
+                f"{service_call.service}: Account {account} is not configured"
+            )
+        accounts.append(account)
+        tasks.append(
+            _async_send_account_readings(
+                coordinator, account, values, outbox
+            )
+        )
+
+    results = await asyncio.gather(*tasks)
+    return {ATTR_RESULTS: dict(zip(accounts, results))}
+
+
 SERVICES: dict[str, ServiceDescription] = {
     SERVICE_REFRESH: ServiceDescription(
         SERVICE_REFRESH, _async_handle_refresh, SERVICE_REFRESH_SCHEMA
@@ -162,14 +229,19 @@ async def async_setup_services(hass: HomeAssistant) -> None:
 
         try:
             device_id = service_call.data.get(ATTR_DEVICE_ID)
-            coordinator = await async_get_coordinator(hass, device_id)
+            coordinator, account = await async_get_coordinator(hass, device_id)
 
-            result = await SERVICES[service_call.service].service_func(
-                hass, service_call, coordinator
-            )
+            # requests of service calls go ahead of background polling
+            with interactive():
+                result = await SERVICES[service_call.service].service_func(
+                    hass, service_call, coordinator, account
+                )
 
+            # readings left in the outbox are not delivered yet, the outbox
+            # fires the completion event once it sends them
+            outcome = "queued" if result.get(ATTR_QUEUED) else "completed"
             hass.bus.async_fire(
-                event_type=f"{DOMAIN}_{service_call.service}_completed",
+                event_type=f"{DOMAIN}_{service_call.service}_{outcome}",
                 event_data={ATTR_DEVICE_ID: device_id, **result},
                 context=service_call.context,
             )
@@ -202,6 +274,29 @@ async def async_setup_services(hass: HomeAssistant) -> None:
             DOMAIN, service.name, _async_handle_service, service.schema
         )
 
+    @verify_domain_control(hass, DOMAIN)
+    async def _async_handle_batch_service(service_call: ServiceCall) -> ServiceResponse:
+        """Call the batch service."""
+        _LOGGER.debug("Service call %s", service_call.service)
+
+        with interactive():
+            result = await _async_handle_send_readings_batch(hass, service_call)
+        hass.bus.async_fire(
+            event_type=f"{DOMAIN}_{service_call.service}_completed",
+            event_data=result,
+            context=service_call.context,
+        )
+        return result if service_call.return_response else None
+
+    if not hass.services.has_service(DOMAIN, SERVICE_SEND_READINGS_BATCH):
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_SEND_READINGS_BATCH,
+            _async_handle_batch_service,
+            SERVICE_SEND_READINGS_BATCH_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+
 
 async def async_unload_services(hass: HomeAssistant) -> None:
     """Unload Center-SBK services."""
@@ -209,5 +304,5 @@ async def async_unload_services(hass: HomeAssistant) -> None:
     if hass.data.get(DOMAIN):
         return
 
-    for service in SERVICES:
+    for service in (*SERVICES, SERVICE_SEND_READINGS_BATCH):
         hass.services.async_remove(domain=DOMAIN, service=service)
@@ -0,0 +1,64 @@
+"""Fixtures: the fake portal and clients connected to it."""
+
+from __future__ import annotations
+
+from typing import Any, AsyncIterator
+
+import pytest
+from aiohttp import ClientSession, CookieJar
+from homeassistant.core import HomeAssistant
+
+from custom_components.bcnn.bcnn_api import BCNNApi
+from custom_components.bcnn.const import DOMAIN
+from custom_components.bcnn.coordinator import BCNNCoordinator
+from tools.fake_portal.scenario import LOGIN, PASSWORD, FakePortalServer
+from tools.fake_portal.server import FIXTURES, PortalConfig, load_fixtures
+
+ACCOUNTS = ["100000001", "100000002"]
+
+
+@pytest.fixture
+def portal_config() -> PortalConfig:
+    """Portal behaviour, tests override it with parametrize"""
+    return PortalConfig()
+
+
+@pytest.fixture
+async def portal(portal_config: PortalConfig) -> AsyncIterator[FakePortalServer]:
+    async with FakePortalServer(portal_config) as server:
+        yield server
+
+
+@pytest.fixture
+async def session() -> AsyncIterator[ClientSession]:
+    # заглушка работает на IP-адресе, для которого cookies принимает только unsafe-хранилище
+    async with ClientSession(cookie_jar=CookieJar(unsafe=True)) as client_session:
+        yield client_session
+
+
+@pytest.fixture
+def api(portal: FakePortalServer, session: ClientSession) -> BCNNApi:
+    return BCNNApi(session, LOGIN, PASSWORD, base_url=portal.base_url)
+
+
+@pytest.fixture
+def fixture_accounts() -> dict[str, dict[str, Any]]:
+    """Accounts of the test login as the fake portal sees them"""
+    return load_fixtures(FIXTURES)[LOGIN]["accounts"]
+
+
+@pytest.fixture
+async def hass(tmp_path) -> AsyncIterator[HomeAssistant]:
+    hass = HomeAssistant(str(tmp_path))
+    yield hass
+    await hass.async_stop(force=True)
+
+
+@pytest.fixture
+async def coordinator(hass: HomeAssistant, api: BCNNApi) -> AsyncIterator[BCNNCoordinator]:
+    """Coordinator of both accounts, registered as a loaded config entry"""
+    coordinator = BCNNCoordinator(hass, bcnn_api=api, accounts=ACCOUNTS, options={})
+    hass.data.setdefault(DOMAIN, {})["entry"] = coordinator
+    yield coordinator
+    hass.data[DOMAIN].pop("entry")
+    await coordinator.async_shutdown()
@@ -0,0 +1,125 @@
+"""Portal client against the fake portal: login, relogin, errors, accounts."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from aiohttp import ClientResponseError
+
+from custom_components.bcnn.bcnn_api import BCNNApi
+from tools.fake_portal.scenario import PASSWORD, FakePortalServer
+from tools.fake_portal.server import PortalConfig, make_charges
+
+from .conftest import ACCOUNTS
+
+
+def _totals(charges: list[dict[str, Any]]) -> list[tuple[Any, float]]:
+    return [(period["period"], float(period["accrued"])) for period in charges]
+
+
+def _expected_totals(account: dict[str, Any], periods: int = 3) -> list[tuple[Any, float]]:
+    return [(period["period"], period["accrued"]) for period in make_charges(account, periods)]
+
+
+async def test_login_and_accounts(api: BCNNApi, portal: FakePortalServer) -> None:
+    accounts = await api.get_accounts()
+
+    assert [str(number) for number in accounts["data"]["accountInfo"]["accounts"]] == ACCOUNTS
+    assert portal.state.logins == api.metrics.logins == 1
+    assert not api.session_is_expired()
+
+
+async def test_relogin_after_portal_logout(api: BCNNApi, portal: FakePortalServer) -> None:
+    meters = await api.get_information_on_water_meters(ACCOUNTS[0])
+    portal.expire_sessions()
+
+    assert await api.get_information_on_water_meters(ACCOUNTS[0]) == meters
+    assert portal.state.logins == 2
+    assert api.metrics.retries == 1
+
+
+async def test_relogin_keeps_the_account_of_charges(
+    api: BCNNApi, portal: FakePortalServer, fixture_accounts: dict[str, Any]
+) -> None:
+    await api.get_charges(ACCOUNTS[1])
+    portal.expire_sessions()
+
+    # новая сессия портала не знает выбранного ЛС, сценарий выбирает его заново
+    charges = await api.get_charges(ACCOUNTS[1])
+    assert _totals(charges) == _expected_totals(fixture_accounts[ACCOUNTS[1]])
+
+
+async def test_charges_of_several_accounts(
+    api: BCNNApi, fixture_accounts: dict[str, Any]
+) -> None:
+    for account in (*ACCOUNTS, ACCOUNTS[0]):
+        charges = await api.get_charges(account)
+        assert _totals(charges) == _expected_totals(fixture_accounts[account])
+        assert len(charges[0]["services"]) == len(fixture_accounts[account]["services"])
+
+
+@pytest.mark.parametrize("portal_config", [PortalConfig(error_rate=1.0, error_status=503)])
+async def test_portal_errors_are_raised(api: BCNNApi, portal: FakePortalServer) -> None:
+    with pytest.raises(ClientResponseError) as error:
+        await api.get_charges(ACCOUNTS[0])
+    assert error.value.status == 503
+
+    portal.state.config.error_rate = 0.0
+    assert await api.get_charges(ACCOUNTS[0])
+
+
+async def test_relogin_failing_with_portal_errors(
+    api: BCNNApi, portal: FakePortalServer, fixture_accounts: dict[str, Any]
+) -> None:
+    await api.get_charges(ACCOUNTS[0])
+    portal.expire_sessions()
+    portal.state.config.error_rate = 1.0
+
+    with pytest.raises(ClientResponseError):
+        await api.get_charges(ACCOUNTS[0])
+
+    # портал ожил: новый вход и данные того же ЛС
+    portal.state.config.error_rate = 0.0
+    charges = await api.get_charges(ACCOUNTS[0])
+    assert _totals(charges) == _expected_totals(fixture_accounts[ACCOUNTS[0]])
+    assert portal.state.logins == 2
+
+
+async def test_failed_relogin_is_not_taken_for_the_old_session(
+    api: BCNNApi, portal: FakePortalServer
+) -> None:
+    await api.get_accounts()
+    portal.expire_sessions()
+    api.password = "wrong"
+
+    # cookie прежней сессии осталась бы в хранилище, если бы его не очищали перед входом
+    with pytest.raises(Exception, match="Не удалось авторизоваться"):
+        await api.get_accounts()
+    assert portal.state.logins == api.metrics.logins == 1
+    assert api.session_is_expired()
+
+
+async def test_failed_session_renewal(api: BCNNApi, portal: FakePortalServer) -> None:
+    await api.get_accounts()
+    api.password = "wrong"
+
+    with pytest.raises(Exception, match="Не удалось авторизоваться"):
+        await api.async_renew_session()
+    assert api.session_is_expired()
+    assert api.export_session() is None
+
+    api.password = PASSWORD
+    await api.async_renew_session()
+    assert not api.session_is_expired()
+    assert portal.state.logins == 2
+
+
+async def test_login_older_than_the_session_fails(api: BCNNApi) -> None:
+    await api.get_accounts()
+    # отметка новой сессии раньше прежней: портал вернул не новую сессию
+    api.start_session += 3600
+
+    with pytest.raises(Exception, match="прежнюю сессию"):
+        await api.async_renew_session()
+    assert api.session_is_expired()
@@ -0,0 +1,61 @@
+"""Bill cache against the fake portal: cache hits and eviction."""
+
+from __future__ import annotations
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.bcnn import bills
+from custom_components.bcnn.bills import get_bill_cache
+from custom_components.bcnn.coordinator import BCNNCoordinator
+from tools.fake_portal.scenario import FakePortalServer
+from tools.fake_portal.server import PortalConfig
+
+from .conftest import ACCOUNTS
+
+
+async def test_bill_is_served_from_the_cache(
+    hass: HomeAssistant,
+    coordinator: BCNNCoordinator,
+    portal: FakePortalServer,
+    portal_config: PortalConfig,
+) -> None:
+    await coordinator.async_refresh()
+    cache = get_bill_cache(hass)
+
+    path, period = await cache.async_get(coordinator, ACCOUNTS[0])
+    assert period == coordinator.bill_period(ACCOUNTS[0])
+    assert path == cache.path(ACCOUNTS[0], period)
+    assert path.stat().st_size == portal_config.bill_size
+    assert path.read_bytes().startswith(b"%PDF")
+    assert not list(cache.directory.glob("*.part"))
+
+    # период известен из последнего обновления: повторный запрос не идёт на портал
+    requests = portal.requests()
+    assert await cache.async_get(coordinator, ACCOUNTS[0]) == (path, period)
+    assert portal.requests() == requests
+
+
+@pytest.mark.parametrize(
+    ("max_files", "max_bytes"),
+    [(1, 1 << 30), (10, PortalConfig.bill_size)],
+    ids=["by count", "by size"],
+)
+async def test_least_recently_used_bills_are_evicted(
+    hass: HomeAssistant,
+    coordinator: BCNNCoordinator,
+    monkeypatch: pytest.MonkeyPatch,
+    max_files: int,
+    max_bytes: int,
+) -> None:
+    monkeypatch.setattr(bills, "BILL_CACHE_MAX_FILES", max_files)
+    monkeypatch.setattr(bills, "BILL_CACHE_MAX_BYTES", max_bytes)
+    await coordinator.async_refresh()
+    cache = get_bill_cache(hass)
+
+    first, _ = await cache.async_get(coordinator, ACCOUNTS[0])
+    second, _ = await cache.async_get(coordinator, ACCOUNTS[1])
+
+    # в кэше остаётся только самый свежий счёт
+    assert not first.exists()
+    assert list(cache.directory.glob("*.pdf")) == [second]
@@ -0,0 +1,74 @@
+"""Charges table and chart parsing: periods grouped with their services on long tables."""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+import pytest
+
+from custom_components.bcnn.bcnn_api import BCNNApi
+from custom_components.bcnn.helpers import parse_period
+from custom_components.bcnn.parsers import ChartPoint, parse_chart_data
+from tools.fake_portal.server import PortalConfig, make_charges
+
+from .conftest import ACCOUNTS
+
+COLUMNS = ("opening_balance", "accrued", "paid", "due_payment")
+
+
+@pytest.mark.parametrize(
+    "portal_config",
+    [PortalConfig(periods=periods) for periods in (12, 60, 240)],
+    ids=lambda config: f"{config.periods} periods",
+)
+async def test_long_charges_tables(
+    api: BCNNApi, portal_config: PortalConfig, fixture_accounts: dict[str, Any]
+) -> None:
+    account = fixture_accounts[ACCOUNTS[0]]
+    expected = make_charges(account, portal_config.periods)
+
+    charges = await api.get_charges(ACCOUNTS[0])
+
+    assert [period["period"] for period in charges] == [period["period"] for period in expected]
+    for period, expected_period in zip(charges, expected):
+        assert [float(period[column]) for column in COLUMNS] == [
+            expected_period[column] for column in COLUMNS
+        ]
+        # строки услуг относятся к периоду, который стоит над ними
+        assert [service["period_or_service"] for service in period["services"]] == account[
+            "services"
+        ]
+        assert [float(service["accrued"]) for service in period["services"]] == [
+            service["accrued"] for service in expected_period["services"]
+        ]
+    assert BCNNApi.current_payment(charges)["period"] == expected[0]["period"]
+
+
+@pytest.mark.parametrize(
+    ("title", "period"),
+    [
+        ("сентябрь 2024 г.", date(2024, 9, 1)),
+        ("Январь 2030 г.", date(2030, 1, 1)),
+        ("месяц 2023 г.", None),
+        ("Холодное водоснабжение", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_parse_period(title: str | None, period: date | None) -> None:
+    assert parse_period(title) == period
+
+
+def test_chart_data_takes_only_consumption_fields() -> None:
+    payload = {
+        "chart": [
+            {"period": "202401", "name": "ХВС 1000001", "id": 7, "tariff": "45,20", "value": "3,5"},
+            {"period": "202402", "name": "ХВС 1000001", "sum": 180.8, "volume": 4},
+        ]
+    }
+
+    assert parse_chart_data(payload) == [
+        ChartPoint(date(2024, 1, 1), "ХВС 1000001_value", 3.5),
+        ChartPoint(date(2024, 2, 1), "ХВС 1000001_volume", 4.0),
+    ]
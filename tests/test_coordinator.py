@@ -0,0 +1,89 @@
+"""Coordinator refresh against the fake portal: due sections and the stale fallback."""
+
+from __future__ import annotations
+
+import pytest
+
+from custom_components.bcnn.const import (
+    ATTR_STALE,
+    CIRCUIT_BACKOFF_INITIAL,
+    CONF_CHARGES,
+    CONF_INFO,
+    CONF_READINGS,
+    CONF_REFRESH,
+)
+from custom_components.bcnn.coordinator import BCNNCoordinator
+from tools.fake_portal.scenario import FakePortalServer
+from tools.fake_portal.server import PortalConfig
+
+from .conftest import ACCOUNTS
+
+SECTION_KEYS = {CONF_READINGS, CONF_CHARGES, CONF_INFO}
+
+
+async def test_first_refresh_fetches_all_sections(coordinator: BCNNCoordinator) -> None:
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    for account in ACCOUNTS:
+        data = coordinator.data[account]
+        assert data[CONF_READINGS] and data[CONF_CHARGES] and data[CONF_INFO]
+        assert not data[ATTR_STALE]
+        assert SECTION_KEYS <= coordinator.changed_sections[account]
+
+
+async def test_refresh_fetches_only_due_sections(
+    coordinator: BCNNCoordinator, portal: FakePortalServer
+) -> None:
+    await coordinator.async_refresh()
+    data = coordinator.data
+    requests = portal.requests()
+
+    # ни один раздел ещё не устарел: к порталу не обращаемся, данные те же
+    await coordinator.async_refresh()
+    assert portal.requests() == requests
+    for account in ACCOUNTS:
+        assert coordinator.changed_sections[account] == {CONF_REFRESH}
+        assert coordinator.data[account][CONF_CHARGES] is data[account][CONF_CHARGES]
+
+    # принудительное обновление одного ЛС не трогает другой
+    await coordinator.async_force_refresh(ACCOUNTS[1])
+    assert portal.requests() > requests
+    assert coordinator.changed_sections[ACCOUNTS[0]] == {CONF_REFRESH}
+    # страницы не изменились: разобранные данные остались прежними объектами
+    assert coordinator.data[ACCOUNTS[1]][CONF_CHARGES] is data[ACCOUNTS[1]][CONF_CHARGES]
+
+
+async def test_stale_data_while_the_portal_is_down(
+    coordinator: BCNNCoordinator, portal: FakePortalServer
+) -> None:
+    await coordinator.async_refresh()
+    charges = coordinator.data[ACCOUNTS[0]][CONF_CHARGES]
+
+    portal.state.config.error_rate = 1.0
+    await coordinator.async_force_refresh()
+
+    assert coordinator.last_update_success
+    assert coordinator.circuit.failures == 1
+    # не чаще обычного опроса и не раньше первой задержки после сбоя
+    assert coordinator.update_interval >= CIRCUIT_BACKOFF_INITIAL
+    assert coordinator.update_interval >= coordinator._next_update_interval()
+    for account in ACCOUNTS:
+        assert coordinator.data[account][ATTR_STALE]
+    assert coordinator.data[ACCOUNTS[0]][CONF_CHARGES] is charges
+
+    portal.state.config.error_rate = 0.0
+    await coordinator.async_force_refresh()
+
+    assert coordinator.circuit.failures == 0
+    for account in ACCOUNTS:
+        assert not coordinator.data[account][ATTR_STALE]
+
+
+@pytest.mark.parametrize("portal_config", [PortalConfig(error_rate=1.0)])
+async def test_first_refresh_fails_without_data(coordinator: BCNNCoordinator) -> None:
+    await coordinator.async_refresh()
+
+    assert not coordinator.last_update_success
+    assert coordinator.data is None
+    assert coordinator.circuit.failures == 1
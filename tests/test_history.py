@@ -0,0 +1,75 @@
+"""Charges statistics: the watermark keeps periods from being imported twice."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.bcnn import history
+from custom_components.bcnn.bcnn_api import BCNNApi
+from custom_components.bcnn.history import BCNNHistory, period_start, statistic_id
+
+from .conftest import ACCOUNTS
+
+
+class FakeRecorder:
+    """External statistics rows by statistic id and start, as the recorder keeps them"""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self.rows: dict[str, dict[datetime, dict[str, Any]]] = {}
+        self.writes: list[tuple[str, list[datetime]]] = []
+
+    def async_add_executor_job(self, target, *args):
+        return self.hass.async_add_executor_job(target, *args)
+
+    def add_external_statistics(self, _hass, metadata, statistics) -> None:
+        rows = self.rows.setdefault(metadata["statistic_id"], {})
+        for row in statistics:
+            rows[row["start"]] = dict(row)
+        self.writes.append((metadata["statistic_id"], [row["start"] for row in statistics]))
+
+    def get_last_statistics(self, _hass, _number, stat_id, _convert, _types):
+        if not (rows := self.rows.get(stat_id)):
+            return {}
+        last = rows[max(rows)]
+        return {stat_id: [{**last, "start": last["start"].timestamp()}]}
+
+
+@pytest.fixture
+def recorder(hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch) -> FakeRecorder:
+    recorder = FakeRecorder(hass)
+    monkeypatch.setattr(history, "get_instance", lambda _hass: recorder)
+    monkeypatch.setattr(history, "async_add_external_statistics", recorder.add_external_statistics)
+    monkeypatch.setattr(history, "get_last_statistics", recorder.get_last_statistics)
+    return recorder
+
+
+async def test_charges_are_not_imported_twice(
+    hass: HomeAssistant, api: BCNNApi, recorder: FakeRecorder
+) -> None:
+    charges = await api.get_charges(ACCOUNTS[0])
+    stat_id = statistic_id(ACCOUNTS[0], "accrued")
+    starts = sorted(period_start(period["period"]) for period in charges)
+
+    await BCNNHistory(hass).async_import_charges(ACCOUNTS[0], charges)
+    assert dict(recorder.writes)[stat_id] == starts
+    rows = {start: dict(row) for start, row in recorder.rows[stat_id].items()}
+    assert rows[starts[-1]]["sum"] == pytest.approx(
+        sum(float(period["accrued"]) for period in charges)
+    )
+
+    # после перезапуска водяной знак читается из recorder: переписывается только
+    # текущий период, и его прежнее значение не входит в сумму дважды
+    recorder.writes.clear()
+    importer = BCNNHistory(hass)
+    for _ in range(2):
+        await importer.async_import_charges(ACCOUNTS[0], charges)
+    assert [written for written_id, written in recorder.writes if written_id == stat_id] == [
+        [starts[-1]],
+        [starts[-1]],
+    ]
+    assert recorder.rows[stat_id] == rows
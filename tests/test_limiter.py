@@ -0,0 +1,47 @@
+"""Portal limiter against the fake portal: interactive requests go ahead of polling."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from aiohttp import ClientSession
+
+from custom_components.bcnn.bcnn_api import BCNNApi
+from custom_components.bcnn.limiter import PortalLimiter, interactive
+from tools.fake_portal.scenario import LOGIN, PASSWORD, FakePortalServer
+from tools.fake_portal.server import PortalConfig
+
+BACKGROUND_REQUESTS = 5
+
+
+@pytest.mark.parametrize("portal_config", [PortalConfig(latency=0.02)])
+async def test_interactive_requests_go_ahead_of_polling(
+    portal: FakePortalServer, session: ClientSession
+) -> None:
+    # один запрос за раз и маркеров с запасом: порядок определяет только очередь
+    limiter = PortalLimiter(rate=6000, burst=100, max_in_flight=1)
+    api = BCNNApi(session, LOGIN, PASSWORD, base_url=portal.base_url, limiter=limiter)
+    await api.get_accounts()
+    finished: list[str] = []
+
+    async def _request(name: str) -> None:
+        await api.get_accounts()
+        finished.append(name)
+
+    background = [
+        asyncio.create_task(_request(f"background {index}"))
+        for index in range(BACKGROUND_REQUESTS)
+    ]
+    # первый фоновый запрос уже выполняется, остальные ждут в очереди
+    await asyncio.sleep(0.005)
+    with interactive():
+        service_call = asyncio.create_task(_request("interactive"))
+    await asyncio.gather(service_call, *background)
+
+    assert finished == ["background 0", "interactive"] + [
+        f"background {index}" for index in range(1, BACKGROUND_REQUESTS)
+    ]
+    stats = limiter.as_dict()["delay"]
+    assert stats["interactive"]["count"] == 1
+    assert stats["interactive"]["max"] < stats["background"]["max"]
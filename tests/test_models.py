@@ -0,0 +1,66 @@
+"""Meter registry: constant size and flat memory across refresh cycles."""
+
+from __future__ import annotations
+
+import tracemalloc
+
+from custom_components.bcnn.models import DeviceInfo, MeterRegistry
+
+ACCOUNTS = [str(100000000 + index) for index in range(10)]
+METERS = 4
+CYCLES = 2000
+
+
+def _refresh(registry: MeterRegistry, account: str, cycle: int, meters: int = METERS) -> None:
+    """Account page where the readings change on every refresh"""
+    registry.update_account(
+        account,
+        [
+            DeviceInfo(
+                account,
+                "ХВС",
+                f"{account}-{index}",
+                f"pu_{index}",
+                f"{cycle + index}.000",
+                f"{cycle + index + 1}.000",
+                "1.000",
+                formatter=("99999", "999"),
+            )
+            for index in range(meters)
+        ],
+    )
+
+
+def test_registry_size_and_memory_stay_flat() -> None:
+    registry = MeterRegistry()
+    tracemalloc.start()
+    try:
+        # первый цикл заполняет реестр, дальше объём должен оставаться прежним
+        for account in ACCOUNTS:
+            _refresh(registry, account, 0)
+        baseline, _ = tracemalloc.get_traced_memory()
+
+        growth = []
+        for cycle in range(1, CYCLES + 1):
+            for account in ACCOUNTS:
+                _refresh(registry, account, cycle)
+            assert len(registry) == len(ACCOUNTS) * METERS
+            if cycle % (CYCLES // 4) == 0:
+                growth.append(tracemalloc.get_traced_memory()[0] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    # рост не должен зависеть от числа циклов: допускается только шум аллокатора
+    assert growth[-1] - growth[0] < 4096, growth
+
+
+def test_refresh_keeps_pending_readings_and_drops_removed_meters() -> None:
+    registry = MeterRegistry()
+    _refresh(registry, ACCOUNTS[0], 0)
+    registry.get(ACCOUNTS[0], f"{ACCOUNTS[0]}-0").new_value = "5"
+
+    _refresh(registry, ACCOUNTS[0], 1, meters=2)
+
+    assert len(registry) == 2
+    assert registry.get(ACCOUNTS[0], f"{ACCOUNTS[0]}-0").new_value == "5"
+    assert registry.get(ACCOUNTS[0], f"{ACCOUNTS[0]}-3") is None
@@ -0,0 +1,143 @@
+"""Reading submissions outbox against the fake portal: retries, dedup, restart."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import Event, HomeAssistant
+from homeassistant.util import dt
+
+from custom_components.bcnn.const import (
+    ATTR_QUEUED,
+    ATTR_READINGS,
+    ATTR_SENT,
+    CONF_READINGS_INDEX,
+    DATA_OUTBOX,
+    DOMAIN,
+    OUTBOX_RETRY_INITIAL_DELAY,
+)
+from custom_components.bcnn.coordinator import BCNNCoordinator
+from custom_components.bcnn.outbox import (
+    ATTR_ATTEMPTS,
+    ATTR_CREATED,
+    ATTR_LAST_ERROR,
+    ATTR_NEXT_ATTEMPT,
+    BCNNOutbox,
+    async_get_outbox,
+    readings_period,
+)
+from tools.fake_portal.scenario import FakePortalServer
+
+from .conftest import ACCOUNTS
+
+
+def _readings(coordinator: BCNNCoordinator, account: str, step: float) -> dict[str, str]:
+    """Values of all meters of the account, step above the current ones"""
+    return {
+        number: str(float(meter["cur_value"]) + step)
+        for number, meter in coordinator.data[account][CONF_READINGS_INDEX].items()
+    }
+
+
+def _key(account: str) -> str:
+    return f"{account}_{readings_period()}"
+
+
+def _events(hass: HomeAssistant, event_type: str) -> list[dict[str, Any]]:
+    events: list[dict[str, Any]] = []
+
+    def _listener(event: Event) -> None:
+        events.append(event.data)
+
+    hass.bus.async_listen(event_type, _listener)
+    return events
+
+
+async def _restart(hass: HomeAssistant) -> BCNNOutbox:
+    """Flush the delayed save and load the outbox again, as after a restart"""
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+    hass.data.pop(DATA_OUTBOX).async_cancel()
+    return await async_get_outbox(hass)
+
+
+async def test_failed_submission_is_retried_with_backoff(
+    hass: HomeAssistant, coordinator: BCNNCoordinator, portal: FakePortalServer
+) -> None:
+    await coordinator.async_refresh()
+    readings = _readings(coordinator, ACCOUNTS[0], 1.5)
+    outbox = await async_get_outbox(hass)
+    portal.state.config.error_rate = 1.0
+
+    result = await outbox.async_submit(ACCOUNTS[0], readings)
+    assert result[ATTR_QUEUED] and result[ATTR_LAST_ERROR]
+    item = outbox.items[_key(ACCOUNTS[0])]
+    assert item[ATTR_ATTEMPTS] == 1
+
+    # каждая неудачная попытка удваивает задержку
+    started = dt.utcnow()
+    assert await outbox._async_deliver(_key(ACCOUNTS[0])) is None
+    assert item[ATTR_ATTEMPTS] == 2
+    delay = dt.parse_datetime(item[ATTR_NEXT_ATTEMPT]) - started - 2 * OUTBOX_RETRY_INITIAL_DELAY
+    assert timedelta() <= delay < timedelta(seconds=5)
+    assert outbox.account_stats(ACCOUNTS[0])[0] == 1
+
+    portal.state.config.error_rate = 0.0
+    sent = await outbox._async_deliver(_key(ACCOUNTS[0]))
+    assert sent and set(sent) == set(readings)
+    assert not outbox.items
+    assert not outbox._locks
+    accepted = await coordinator._api.get_information_on_water_meters(ACCOUNTS[0])
+    assert set(coordinator._api.readings_accepted(accepted, sent)) == set(sent)
+
+
+async def test_submissions_are_deduplicated_by_account_and_period(
+    hass: HomeAssistant, coordinator: BCNNCoordinator, portal: FakePortalServer
+) -> None:
+    await coordinator.async_refresh()
+    outbox = await async_get_outbox(hass)
+    portal.state.config.error_rate = 1.0
+
+    await outbox.async_submit(ACCOUNTS[0], _readings(coordinator, ACCOUNTS[0], 1.0))
+    created = outbox.items[_key(ACCOUNTS[0])][ATTR_CREATED]
+    latest = _readings(coordinator, ACCOUNTS[0], 2.0)
+    await outbox.async_submit(ACCOUNTS[0], latest)
+    await outbox.async_submit(ACCOUNTS[1], _readings(coordinator, ACCOUNTS[1], 1.0))
+
+    # повторная передача за тот же месяц заменяет прежние показания, не сбрасывая их возраст
+    assert sorted(outbox.items) == sorted(_key(account) for account in ACCOUNTS)
+    item = outbox.items[_key(ACCOUNTS[0])]
+    assert item[ATTR_READINGS] == latest
+    assert item[ATTR_CREATED] == created
+    assert item[ATTR_ATTEMPTS] == 1
+
+
+async def test_queued_submission_survives_a_restart(
+    hass: HomeAssistant, coordinator: BCNNCoordinator, portal: FakePortalServer
+) -> None:
+    await coordinator.async_refresh()
+    readings = _readings(coordinator, ACCOUNTS[1], 3.0)
+    outbox = await async_get_outbox(hass)
+    portal.state.config.error_rate = 1.0
+    assert (await outbox.async_submit(ACCOUNTS[1], readings))[ATTR_QUEUED]
+
+    outbox = await _restart(hass)
+    item = outbox.items[_key(ACCOUNTS[1])]
+    assert item[ATTR_READINGS] == readings
+    assert item[ATTR_ATTEMPTS] == 1 and item[ATTR_LAST_ERROR]
+    assert dt.parse_datetime(item[ATTR_NEXT_ATTEMPT]) > dt.utcnow()
+
+    # срок повторной попытки наступил
+    item[ATTR_NEXT_ATTEMPT] = dt.utcnow().isoformat()
+
+    completed = _events(hass, f"{DOMAIN}_send_readings_completed")
+    portal.state.config.error_rate = 0.0
+    await outbox._async_run_worker(dt.utcnow())
+    await hass.async_block_till_done()
+
+    assert not outbox.items
+    assert [event[ATTR_READINGS] for event in completed] == [readings]
+    assert set(completed[0][ATTR_SENT]) == set(readings)
+    assert not (await _restart(hass)).items
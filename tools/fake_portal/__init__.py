@@ -0,0 +1,15 @@
+"""Local stand-in for lk.bcnn.ru to run the API client and coordinator offline.
+
+Запуск из корня репозитория::
+
+    python -m tools.fake_portal --port 8080 --latency 0.2 --error-rate 0.05
+
+Клиент направляется на заглушку параметром base_url::
+
+    session = ClientSession(cookie_jar=CookieJar(unsafe=True))  # cookies с IP-адреса
+    BCNNApi(session, "user1@example.com", "password1", base_url="http://127.0.0.1:8080")
+"""
+
+from .server import FIXTURES, PortalConfig, create_app, make_charges, make_chart
+
+__all__ = ["FIXTURES", "PortalConfig", "create_app", "make_charges", "make_chart"]
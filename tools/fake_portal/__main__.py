@@ -0,0 +1,30 @@
+"""Run the fake portal: python -m tools.fake_portal [--port 8080]."""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import fields
+from pathlib import Path
+
+from aiohttp import web
+
+from .server import FIXTURES, PortalConfig, create_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake lk.bcnn.ru server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES)
+    for item in fields(PortalConfig):
+        parser.add_argument(
+            f"--{item.name.replace('_', '-')}", type=type(item.default), default=item.default
+        )
+    args = parser.parse_args()
+
+    config = PortalConfig(**{item.name: getattr(args, item.name) for item in fields(PortalConfig)})
+    web.run_app(create_app(config, args.fixtures), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
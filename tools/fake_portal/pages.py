@@ -0,0 +1,235 @@
+"""Pages of the fake portal.
+
+Разметка повторяет структуру страниц lk.bcnn.ru, которую разбирает клиент:
+обвязка Drupal, скрытые поля формы, таблицы показаний и начислений.
+Все данные обезличены.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from html import escape
+from typing import Any, Iterable
+
+MONTH_NAMES = (
+    "январь",
+    "февраль",
+    "март",
+    "апрель",
+    "май",
+    "июнь",
+    "июль",
+    "август",
+    "сентябрь",
+    "октябрь",
+    "ноябрь",
+    "декабрь",
+)
+
+LAYOUT = """<!DOCTYPE html>
+<html lang="ru" dir="ltr">
+<head>
+<meta charset="utf-8" />
+<title>{title} | Центр-СБК</title>
+{scripts}
+</head>
+<body class="{body_class}">
+<nav class="menu">{menu}</nav>
+<main>
+{content}
+</main>
+<footer>{footer}</footer>
+</body>
+</html>
+"""
+
+SCRIPTS = "\n".join(
+    f'<script src="/core/misc/script_{index}.js?v=10.2"></script>' for index in range(40)
+)
+MENU = "".join(f'<a href="/node/{index}">Раздел {index}</a>' for index in range(60))
+FOOTER = "<p>Центр-СБК</p>" * 20
+
+METER_ROW = """<tr class="{parity}">
+<td>{device_type}</td>
+<td>{device_number}</td>
+<td>{verification}</td>
+<td>{prev_value}</td>
+<td>{cur_value}</td>
+<td>{amount}</td>
+<td>{input}</td>
+</tr>"""
+
+METER_INPUT = (
+    '<div class="js-form-item form-item"><input onchange="cabinet_change({formatter}, this)" '
+    'data-drupal-selector="edit-{index}" type="text" name="{repr_number}" value="" '
+    'size="12" maxlength="12" class="form-text" /></div>'
+)
+
+
+def layout(title: str, content: str, body_class: str = "path-node") -> str:
+    """Wrap content into the portal layout"""
+    return LAYOUT.format(
+        title=escape(title),
+        scripts=SCRIPTS,
+        body_class=body_class,
+        menu=MENU,
+        content=content,
+        footer=FOOTER,
+    )
+
+
+def form_tokens(form_id: str, build_id: str, token: str | None) -> str:
+    """Hidden Drupal form fields"""
+    fields = [
+        f'<input autocomplete="off" data-drupal-selector="form-{build_id[:8]}" type="hidden" '
+        f'name="form_build_id" value="form-{build_id}" />'
+    ]
+    if token is not None:
+        fields.append(
+            f'<input data-drupal-selector="edit-{form_id.replace("_", "-")}-form-token" '
+            f'type="hidden" name="form_token" value="{token}" />'
+        )
+    fields.append(
+        f'<input data-drupal-selector="edit-{form_id.replace("_", "-")}" type="hidden" '
+        f'name="form_id" value="{form_id}" />'
+    )
+    return "\n".join(fields)
+
+
+def login_page(build_id: str, error: str | None = None) -> str:
+    """Login form, also returned instead of any page when the session is over"""
+    message = f'<div class="messages messages--error">{escape(error)}</div>' if error else ""
+    return layout(
+        "Вход",
+        f"""{message}
+<form class="user-login-form" data-drupal-selector="user-login-form" action="/node/4?destination=/node/4" method="post" id="user-login-form" accept-charset="UTF-8">
+<input type="text" name="name" value="" size="60" maxlength="60" class="form-text required" />
+<input type="password" name="pass" size="60" maxlength="128" class="form-text required" />
+{form_tokens("user_login_form", build_id, None)}
+<input type="submit" name="op" value="Войти" class="button js-form-submit form-submit" />
+</form>""",
+        "path-node page-node-type-page user-logged-out",
+    )
+
+
+def home_page(login: str) -> str:
+    """Page shown after login"""
+    return layout(
+        "Личный кабинет",
+        f'<div class="user-info">{escape(login)}</div><a href="/user/logout">Выйти</a>',
+        "path-node user-logged-in",
+    )
+
+
+def meters_table(meters: Iterable[dict[str, Any]], editable: bool) -> str:
+    """Readings table, with inputs on the edit step"""
+    rows = "\n".join(
+        METER_ROW.format(
+            parity="odd" if index % 2 else "even",
+            device_type=escape(meter["device_type"]),
+            device_number=escape(meter["device_number"]),
+            verification=escape(meter.get("verification", "")),
+            prev_value=meter["prev_value"],
+            cur_value=meter["cur_value"],
+            amount=meter["amount"],
+            input=METER_INPUT.format(
+                formatter=meter.get("formatter", "99999.999"),
+                index=index,
+                repr_number=meter["repr_number"],
+            )
+            if editable
+            else "",
+        )
+        for index, meter in enumerate(meters)
+    )
+    return f"""<table class="responsive-enabled" data-striping="1">
+<thead><tr><th>Услуга</th><th>Номер счетчика</th><th>Дата поверки</th><th>Предыдущие</th><th>Текущие</th><th>Расход</th><th>Новые</th></tr></thead>
+<tbody>
+{rows}
+</tbody>
+</table>"""
+
+
+def readings_page(
+    build_id: str,
+    token: str,
+    account: str | None = None,
+    meters: Iterable[dict[str, Any]] | None = None,
+    editable: bool = False,
+    message: str | None = None,
+) -> str:
+    """Readings form: account selection, meters of the account, input step"""
+    parts = [f'<div class="messages">{escape(message)}</div>' if message else ""]
+    parts.append(
+        '<form class="readings-form" data-drupal-selector="readings-form" action="/readings" '
+        'method="post" id="readings-form" accept-charset="UTF-8">'
+    )
+    parts.append(form_tokens("readings_form", build_id, token))
+    parts.append(
+        f'<input type="text" name="account_number" value="{escape(account or "")}" class="form-text" />'
+        '<input type="submit" name="find_account" value="OK" class="button" />'
+    )
+    if meters is not None:
+        parts.append(meters_table(meters, editable))
+        parts.append(
+            '<input type="submit" name="op" value="Передать показания" class="button" />'
+            if editable
+            else '<input type="submit" name="op" value="Изменить показания" class="button" />'
+        )
+    parts.append("</form>")
+    return layout("Передача показаний", "\n".join(parts), "path-readings")
+
+
+def sent_page(account: str) -> str:
+    """Page after readings are accepted"""
+    return layout(
+        "Передача показаний",
+        f'<div class="messages messages--status">Показания по лицевому счету {escape(account)} '
+        'приняты.</div><a href="/readings/print">распечатать</a>',
+        "path-readings",
+    )
+
+
+def period_title(period: date) -> str:
+    """Period as shown in the charges table: «январь 2024 г.»"""
+    return f"{MONTH_NAMES[period.month - 1]} {period.year} г."
+
+
+def payments_page(periods: Iterable[dict[str, Any]]) -> str:
+    """Charges table: a period row followed by rows of its services"""
+    rows = []
+    for period in periods:
+        rows.append(_charges_row(period_title(period["period"]), period))
+        rows.extend(_charges_row(service["name"], service) for service in period["services"])
+    return layout(
+        "Начисления и оплаты",
+        f"""<form class="payments-form" data-drupal-selector="payments-form" action="/payments" method="post" id="payments-form" accept-charset="UTF-8">
+<table data-drupal-selector="edit-table1" id="edit-table1" class="responsive-enabled">
+<thead><tr><th>Период / Услуга</th><th>Входящее сальдо</th><th>Начислено</th><th>Оплачено</th><th>К оплате</th></tr></thead>
+<tbody>
+{chr(10).join(rows)}
+</tbody>
+</table>
+</form>""",
+        "path-payments",
+    )
+
+
+def _charges_row(title: str, values: dict[str, Any]) -> str:
+    cells = "".join(
+        f"<td>{values[column]:.2f}</td>"
+        for column in ("opening_balance", "accrued", "paid", "due_payment")
+    )
+    return f"<tr><td>{escape(title)}</td>{cells}</tr>"
+
+
+def bill_pdf(account: str, period: date, size: int) -> bytes:
+    """Minimal PDF document padded to size bytes"""
+    head = (
+        "%PDF-1.4\n1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n"
+        "2 0 obj << /Type /Pages /Kids [] /Count 0 >> endobj\n"
+        f"% bill {account} {period:%Y-%m}\n"
+    ).encode()
+    tail = b"\ntrailer << /Root 1 0 R >>\n%%EOF\n"
+    padding = max(0, size - len(head) - len(tail))
+    return head + b"%" + b"0" * max(0, padding - 1) + tail
@@ -0,0 +1,137 @@
+"""Offline run of the API client against the fake portal.
+
+Запуск из корня репозитория (нужны зависимости интеграции и Home Assistant)::
+
+    python -m tools.fake_portal.scenario [--latency 0.05] [--error-rate 0]
+
+Проходит основные сценарии клиента: вход, список ЛС, показания, передача
+показаний, начисления, счёт, повторный вход после завершения сессии порталом.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from aiohttp import ClientSession, CookieJar, web
+from aiohttp.test_utils import TestServer
+
+from custom_components.bcnn.bcnn_api import BCNNApi
+
+from .server import FIXTURES, PortalConfig, create_app
+
+LOGIN = "user1@example.com"
+PASSWORD = "password1"
+
+
+@dataclass
+class FakePortalServer:
+    """Fake portal running in the current event loop."""
+
+    config: PortalConfig = field(default_factory=PortalConfig)
+    fixtures: Path = FIXTURES
+    app: web.Application | None = None
+    server: TestServer | None = None
+
+    async def __aenter__(self) -> "FakePortalServer":
+        self.app = create_app(self.config, self.fixtures)
+        self.server = TestServer(self.app)
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.server.close()
+
+    @property
+    def base_url(self) -> str:
+        return str(self.server.make_url("")).rstrip("/")
+
+    @property
+    def state(self):
+        return self.app["state"]
+
+    def requests(self) -> int:
+        return sum(self.state.requests.values())
+
+    def expire_sessions(self) -> None:
+        self.state.sessions.clear()
+
+
+async def _step(name: str, func: Callable[[], Awaitable[Any]]) -> Any:
+    started = time.perf_counter()
+    result = await func()
+    print(f"{name:<28} {(time.perf_counter() - started) * 1000:>8.1f} ms")
+    return result
+
+
+async def run(config: PortalConfig) -> None:
+    # заглушка работает на IP-адресе, для которого cookies принимает только unsafe-хранилище
+    async with FakePortalServer(config) as portal, ClientSession(
+        cookie_jar=CookieJar(unsafe=True)
+    ) as session:
+        api = BCNNApi(session, LOGIN, PASSWORD, base_url=portal.base_url)
+
+        accounts = await _step("get_accounts", api.get_accounts)
+        numbers = [str(number) for number in accounts["data"]["accountInfo"]["accounts"]]
+        assert numbers == ["100000001", "100000002"], numbers
+
+        for account in numbers:
+            meters = await _step(
+                f"readings {account}", lambda: api.get_information_on_water_meters(account)
+            )
+            assert meters and all(meter["repr_number"] for meter in meters), meters
+
+        account = numbers[0]
+        meters = await api.get_information_on_water_meters(account)
+        values = tuple(
+            (meter["device_number"], str(float(meter["cur_value"]) + 1.5)) for meter in meters
+        )
+        sent = await _step("send_meter_readings", lambda: api.send_meter_readings(account, values))
+        meters = await _step(
+            "confirm readings", lambda: api.get_information_on_water_meters(account)
+        )
+        assert set(api.readings_accepted(meters, sent)) == set(sent), (meters, sent)
+
+        charges = await _step("get_charges", lambda: api.get_charges(account))
+        assert len(charges) == config.periods, charges
+        payment = api.current_payment(charges)
+        assert payment["services"], payment
+
+        chunks: list[bytes] = []
+
+        async def _write(chunk: bytes) -> None:
+            chunks.append(chunk)
+
+        size = await _step("download_bill", lambda: api.download_bill(account, _write))
+        assert size == config.bill_size and b"".join(chunks).startswith(b"%PDF"), size
+
+        portal.expire_sessions()
+        meters = await _step(
+            "readings after logout", lambda: api.get_information_on_water_meters(account)
+        )
+        assert meters, meters
+
+        print(
+            f"requests: {portal.requests()}, logins: {portal.state.logins}, "
+            f"injected errors: {portal.state.errors}"
+        )
+        print("OK")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--periods", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(
+        run(PortalConfig(latency=args.latency, error_rate=args.error_rate, periods=args.periods))
+    )
+
+
+if __name__ == "__main__":
+    main()
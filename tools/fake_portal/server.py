@@ -0,0 +1,395 @@
+"""Fake lk.bcnn.ru server on aiohttp.
+
+Обслуживает вход (/node/4), сценарий формы показаний (/readings), начисления
+(/payments), счёт (/to_payment_pdf) и JSON API (/api/v1/cabinet/querydata) по
+обезличенным данным из fixtures/portal.json.
+
+Задержка ответов, доля ошибок и время жизни сессии настраиваются через
+PortalConfig, а во время работы — через служебные адреса /__fake__/...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import secrets
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field, fields
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from aiohttp import web
+
+from . import pages
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "portal.json"
+SESSION_COOKIE = "Drupal.visitor.autologout_login"
+SID_COOKIE = "SSESSfakeportal"
+CONTROL_PREFIX = "/__fake__/"
+BILL_CHUNK_SIZE = 16 * 1024
+
+
+@dataclass
+class PortalConfig:
+    """Behaviour of the fake portal."""
+
+    # задержка каждого ответа и её случайный разброс, секунды
+    latency: float = 0.0
+    jitter: float = 0.0
+    # доля запросов, на которые отвечать error_status
+    error_rate: float = 0.0
+    error_status: int = 503
+    # через сколько секунд после входа портал возвращает форму входа
+    session_lifetime: float = 1800.0
+    # сколько периодов показывать на /payments (на портале их три)
+    periods: int = 3
+    bill_size: int = 200 * 1024
+    seed: int = 0
+
+
+@dataclass
+class Session:
+    """Server side state of one login session."""
+
+    login: str
+    started: float
+    form_token: str | None = None
+    readings_account: str | None = None
+    chart_account: str | None = None
+
+
+@dataclass
+class PortalState:
+    """Fixtures, sessions and request statistics."""
+
+    config: PortalConfig
+    users: dict[str, dict[str, Any]]
+    sessions: dict[str, Session] = field(default_factory=dict)
+    requests: Counter = field(default_factory=Counter)
+    logins: int = 0
+    errors: int = 0
+    random: random.Random = field(default_factory=random.Random)
+
+    def account(self, session: Session, account: Any) -> dict[str, Any] | None:
+        """Account of the session user"""
+        return self.users[session.login]["accounts"].get(str(account))
+
+
+def load_fixtures(path: Path = FIXTURES) -> dict[str, dict[str, Any]]:
+    """Users by login, accounts keep mutable meter state"""
+    with path.open(encoding="utf-8") as file:
+        data = json.load(file)
+    return {user["login"]: user for user in data["users"]}
+
+
+def _month(today: date, back: int) -> date:
+    index = today.year * 12 + today.month - 1 - back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def make_charges(account: dict[str, Any], periods: int, today: date | None = None) -> list[dict[str, Any]]:
+    """Deterministic charges of the latest periods, newest first"""
+    today = today or date.today()
+    result = []
+    for back in range(periods):
+        period = _month(today, back)
+        services = []
+        for index, name in enumerate(account["services"]):
+            accrued = round(account["tariff"] * (index + 1) * (1 + (period.month % 4) / 10), 2)
+            opening = round(accrued * 0.1 * (back % 3), 2)
+            paid = round(accrued if back else 0.0, 2)
+            services.append(
+                {
+                    "name": name,
+                    "opening_balance": opening,
+                    "accrued": accrued,
+                    "paid": paid,
+                    "due_payment": round(opening + accrued - paid, 2),
+                }
+            )
+        result.append(
+            {
+                "period": period,
+                "services": services,
+                **{
+                    column: round(sum(service[column] for service in services), 2)
+                    for column in ("opening_balance", "accrued", "paid", "due_payment")
+                },
+            }
+        )
+    return result
+
+
+def make_chart(account: dict[str, Any], begin: str, end: str) -> list[dict[str, Any]]:
+    """Monthly consumption of every meter for periods YYYYMM from begin to end"""
+    points = []
+    year, month = int(begin[:4]), int(begin[4:6])
+    while f"{year:04d}{month:02d}" <= end:
+        for meter in account["meters"]:
+            points.append(
+                {
+                    "period": f"{year:04d}{month:02d}",
+                    "name": f"{meter['device_type']} {meter['device_number']}",
+                    "value": round(2 + int(meter["device_number"]) % 5 + (month % 3) * 0.5, 3),
+                }
+            )
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return points
+
+
+def _html(text: str) -> web.Response:
+    return web.Response(text=text, content_type="text/html", charset="utf-8")
+
+
+def _new_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+class FakePortal:
+    """Request handlers of the fake portal."""
+
+    def __init__(self, state: PortalState) -> None:
+        self.state = state
+
+    # служебные функции
+
+    def _session(self, request: web.Request) -> Session | None:
+        session = self.state.sessions.get(request.cookies.get(SID_COOKIE, ""))
+        if session is None:
+            return None
+        if time.time() - session.started > self.state.config.session_lifetime:
+            self.state.sessions.pop(request.cookies[SID_COOKIE], None)
+            return None
+        return session
+
+    def _logged_out(self) -> web.Response:
+        return _html(pages.login_page(_new_token()))
+
+    # вход
+
+    async def login_form(self, request: web.Request) -> web.Response:
+        if (session := self._session(request)) is not None:
+            return _html(pages.home_page(session.login))
+        return self._logged_out()
+
+    async def login(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        user = self.state.users.get(str(form.get("name")))
+        if (
+            user is None
+            or user["password"] != form.get("pass")
+            or form.get("form_id") != "user_login_form"
+            or not form.get("form_build_id")
+        ):
+            return _html(pages.login_page(_new_token(), "Неверное имя пользователя или пароль."))
+
+        self.state.logins += 1
+        started = time.time()
+        sid = secrets.token_hex(16)
+        self.state.sessions[sid] = Session(login=user["login"], started=started)
+        response = web.HTTPFound("/node/4")
+        response.set_cookie(SID_COOKIE, sid, path="/", httponly=True)
+        response.set_cookie(SESSION_COOKIE, str(int(started)), path="/")
+        raise response
+
+    # форма показаний
+
+    async def readings_form(self, request: web.Request) -> web.Response:
+        if (session := self._session(request)) is None:
+            return self._logged_out()
+        session.form_token = _new_token()
+        session.readings_account = None
+        return _html(pages.readings_page(_new_token(), session.form_token))
+
+    async def readings_post(self, request: web.Request) -> web.Response:
+        if (session := self._session(request)) is None:
+            return self._logged_out()
+        form = await request.post()
+        if form.get("form_token") != session.form_token or form.get("form_id") != "readings_form":
+            session.form_token = _new_token()
+            return _html(
+                pages.readings_page(
+                    _new_token(),
+                    session.form_token,
+                    message="Форма устарела. Скопируйте несохранённые данные и обновите страницу.",
+                )
+            )
+
+        account_number = str(form.get("account_number", ""))
+        if (account := self.state.account(session, account_number)) is None:
+            session.form_token = _new_token()
+            return _html(
+                pages.readings_page(
+                    _new_token(), session.form_token, message="Лицевой счет не найден."
+                )
+            )
+
+        op = form.get("op")
+        if op == "Передать показания":
+            if session.readings_account != account_number:
+                session.form_token = _new_token()
+                return _html(
+                    pages.readings_page(
+                        _new_token(), session.form_token, message="Выберите лицевой счет."
+                    )
+                )
+            for meter in account["meters"]:
+                if value := form.get(meter["repr_number"]):
+                    meter["cur_value"] = f"{float(value):.3f}"
+                    meter["amount"] = f"{float(value) - float(meter['prev_value']):.3f}"
+            session.form_token = None
+            session.readings_account = None
+            return _html(pages.sent_page(account_number))
+
+        session.form_token = _new_token()
+        session.readings_account = account_number
+        # сеанс формы переключает и ЛС начислений
+        session.chart_account = account_number
+        return _html(
+            pages.readings_page(
+                _new_token(),
+                session.form_token,
+                account_number,
+                account["meters"],
+                editable=op == "Изменить показания",
+            )
+        )
+
+    # начисления и счёт
+
+    async def payments(self, request: web.Request) -> web.Response:
+        if (session := self._session(request)) is None:
+            return self._logged_out()
+        account = self.state.account(session, session.chart_account)
+        charges = make_charges(account, self.state.config.periods) if account else []
+        return _html(pages.payments_page(charges))
+
+    async def bill(self, request: web.Request) -> web.StreamResponse:
+        if (session := self._session(request)) is None:
+            return self._logged_out()
+        if self.state.account(session, session.chart_account) is None:
+            return _html(pages.layout("Счёт", "<p>Счёт не найден.</p>"))
+
+        body = pages.bill_pdf(
+            session.chart_account, _month(date.today(), 1), self.state.config.bill_size
+        )
+        response = web.StreamResponse(headers={"Content-Type": "application/pdf"})
+        response.content_length = len(body)
+        await response.prepare(request)
+        for offset in range(0, len(body), BILL_CHUNK_SIZE):
+            await response.write(body[offset : offset + BILL_CHUNK_SIZE])
+        await response.write_eof()
+        return response
+
+    # JSON API
+
+    async def querydata(self, request: web.Request) -> web.Response:
+        if (session := self._session(request)) is None:
+            return self._logged_out()
+        payload = await request.json()
+        function = payload.get("function")
+        data = payload.get("data") or {}
+        accounts = self.state.users[session.login]["accounts"]
+
+        if function == "getAccountInfo":
+            numbers = [int(number) for number in accounts]
+            result = {"accountInfo": {"accounts": numbers, "occ": numbers[0], "view": "few"}}
+        elif (account := accounts.get(str(data.get("occ")))) is None:
+            return web.json_response(
+                {"code": 1, "data": {"errors": ["Лицевой счет не найден"]}, "message": "Ошибка"}
+            )
+        elif function == "getAddress":
+            result = {"address": account["address"]}
+        elif function == "getChartData":
+            session.chart_account = str(data["occ"])
+            result = {"chart": make_chart(account, data["beginPeriod"], data["endPeriod"])}
+        else:
+            return web.json_response(
+                {"code": 1, "data": {"errors": [f"Неизвестная функция {function}"]}, "message": "Ошибка"}
+            )
+        return web.json_response(
+            {"code": 0, "data": {**result, "errors": []}, "message": "Данные успешно получены"}
+        )
+
+    # служебные адреса
+
+    async def control_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "requests": dict(self.state.requests),
+                "total": sum(self.state.requests.values()),
+                "logins": self.state.logins,
+                "errors": self.state.errors,
+                "sessions": len(self.state.sessions),
+                "config": asdict(self.state.config),
+            }
+        )
+
+    async def control_reset(self, request: web.Request) -> web.Response:
+        self.state.requests.clear()
+        self.state.logins = 0
+        self.state.errors = 0
+        return web.json_response({"ok": True})
+
+    async def control_expire(self, request: web.Request) -> web.Response:
+        expired = len(self.state.sessions)
+        self.state.sessions.clear()
+        return web.json_response({"expired": expired})
+
+    async def control_config(self, request: web.Request) -> web.Response:
+        known = {item.name for item in fields(PortalConfig)}
+        for key, value in (await request.json()).items():
+            if key in known:
+                setattr(self.state.config, key, value)
+        return web.json_response(asdict(self.state.config))
+
+
+@web.middleware
+async def _behaviour_middleware(request: web.Request, handler):
+    """Request counting, latency and error injection"""
+    state: PortalState = request.app["state"]
+    if request.path.startswith(CONTROL_PREFIX):
+        return await handler(request)
+
+    state.requests[f"{request.method} {request.path}"] += 1
+    config = state.config
+    if delay := config.latency + state.random.uniform(0, config.jitter):
+        await asyncio.sleep(delay)
+    if config.error_rate and state.random.random() < config.error_rate:
+        state.errors += 1
+        return web.Response(status=config.error_status, text="Service Unavailable")
+    return await handler(request)
+
+
+def create_app(
+    config: PortalConfig | None = None, fixtures: Path = FIXTURES
+) -> web.Application:
+    """Create the fake portal application"""
+    config = config or PortalConfig()
+    state = PortalState(config=config, users=load_fixtures(fixtures))
+    state.random.seed(config.seed)
+    portal = FakePortal(state)
+
+    app = web.Application(middlewares=[_behaviour_middleware])
+    app["state"] = state
+    app.add_routes(
+        [
+            web.get("/node/4", portal.login_form),
+            web.post("/node/4", portal.login),
+            web.get("/readings", portal.readings_form),
+            web.post("/readings", portal.readings_post),
+            web.get("/payments", portal.payments),
+            web.get("/to_payment_pdf", portal.bill),
+            web.post("/api/v1/cabinet/querydata", portal.querydata),
+            web.get(f"{CONTROL_PREFIX}stats", portal.control_stats),
+            web.post(f"{CONTROL_PREFIX}reset", portal.control_reset),
+            web.post(f"{CONTROL_PREFIX}expire", portal.control_expire),
+            web.post(f"{CONTROL_PREFIX}config", portal.control_config),
+        ]
+    )
+    return app